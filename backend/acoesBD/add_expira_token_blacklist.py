@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+"""
+Script para adicionar a coluna expira_em em token_blacklist (bancos criados antes dela)
+Remove as entradas já expiradas e preenche a expiração das restantes (criado_em + validade do token)
+"""
+from app import create_app
+from models import db, TokenBlacklist
+from services.revogacao_tokens import limpar_tokens_expirados
+from sqlalchemy import text, inspect, update, bindparam
+
+def add_expira_token_blacklist():
+    """Cria a coluna e o índice, limpa as expiradas e preenche as demais"""
+    app = create_app()
+
+    with app.app_context():
+        try:
+            inspetor = inspect(db.engine)
+            colunas = {c['name'] for c in inspetor.get_columns('token_blacklist')}
+            if 'expira_em' not in colunas:
+                print("Adicionando coluna expira_em...")
+                db.session.execute(text("ALTER TABLE token_blacklist ADD COLUMN expira_em DATETIME NULL"))
+                db.session.commit()
+
+            indices = {i['name'] for i in inspetor.get_indexes('token_blacklist')}
+            if 'idx_token_blacklist_expira' not in indices:
+                print("Criando índice idx_token_blacklist_expira...")
+                for indice in TokenBlacklist.__table__.indexes:
+                    if indice.name == 'idx_token_blacklist_expira':
+                        indice.create(db.engine)
+
+            # As entradas antigas expiram pela data de criação
+            removidas = limpar_tokens_expirados()
+            print(f"Entradas expiradas removidas: {removidas}")
+
+            validade = app.config['JWT_ACCESS_TOKEN_EXPIRES']
+            pendentes = db.session.query(TokenBlacklist.id, TokenBlacklist.criado_em)\
+                .filter(TokenBlacklist.expira_em.is_(None)).all()
+            if pendentes:
+                db.session.execute(
+                    update(TokenBlacklist.__table__)
+                    .where(TokenBlacklist.__table__.c.id == bindparam('id_token'))
+                    .values(expira_em=bindparam('expira')),
+                    [{'id_token': id_token, 'expira': criado_em + validade} for id_token, criado_em in pendentes]
+                )
+                db.session.commit()
+            print(f"Expiração preenchida em {len(pendentes)} entradas")
+
+        except Exception as e:
+            print(f"Erro ao migrar token_blacklist: {e}")
+            db.session.rollback()
+            raise
+
+if __name__ == '__main__':
+    add_expira_token_blacklist()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+"""
+Script para adicionar a coluna versao_token em usuarios (bancos criados antes dela)
+Os tokens emitidos antes das claims de papel são recusados: cada usuário faz login de novo uma vez
+"""
+from app import create_app
+from models import db
+from sqlalchemy import text, inspect
+
+def add_versao_token_usuarios():
+    """Cria a coluna com valor 1 para os usuários existentes"""
+    app = create_app()
+
+    with app.app_context():
+        try:
+            colunas = {c['name'] for c in inspect(db.engine).get_columns('usuarios')}
+            if 'versao_token' in colunas:
+                print("Coluna versao_token já existe")
+                return
+
+            print("Adicionando coluna versao_token...")
+            db.session.execute(text("ALTER TABLE usuarios ADD COLUMN versao_token INTEGER NOT NULL DEFAULT 1"))
+            db.session.commit()
+            total = db.session.execute(text("SELECT COUNT(*) FROM usuarios")).scalar()
+            print(f"Coluna criada ({total} usuários com versao_token = 1)")
+
+        except Exception as e:
+            print(f"Erro ao migrar usuarios: {e}")
+            db.session.rollback()
+            raise
+
+if __name__ == '__main__':
+    add_versao_token_usuarios()
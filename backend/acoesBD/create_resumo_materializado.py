@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+"""
+Script para criar as tabelas resumo_orcamento_mat e resumo_alteracoes (bancos criados antes delas)
+e carregar o resumo a partir dos orçamentos aprovados
+Depois disso a manutenção é incremental; rodar de novo apenas recalcula a tabela inteira
+"""
+from app import create_app
+from models import db, ResumoOrcamentoMaterializado, AlteracaoResumo
+from services.resumo import reconstruir_resumo
+from sqlalchemy import inspect
+
+def create_resumo_materializado():
+    """Cria as tabelas que faltarem e reconstrói o resumo"""
+    app = create_app()
+
+    with app.app_context():
+        try:
+            tabelas = set(inspect(db.engine).get_table_names())
+            for modelo in (ResumoOrcamentoMaterializado, AlteracaoResumo):
+                if modelo.__tablename__ not in tabelas:
+                    print(f"Criando tabela {modelo.__tablename__}...")
+                    modelo.__table__.create(db.engine)
+
+            print("Reconstruindo resumo_orcamento_mat...")
+            total = reconstruir_resumo()
+            print(f"Resumo carregado ({total} linhas)")
+
+        except Exception as e:
+            print(f"Erro ao criar o resumo materializado: {e}")
+            db.session.rollback()
+            raise
+
+if __name__ == '__main__':
+    create_resumo_materializado()
@@ -1,5 +1,6 @@
 import os
 import logging
+import click
 from flask import Flask, send_from_directory
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
@@ -43,22 +44,24 @@ def create_app(config_name='default'):
         app,
         resources={r"/api/*": {"origins": cors_origins}},
         supports_credentials=True,
+        expose_headers=["X-Next-Cursor"],
     )
     jwt = JWTManager(app)
 
     @jwt.token_in_blocklist_loader
     def check_if_token_revoked(_, payload):
-        from models import TokenBlacklist
-        jti = payload['jti']
-        token = TokenBlacklist.query.filter_by(jti=jti).first()
-        return token is not None
+        # Set de jti revogados por processo (services/revogacao_tokens.py), sem consulta por requisição;
+        # tokens sem claims ou de usuário alterado depois da emissão também são recusados
+        from services.revogacao_tokens import token_revogado
+        from services.autorizacao import token_desatualizado
+        return token_revogado(payload['jti']) or token_desatualizado(payload)
     
     # Criar diretórios necessários para uploads (se aplicável)
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     os.makedirs(app.config['EXPORT_FOLDER'], exist_ok=True)
     
     # Registrar blueprints da API
-    from routes import auth, categorias, orcamentos, dashboard, relatorios, logs
+    from routes import auth, categorias, orcamentos, dashboard, relatorios, logs, analytics
     
     api_prefix = '/api'
     app.register_blueprint(auth.bp, url_prefix=api_prefix)
@@ -67,6 +70,7 @@ def create_app(config_name='default'):
     app.register_blueprint(dashboard.bp, url_prefix=api_prefix)
     app.register_blueprint(relatorios.bp, url_prefix=api_prefix)
     app.register_blueprint(logs.bp, url_prefix=api_prefix)
+    app.register_blueprint(analytics.bp, url_prefix=api_prefix)
 
     # Rota de health check da API
     @app.route('/api/health')
@@ -112,6 +116,24 @@ def create_db_command():
         db.create_all()
         print('✅ Tabelas criadas com sucesso!')
 
+@application.cli.command()
+def create_indexes():
+    """Cria em tabelas já existentes os índices declarados nos modelos que ainda faltam"""
+    from sqlalchemy import inspect
+    
+    with application.app_context():
+        inspetor = inspect(db.engine)
+        criados = []
+        for tabela in db.metadata.sorted_tables:
+            if not inspetor.has_table(tabela.name):
+                continue
+            existentes = {i['name'] for i in inspetor.get_indexes(tabela.name)}
+            for indice in tabela.indexes:
+                if indice.name not in existentes:
+                    indice.create(db.engine)
+                    criados.append(indice.name)
+        print(f"✅ Índices criados: {', '.join(criados) if criados else 'nenhum'}")
+
 @application.cli.command()
 def create_admin():
     """Cria usuário admin padrão"""
@@ -142,6 +164,60 @@ def seed_db():
     """Popula banco com dados de exemplo"""
     # Implementação do seed...
     pass
+
+@application.cli.command()
+def rebuild_resumo():
+    """Recalcula a tabela resumo_orcamento_mat a partir dos orçamentos aprovados"""
+    from services.resumo import reconstruir_resumo
+    
+    with application.app_context():
+        total = reconstruir_resumo()
+        print(f'✅ Resumo materializado reconstruído: {total} linhas')
+
+@application.cli.command()
+def verify_resumo():
+    """Compara resumo_orcamento_mat com a view resumo_orcamento"""
+    from services.resumo import verificar_resumo
+    
+    with application.app_context():
+        divergencias = verificar_resumo()
+        if not divergencias:
+            print('✅ Resumo materializado consistente com a view')
+            return
+        print(f'⚠️  {len(divergencias)} divergências encontradas (rode flask rebuild-resumo):')
+        for d in divergencias[:20]:
+            print(f"   {d['chave']}: view={d['view']} tabela={d['tabela']}")
+
+@application.cli.command()
+@click.option('--dias', default=7, show_default=True, help='Manter as entradas mais novas que isso')
+def purge_resumo_alteracoes(dias):
+    """Remove entradas antigas do feed de alterações lido pelo cubo analítico"""
+    from services.resumo import limpar_alteracoes
+    
+    with application.app_context():
+        removidas = limpar_alteracoes(dias)
+        print(f'✅ {removidas} entradas removidas de resumo_alteracoes')
+
+@application.cli.command()
+@click.option('--lote', default=1000, show_default=True, help='Entradas removidas por transação')
+def purge_tokens_revogados(lote):
+    """Remove de token_blacklist os tokens revogados que já expiraram"""
+    from services.revogacao_tokens import limpar_tokens_expirados
+    
+    with application.app_context():
+        removidas = limpar_tokens_expirados(lote)
+        print(f'✅ {removidas} tokens expirados removidos de token_blacklist')
+
+@application.cli.command()
+def backfill_fluxo():
+    """Migra submissões e reprovações registradas apenas nos logs para as tabelas próprias"""
+    from services.fluxo_aprovacao import migrar_historico_logs
+    
+    with application.app_context():
+        totais = migrar_historico_logs()
+        print(f"✅ Migrados: {totais['submissoes']} submissões, "
+              f"{totais['reprovacoes_lote']} reprovações em lote, "
+              f"{totais['reprovacoes_individuais']} reprovações individuais")
         
 if __name__ == '__main__':
     # Rodar servidor de desenvolvimento
@@ -29,6 +29,12 @@ class Config:
     # Configuração de tokens JWT
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=8)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=7)
+    # Intervalo (segundos) entre as leituras incrementais de token_blacklist em cada processo
+    JWT_REVOGACAO_INTERVALO = float(os.environ.get('JWT_REVOGACAO_INTERVALO', 5))
+    # Intervalo (segundos) entre as limpezas automáticas de tokens revogados já expirados (0 desliga)
+    JWT_REVOGACAO_LIMPEZA = float(os.environ.get('JWT_REVOGACAO_LIMPEZA', 3600))
+    # Validade (segundos) da cópia de cada usuário usada para conferir a versao_token dos tokens
+    USUARIO_CACHE_TTL = float(os.environ.get('USUARIO_CACHE_TTL', 30))
 
     # CORS
     CORS_ORIGINS = [
@@ -42,9 +48,26 @@ class Config:
     UPLOAD_FOLDER = '/tmp/uploads'
     EXPORT_FOLDER = '/tmp/exports'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max
+
+    # Importações em segundo plano (threads do próprio processo, sem broker externo)
+    IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', 2))
+    # Validade (segundos) da prévia usada para confirmar uma importação sem reenviar o arquivo
+    IMPORT_PREVIEW_TTL = int(os.environ.get('IMPORT_PREVIEW_TTL', 30 * 60))
+    # Jobs em andamento há mais que isso (segundos) no primeiro uso dos jobs no processo são dados como interrompidos
+    IMPORT_JOB_TIMEOUT = int(os.environ.get('IMPORT_JOB_TIMEOUT', 60 * 60))
+
+    # Máximo de respostas do dashboard mantidas em cache por processo (LRU)
+    DASHBOARD_CACHE_SIZE = int(os.environ.get('DASHBOARD_CACHE_SIZE', 256))
+    # Feed resumo_alteracoes (cubo analítico): dias mantidos e intervalo (segundos) entre as
+    # limpezas disparadas pelas escritas (0 desliga; flask purge-resumo-alteracoes continua valendo)
+    RESUMO_ALTERACOES_DIAS = int(os.environ.get('RESUMO_ALTERACOES_DIAS', 7))
+    RESUMO_ALTERACOES_LIMPEZA = float(os.environ.get('RESUMO_ALTERACOES_LIMPEZA', 3600))
+    # Arquivo SQLite local com o catálogo dos filtros, compartilhado entre os workers
+    CATALOGO_CACHE_PATH = os.environ.get('CATALOGO_CACHE_PATH', '/tmp/cache/catalogo.sqlite')
     
     # Paginação
     ITEMS_PER_PAGE = 50
+    MAX_ITEMS_PER_PAGE = 5000
 
 class DevelopmentConfig(Config):
     """Configurações de desenvolvimento"""
@@ -86,6 +109,11 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     SQLALCHEMY_ENGINE_OPTIONS = {}
+    # Cada banco em memória começa da versão 0: sem arquivo compartilhado entre eles
+    CATALOGO_CACHE_PATH = None
+    # Sem limpezas em segundo plano: a thread dividiria a conexão do banco em memória
+    JWT_REVOGACAO_LIMPEZA = 0
+    RESUMO_ALTERACOES_LIMPEZA = 0
     # Usar chaves de teste para não depender do ambiente
     SECRET_KEY = 'test-secret-key'
     JWT_SECRET_KEY = 'test-jwt-secret-key'
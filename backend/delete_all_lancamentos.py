@@ -2,7 +2,8 @@ import os
 import click
 from dotenv import load_dotenv
 from app import create_app
-from models import db, Orcamento
+from models import db, Orcamento, ResumoOrcamentoMaterializado, registrar_alteracao_resumo
+from services.cache_respostas import marcar_dados_alterados
 
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
@@ -35,6 +36,10 @@ def delete_all_lancamentos(yes):
         
         try:
             num_deleted = db.session.query(Orcamento).delete()
+            # Delete em massa não passa pelos eventos da sessão: limpa o resumo materializado junto
+            db.session.query(ResumoOrcamentoMaterializado).delete()
+            registrar_alteracao_resumo(db.session.connection())
+            marcar_dados_alterados()
             db.session.commit()
             click.echo(click.style(f'\n✅ Operação concluída: {num_deleted} lançamentos foram deletados com sucesso.', fg='green'))
         except Exception as e:
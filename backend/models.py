@@ -1,8 +1,8 @@
 # backend/app/models.py
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import event, text, TypeDecorator, Index
-from sqlalchemy.orm import attributes
+from sqlalchemy import event, text, TypeDecorator, Index, select, insert, delete, func, cast, tuple_, literal
+from sqlalchemy.orm import attributes, Session
 from werkzeug.security import generate_password_hash, check_password_hash
 import json
 import pytz
@@ -34,6 +34,8 @@ class Usuario(db.Model):
     senha_hash = db.Column(db.String(255), nullable=False)
     papel = db.Column(db.Enum('admin', 'gestor', 'visualizador'), nullable=False, default='visualizador')
     criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    # Vai nas claims do token; incrementar invalida os tokens já emitidos (ex.: troca de papel)
+    versao_token = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     
     # Relacionamentos
     logs = db.relationship('Log', back_populates='usuario', lazy='dynamic')
@@ -97,11 +99,19 @@ class Orcamento(db.Model):
     __tablename__ = 'orcamentos'
     
     id_orcamento = db.Column(db.Integer, primary_key=True)
-    id_categoria = db.Column(db.Integer, db.ForeignKey('categorias.id_categoria', ondelete='CASCADE'), nullable=False)
-    mes = db.Column(db.Enum('Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho',
-                            'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro'),
-                   nullable=False)
-    ano = db.Column(db.Integer, nullable=False)
+    # active_history: trocar a chave de um objeto expirado ainda deixa a chave antiga no
+    # histórico, que o listener do resumo materializado usa para tirar o valor de lá
+    id_categoria = db.column_property(
+        db.Column(db.Integer, db.ForeignKey('categorias.id_categoria', ondelete='CASCADE'), nullable=False),
+        active_history=True
+    )
+    mes = db.column_property(
+        db.Column(db.Enum('Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho',
+                          'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro'),
+                  nullable=False),
+        active_history=True
+    )
+    ano = db.column_property(db.Column(db.Integer, nullable=False), active_history=True)
     orcado = db.Column(db.Numeric(15, 2), default=0.00)
     realizado = db.Column(db.Numeric(15, 2), default=0.00)
     dif = db.Column(db.Numeric(15, 2), default=0.00)
@@ -127,23 +137,32 @@ class Orcamento(db.Model):
         Index('idx_orcamento_categoria', 'id_categoria'),  # Índice para consultas por categoria
         Index('idx_orcamento_status', 'status'),  # Índice para consultas por status
         Index('idx_orcamento_data', 'ano', 'mes'),  # Índice para consultas por data
+        # Cobre o histograma de status (services/status_orcamentos.py), com ou sem filtro de ano
+        Index('idx_orcamento_ano_status', 'ano', 'status', 'id_categoria'),
     )
     
-    def to_dict(self, include_categoria=False):
-        """Converte para dicionário"""
+    # Campo do to_dict() -> função que serializa o valor (usado também para projeções)
+    CAMPOS_DICT = {
+        'id_orcamento': lambda o: o.id_orcamento,
+        'id_categoria': lambda o: o.id_categoria,
+        'mes': lambda o: o.mes,
+        'ano': lambda o: o.ano,
+        'orcado': lambda o: float(o.orcado) if o.orcado else 0.0,
+        'realizado': lambda o: float(o.realizado) if o.realizado else 0.0,
+        'dif': lambda o: float(o.dif) if o.dif else 0.0,
+        'status': lambda o: o.status,
+        'aprovado_por': lambda o: o.aprovado_por,
+        'data_aprovacao': lambda o: o.data_aprovacao.isoformat() if o.data_aprovacao else None,
+        'criado_em': lambda o: o.criado_em.isoformat() if o.criado_em else None,
+        'atualizado_em': lambda o: o.atualizado_em.isoformat() if o.atualizado_em else None
+    }
+
+    def to_dict(self, include_categoria=False, campos=None):
+        """Converte para dicionário; `campos` restringe a saída a um subconjunto de CAMPOS_DICT"""
         data = {
-            'id_orcamento': self.id_orcamento,
-            'id_categoria': self.id_categoria,
-            'mes': self.mes,
-            'ano': self.ano,
-            'orcado': float(self.orcado) if self.orcado else 0.0,
-            'realizado': float(self.realizado) if self.realizado else 0.0,
-            'dif': float(self.dif) if self.dif else 0.0,
-            'status': self.status,
-            'aprovado_por': self.aprovado_por,
-            'data_aprovacao': self.data_aprovacao.isoformat() if self.data_aprovacao else None,
-            'criado_em': self.criado_em.isoformat() if self.criado_em else None,
-            'atualizado_em': self.atualizado_em.isoformat() if self.atualizado_em else None
+            campo: serializar(self)
+            for campo, serializar in self.CAMPOS_DICT.items()
+            if campos is None or campo in campos
         }
         
         if include_categoria and self.categoria:
@@ -221,20 +240,333 @@ class ResumoOrcamento(db.Model):
             'total_dif': float(self.total_dif) if self.total_dif else 0.0
         }
 
+class ResumoOrcamentoMaterializado(db.Model):
+    """Versão materializada da view resumo_orcamento, mantida por chave (id_categoria, ano, mes).
+
+    Os atributos descritivos vêm de Categoria no momento da consulta (services/resumo.py);
+    aqui ficam apenas os totais dos orçamentos aprovados.
+    """
+    __tablename__ = 'resumo_orcamento_mat'
+
+    id_categoria = db.Column(db.Integer, db.ForeignKey('categorias.id_categoria', ondelete='CASCADE'), primary_key=True)
+    ano = db.Column(db.Integer, primary_key=True)
+    mes = db.Column(db.String(20), primary_key=True)
+    total_orcado = db.Column(db.Numeric(15, 2))
+    total_realizado = db.Column(db.Numeric(15, 2))
+    total_dif = db.Column(db.Numeric(15, 2))
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('idx_resumo_mat_ano', 'ano', 'mes'),
+    )
+
+class AlteracaoResumo(db.Model):
+    """Feed das chaves recalculadas em resumo_orcamento_mat, lido pelo cubo analítico (services/cubo.py).
+
+    ano/mes nulos valem para a categoria inteira; id_categoria nulo pede a recarga completa.
+    """
+    __tablename__ = 'resumo_alteracoes'
+
+    id_alteracao = db.Column(db.Integer, primary_key=True)
+    id_categoria = db.Column(db.Integer)
+    ano = db.Column(db.Integer)
+    mes = db.Column(db.String(20))
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('idx_resumo_alteracoes_data', 'criado_em'),
+    )
+
 class TokenBlacklist(db.Model):
     __tablename__ = 'token_blacklist'
 
     id = db.Column(db.Integer, primary_key=True)
     jti = db.Column(db.String(36), nullable=False, unique=True)
     criado_em = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Expiração (UTC) do token revogado; depois dela a entrada pode ser removida
+    expira_em = db.Column(db.DateTime)
+
+    __table_args__ = (
+        Index('idx_token_blacklist_expira', 'expira_em'),
+    )
 
     def __repr__(self):
         return f'<TokenBlacklist {self.jti}>'
 
+class ImportacaoJob(db.Model):
+    """Importação de orçamentos processada em segundo plano (ver services/jobs_importacao.py)"""
+    __tablename__ = 'importacao_jobs'
+
+    id_job = db.Column(db.String(36), primary_key=True)
+    id_usuario = db.Column(db.Integer, db.ForeignKey('usuarios.id_usuario', ondelete='SET NULL'))
+    arquivo = db.Column(db.String(255))
+    caminho = db.Column(db.String(500))
+    opcoes = db.Column(JsonEncodedDict)
+    status = db.Column(db.Enum('pendente', 'processando', 'concluido', 'erro'), nullable=False, default='pendente')
+    linhas_lidas = db.Column(db.Integer, default=0)
+    linhas_processadas = db.Column(db.Integer, default=0)
+    lancamentos_gravados = db.Column(db.Integer, default=0)
+    linhas_ignoradas = db.Column(db.Integer, default=0)
+    resultado = db.Column(JsonEncodedDict)
+    erro = db.Column(db.Text)
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    iniciado_em = db.Column(db.DateTime)
+    finalizado_em = db.Column(db.DateTime)
+
+    __table_args__ = (
+        Index('idx_importacao_job_usuario', 'id_usuario', 'criado_em'),
+    )
+
+    def to_dict(self):
+        """Converte para dicionário"""
+        return {
+            'id_job': self.id_job,
+            'id_usuario': self.id_usuario,
+            'arquivo': self.arquivo,
+            'status': self.status,
+            'linhas_lidas': self.linhas_lidas or 0,
+            'linhas_processadas': self.linhas_processadas or 0,
+            'lancamentos_gravados': self.lancamentos_gravados or 0,
+            'linhas_ignoradas': self.linhas_ignoradas or 0,
+            'resultado': self.resultado,
+            'erro': self.erro,
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None,
+            'iniciado_em': self.iniciado_em.isoformat() if self.iniciado_em else None,
+            'finalizado_em': self.finalizado_em.isoformat() if self.finalizado_em else None
+        }
+
+class VersaoDados(db.Model):
+    """Contador global de versão dos dados de orçamento (ver services/cache_respostas.py).
+
+    Fica no banco para que todos os workers do gunicorn enxerguem o mesmo valor.
+    """
+    __tablename__ = 'versao_dados'
+
+    nome = db.Column(db.String(50), primary_key=True)
+    versao = db.Column(db.BigInteger, nullable=False, default=0)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class Submissao(db.Model):
+    """Lote de orçamentos enviado para aprovação (POST /orcamentos/batch_submit)"""
+    __tablename__ = 'submissoes'
+
+    id_submissao = db.Column(db.Integer, primary_key=True)
+    id_usuario = db.Column(db.Integer, db.ForeignKey('usuarios.id_usuario', ondelete='SET NULL'))
+    id_log = db.Column(db.Integer, db.ForeignKey('logs.id_log', ondelete='SET NULL'))
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+    usuario = db.relationship('Usuario')
+    itens = db.relationship('SubmissaoItem', back_populates='submissao', lazy='selectin',
+                            cascade='all, delete-orphan', order_by='SubmissaoItem.id_item')
+
+    __table_args__ = (
+        Index('idx_submissao_data', 'criado_em'),
+        Index('idx_submissao_usuario', 'id_usuario', 'criado_em'),
+        Index('idx_submissao_log', 'id_log'),
+    )
+
+class SubmissaoItem(db.Model):
+    """Orçamento de uma submissão, com os dados da categoria e os valores no momento do envio.
+
+    O status atual vem do join com orcamentos (idx_orcamento_status).
+    """
+    __tablename__ = 'submissao_itens'
+
+    id_item = db.Column(db.Integer, primary_key=True)
+    id_submissao = db.Column(db.Integer, db.ForeignKey('submissoes.id_submissao', ondelete='CASCADE'), nullable=False)
+    id_orcamento = db.Column(db.Integer)  # sem FK: o histórico sobrevive à exclusão do orçamento
+    id_categoria = db.Column(db.Integer)
+    categoria_nome = db.Column(db.String(100))
+    master = db.Column(db.String(100))
+    uf = db.Column(db.String(20))
+    grupo = db.Column(db.String(100))
+    mes = db.Column(db.String(20))
+    ano = db.Column(db.Integer)
+    orcado = db.Column(db.Numeric(15, 2))
+    realizado = db.Column(db.Numeric(15, 2))
+
+    submissao = db.relationship('Submissao', back_populates='itens')
+
+    __table_args__ = (
+        Index('idx_submissao_item_submissao', 'id_submissao'),
+        Index('idx_submissao_item_orcamento', 'id_orcamento'),
+        Index('idx_submissao_item_periodo', 'ano', 'mes'),
+    )
+
+    def to_dict(self):
+        return {
+            'id_orcamento': self.id_orcamento,
+            'id_categoria': self.id_categoria,
+            'categoria_nome': self.categoria_nome,
+            'master': self.master,
+            'uf': self.uf,
+            'grupo': self.grupo,
+            'mes': self.mes,
+            'ano': self.ano,
+            'orcado': float(self.orcado) if self.orcado else 0.0,
+            'realizado': float(self.realizado) if self.realizado else 0.0
+        }
+
+class Reprovacao(db.Model):
+    """Reprovação de orçamentos, em lote ou individual"""
+    __tablename__ = 'reprovacoes'
+
+    id_reprovacao = db.Column(db.Integer, primary_key=True)
+    id_usuario = db.Column(db.Integer, db.ForeignKey('usuarios.id_usuario', ondelete='SET NULL'))
+    id_log = db.Column(db.Integer, db.ForeignKey('logs.id_log', ondelete='SET NULL'))
+    tipo = db.Column(db.Enum('lote', 'individual'), nullable=False, default='lote')
+    motivo = db.Column(db.Text)
+    gestor_usuario = db.Column(db.String(100))
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+    usuario = db.relationship('Usuario')
+    itens = db.relationship('ReprovacaoItem', back_populates='reprovacao', lazy='selectin',
+                            cascade='all, delete-orphan', order_by='ReprovacaoItem.id_item')
+
+    __table_args__ = (
+        Index('idx_reprovacao_data', 'criado_em'),
+        Index('idx_reprovacao_usuario', 'id_usuario', 'criado_em'),
+        Index('idx_reprovacao_tipo', 'tipo', 'criado_em'),
+        Index('idx_reprovacao_log', 'id_log'),
+    )
+
+class ReprovacaoItem(db.Model):
+    """Orçamento de uma reprovação, com os dados da categoria no momento da reprovação"""
+    __tablename__ = 'reprovacao_itens'
+
+    id_item = db.Column(db.Integer, primary_key=True)
+    id_reprovacao = db.Column(db.Integer, db.ForeignKey('reprovacoes.id_reprovacao', ondelete='CASCADE'), nullable=False)
+    id_orcamento = db.Column(db.Integer)  # sem FK: o histórico sobrevive à exclusão do orçamento
+    id_categoria = db.Column(db.Integer)
+    categoria_nome = db.Column(db.String(100))
+    master = db.Column(db.String(100))
+    uf = db.Column(db.String(20))
+    grupo = db.Column(db.String(100))
+    mes = db.Column(db.String(20))
+    ano = db.Column(db.Integer)
+
+    reprovacao = db.relationship('Reprovacao', back_populates='itens')
+
+    __table_args__ = (
+        Index('idx_reprovacao_item_reprovacao', 'id_reprovacao'),
+        Index('idx_reprovacao_item_orcamento', 'id_orcamento'),
+        Index('idx_reprovacao_item_periodo', 'ano', 'mes'),
+    )
+
+    def to_dict(self):
+        return {
+            'id_orcamento': self.id_orcamento,
+            'id_categoria': self.id_categoria,
+            'categoria_nome': self.categoria_nome,
+            'master': self.master,
+            'uf': self.uf,
+            'grupo': self.grupo,
+            'mes': self.mes,
+            'ano': self.ano
+        }
+
 @event.listens_for(Orcamento, 'before_insert')
 @event.listens_for(Orcamento, 'before_update')
 def calculate_dif(mapper, connection, target):
     if target.realizado is not None and target.orcado is not None:
         target.dif = target.orcado - target.realizado
     else:
-        target.dif = 0
\ No newline at end of file
+        target.dif = 0
+
+# Campos de Orcamento que alteram o resumo materializado
+CAMPOS_RESUMO = ('id_categoria', 'ano', 'mes', 'status', 'orcado', 'realizado', 'dif')
+
+# Campos de Categoria que são dimensões do cubo analítico
+CAMPOS_CATEGORIA_CUBO = ('categoria', 'uf', 'master', 'grupo')
+
+
+def registrar_alteracao_resumo(connection, id_categoria=None):
+    """Marca no feed a categoria inteira (atributos mudaram) ou, sem id, o resumo inteiro"""
+    connection.execute(insert(AlteracaoResumo.__table__).values(id_categoria=id_categoria))
+
+
+def atualizar_resumo_materializado(connection, chaves, tamanho_lote=500, registrar=True):
+    """Recalcula no resumo apenas as chaves (id_categoria, ano, mes) informadas"""
+    tabela = ResumoOrcamentoMaterializado.__table__
+    orcamentos = Orcamento.__table__
+    chaves = sorted(chaves)
+    agora = datetime.utcnow()
+    for inicio in range(0, len(chaves), tamanho_lote):
+        lote = chaves[inicio:inicio + tamanho_lote]
+        connection.execute(
+            delete(tabela).where(tuple_(tabela.c.id_categoria, tabela.c.ano, tabela.c.mes).in_(lote))
+        )
+        totais = select(
+            orcamentos.c.id_categoria,
+            orcamentos.c.ano,
+            orcamentos.c.mes,
+            func.sum(cast(orcamentos.c.orcado, db.Numeric(15, 2))),
+            func.sum(cast(orcamentos.c.realizado, db.Numeric(15, 2))),
+            func.sum(cast(orcamentos.c.dif, db.Numeric(15, 2))),
+            literal(agora, db.DateTime)
+        ).where(
+            orcamentos.c.status == 'aprovado',
+            tuple_(orcamentos.c.id_categoria, orcamentos.c.ano, orcamentos.c.mes).in_(lote)
+        ).group_by(orcamentos.c.id_categoria, orcamentos.c.ano, orcamentos.c.mes)
+        connection.execute(insert(tabela).from_select(
+            ['id_categoria', 'ano', 'mes', 'total_orcado', 'total_realizado', 'total_dif', 'atualizado_em'],
+            totais
+        ))
+        if registrar:
+            connection.execute(insert(AlteracaoResumo.__table__), [
+                {'id_categoria': id_categoria, 'ano': ano, 'mes': mes, 'criado_em': agora}
+                for id_categoria, ano, mes in lote
+            ])
+
+
+def _chaves_orcamento(obj, modificado):
+    """Chave atual e, se os campos da chave mudaram, a chave anterior"""
+    chaves = {(obj.id_categoria, obj.ano, obj.mes)}
+    if modificado:
+        anteriores = []
+        for campo in ('id_categoria', 'ano', 'mes'):
+            historico = attributes.get_history(obj, campo)
+            anteriores.append(historico.deleted[0] if historico.deleted else getattr(obj, campo))
+        chaves.add(tuple(anteriores))
+    return chaves
+
+
+@event.listens_for(Session, 'after_flush')
+def atualizar_resumo_apos_flush(session, flush_context):
+    """Mantém resumo_orcamento_mat em dia na mesma transação das alterações em Orcamento.
+
+    Escritas em massa via Core (sem passar pela sessão) devem chamar
+    `atualizar_resumo_materializado` explicitamente ou usar `flask rebuild-resumo`.
+    """
+    chaves = set()
+    for obj in session.new:
+        if isinstance(obj, Orcamento):
+            chaves |= _chaves_orcamento(obj, False)
+    for obj in session.deleted:
+        if isinstance(obj, Orcamento):
+            chaves |= _chaves_orcamento(obj, True)
+    for obj in session.dirty:
+        if isinstance(obj, Orcamento) and any(
+            attributes.get_history(obj, campo).has_changes() for campo in CAMPOS_RESUMO
+        ):
+            chaves |= _chaves_orcamento(obj, True)
+
+    chaves = {chave for chave in chaves if None not in chave}
+    if chaves:
+        atualizar_resumo_materializado(session.connection(), chaves)
+        # Lido no after_commit de services/resumo.py, que agenda a limpeza do feed
+        session.info['feed_resumo_alterado'] = True
+
+    # Categorias renomeadas ou movidas mudam as dimensões do cubo analítico
+    categorias = {obj.id_categoria for obj in session.deleted if isinstance(obj, Categoria)}
+    categorias |= {
+        obj.id_categoria for obj in session.dirty
+        if isinstance(obj, Categoria) and any(
+            attributes.get_history(obj, campo).has_changes() for campo in CAMPOS_CATEGORIA_CUBO
+        )
+    }
+    for id_categoria in sorted(c for c in categorias if c is not None):
+        registrar_alteracao_resumo(session.connection(), id_categoria)
+        session.info['feed_resumo_alterado'] = True
@@ -0,0 +1,65 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from services.cubo import cubo_orcamentos, ConsultaInvalida, DIMENSOES
+from services.autorizacao import require_role
+
+bp = Blueprint('analytics', __name__)
+
+@bp.route('/analytics/query', methods=['GET'])
+@jwt_required()
+def analytics_query():
+    """Consulta genérica ao cubo de orçamentos aprovados.
+
+    Filtros: ano, mes, uf, master, grupo, categoria (repetir o parâmetro para vários valores)
+    agrupar: dimensões separadas por vírgula; ordenar: orcado, realizado, dif ou linhas
+    ordem: asc/desc (padrão desc); abs=true ordena pelo valor absoluto; limite: top-N
+    """
+    try:
+        filtros = {}
+        for dim in DIMENSOES:
+            valores = [v for v in request.args.getlist(dim) if v != '']
+            if not valores:
+                continue
+            if dim == 'ano':
+                if not all(v.lstrip('-').isdigit() for v in valores):
+                    return jsonify({'error': 'ano deve ser numérico'}), 400
+                valores = [int(v) for v in valores]
+            filtros[dim] = valores
+
+        agrupar = [d.strip() for d in request.args.get('agrupar', '').split(',') if d.strip()]
+        ordem = request.args.get('ordem', 'desc')
+        if ordem not in ('asc', 'desc'):
+            return jsonify({'error': 'ordem deve ser asc ou desc'}), 400
+        limite = request.args.get('limite', type=int)
+        if limite is not None and limite < 1:
+            return jsonify({'error': 'limite deve ser maior que zero'}), 400
+
+        cubo = cubo_orcamentos()
+        resultado = cubo.consultar(
+            filtros=filtros,
+            agrupar=agrupar,
+            ordenar=request.args.get('ordenar') or None,
+            decrescente=(ordem == 'desc'),
+            valor_absoluto=request.args.get('abs', '').lower() in ('1', 'true', 'sim'),
+            limite=limite
+        )
+        return jsonify({
+            'versao': cubo.versao,
+            'agrupar': agrupar,
+            'resultado': resultado
+        }), 200
+
+    except ConsultaInvalida as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/analytics/status', methods=['GET'])
+@jwt_required()
+@require_role('admin')
+def analytics_status():
+    """Estado do cubo analítico (admin)"""
+    try:
+        return jsonify(cubo_orcamentos().estatisticas()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -4,6 +4,8 @@ from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identi
 from models import db, Usuario, Log
 from datetime import datetime
 from models import db, TokenBlacklist
+from services.revogacao_tokens import cache_revogacao
+from services.autorizacao import require_role, usuario_token, claims_usuario, cache_usuarios
 
 bp = Blueprint('auth', __name__)
 
@@ -22,7 +24,9 @@ def login():
             return jsonify({'error': 'Credenciais inválidas'}), 401
         
         # Criar token JWT
-        access_token = create_access_token(identity=str(usuario.id_usuario))
+        access_token = create_access_token(
+            identity=str(usuario.id_usuario), additional_claims=claims_usuario(usuario)
+        )
         
         # Registrar login no log
         log = Log(
@@ -48,13 +52,13 @@ def login():
 def get_current_user():
     """Retorna informações do usuário atual"""
     try:
-        user_id = get_jwt_identity()
-        usuario = Usuario.query.get(user_id)
+        # Cópia recente do cache (a mesma que confere a versao_token do token)
+        usuario = cache_usuarios().obter(get_jwt_identity())
         
         if not usuario:
             return jsonify({'error': 'Usuário não encontrado'}), 404
         
-        return jsonify(usuario.to_dict()), 200
+        return jsonify(usuario['dados']), 200
         
     except Exception as e:
         import traceback
@@ -63,15 +67,10 @@ def get_current_user():
 
 @bp.route('/usuarios', methods=['GET'])
 @jwt_required()
+@require_role('admin')
 def list_usuarios():
     """Lista todos os usuários (apenas admin)"""
     try:
-        user_id = get_jwt_identity()
-        current_user = Usuario.query.get(user_id)
-        
-        if current_user.papel != 'admin':
-            return jsonify({'error': 'Acesso negado'}), 403
-        
         usuarios = Usuario.query.all()
         return jsonify([u.to_dict() for u in usuarios]), 200
         
@@ -80,15 +79,12 @@ def list_usuarios():
 
 @bp.route('/usuarios', methods=['POST'])
 @jwt_required()
+@require_role('admin')
 def create_usuario():
     """Cria novo usuário (apenas admin)"""
     try:
-        user_id = get_jwt_identity()
-        current_user = Usuario.query.get(user_id)
-        
-        if current_user.papel != 'admin':
-            return jsonify({'error': 'Acesso negado'}), 403
-        
+        current_user = usuario_token()
+
         data = request.get_json()
         
         # Validações
@@ -134,21 +130,19 @@ def create_usuario():
 
 @bp.route('/usuarios/<int:id_usuario>', methods=['PUT'])
 @jwt_required()
+@require_role('admin')
 def update_usuario(id_usuario):
     """Atualiza usuário (apenas admin)"""
     try:
-        user_id = get_jwt_identity()
-        current_user = Usuario.query.get(user_id)
-        
-        if current_user.papel != 'admin':
-            return jsonify({'error': 'Acesso negado'}), 403
-        
+        current_user = usuario_token()
+
         usuario = Usuario.query.get(id_usuario)
         if not usuario:
             return jsonify({'error': 'Usuário não encontrado'}), 404
         
         data = request.get_json()
         dados_antigos = usuario.to_dict()
+        claims_antigas = claims_usuario(usuario)
         
         # Atualizar campos
         if 'nome' in data:
@@ -165,8 +159,12 @@ def update_usuario(id_usuario):
             usuario.papel = data['papel']
         if 'senha' in data:
             usuario.set_password(data['senha'])
+        if claims_usuario(usuario) != claims_antigas:
+            # Nome e papel vão nas claims: os tokens já emitidos deixam de valer
+            usuario.versao_token = (usuario.versao_token or 1) + 1
         
         db.session.commit()
+        cache_usuarios().invalidar(id_usuario)
         
         # Registrar no log
         log = Log(
@@ -190,15 +188,13 @@ def update_usuario(id_usuario):
 
 @bp.route('/usuarios/<int:id_usuario>', methods=['DELETE'])
 @jwt_required()
+@require_role('admin')
 def delete_usuario(id_usuario):
     """Deleta usuário (apenas admin)"""
     try:
         user_id = get_jwt_identity()
-        current_user = Usuario.query.get(user_id)
-        
-        if current_user.papel != 'admin':
-            return jsonify({'error': 'Acesso negado'}), 403
-        
+        current_user = usuario_token()
+
         # Não pode deletar a si mesmo
         if user_id == id_usuario:
             return jsonify({'error': 'Não é possível deletar seu próprio usuário'}), 400
@@ -211,6 +207,7 @@ def delete_usuario(id_usuario):
         
         db.session.delete(usuario)
         db.session.commit()
+        cache_usuarios().invalidar(id_usuario)
         
         # Registrar no log
         log = Log(
@@ -232,9 +229,13 @@ def delete_usuario(id_usuario):
 @bp.route('/logout', methods=['POST'])
 @jwt_required()
 def logout():
-    jti = get_jwt()["jti"]
-    db.session.add(TokenBlacklist(jti=jti))
+    token = get_jwt()
+    jti = token["jti"]
+    # Guardar a expiração permite remover a entrada quando o token já não for aceito
+    expira_em = datetime.utcfromtimestamp(token["exp"]) if "exp" in token else None
+    db.session.add(TokenBlacklist(jti=jti, expira_em=expira_em))
     db.session.commit()
+    cache_revogacao().adicionar(jti, expira_em)
     return {"msg": "Logout realizado com sucesso"}, 200
 
 @bp.route('/change_password', methods=['PUT'])
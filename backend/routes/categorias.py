@@ -1,8 +1,12 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Usuario, Categoria, Log
+from flask_jwt_extended import jwt_required
+from models import db, Categoria, Log
 from sqlalchemy import or_, asc, desc
-import pandas as pd
+from services.cache_respostas import marcar_dados_alterados
+from services.catalogo import catalogo_dimensoes
+from services.autorizacao import require_role, usuario_token
+from services.categorias import ImportacaoCategorias
+from services.planilhas import LeitorPlanilha
 
 bp = Blueprint('categorias', __name__)
 
@@ -77,15 +81,12 @@ def get_categoria(id_categoria):
 
 @bp.route('/categorias', methods=['POST'])
 @jwt_required()
+@require_role('admin')
 def create_categoria():
     """Cria nova categoria (apenas admin)"""
     try:
-        user_id = get_jwt_identity()
-        current_user = Usuario.query.get(user_id)
-        
-        if current_user.papel != 'admin':
-            return jsonify({'error': 'Acesso negado'}), 403
-        
+        current_user = usuario_token()
+
         data = request.get_json()
         
         # Validações
@@ -115,6 +116,7 @@ def create_categoria():
         )
         
         db.session.add(categoria)
+        marcar_dados_alterados()
         db.session.commit()
         
         # Registrar no log
@@ -136,15 +138,12 @@ def create_categoria():
 
 @bp.route('/categorias/<int:id_categoria>', methods=['PUT'])
 @jwt_required()
+@require_role('admin')
 def update_categoria(id_categoria):
     """Atualiza categoria (apenas admin)"""
     try:
-        user_id = get_jwt_identity()
-        current_user = Usuario.query.get(user_id)
-        
-        if current_user.papel != 'admin':
-            return jsonify({'error': 'Acesso negado'}), 403
-        
+        current_user = usuario_token()
+
         categoria = Categoria.query.get(id_categoria)
         if not categoria:
             return jsonify({'error': 'Categoria não encontrada'}), 404
@@ -166,6 +165,7 @@ def update_categoria(id_categoria):
         if 'classe_custo' in data:
             categoria.classe_custo = data['classe_custo']
         
+        marcar_dados_alterados()
         db.session.commit()
         
         # Registrar no log
@@ -190,15 +190,12 @@ def update_categoria(id_categoria):
 
 @bp.route('/categorias/<int:id_categoria>', methods=['DELETE'])
 @jwt_required()
+@require_role('admin')
 def delete_categoria(id_categoria):
     """Deleta categoria (apenas admin)"""
     try:
-        user_id = get_jwt_identity()
-        current_user = Usuario.query.get(user_id)
-        
-        if current_user.papel != 'admin':
-            return jsonify({'error': 'Acesso negado'}), 403
-        
+        current_user = usuario_token()
+
         categoria = Categoria.query.get(id_categoria)
         if not categoria:
             return jsonify({'error': 'Categoria não encontrada'}), 404
@@ -212,6 +209,7 @@ def delete_categoria(id_categoria):
         categoria_data = categoria.to_dict()
         
         db.session.delete(categoria)
+        marcar_dados_alterados()
         db.session.commit()
         
         # Registrar no log
@@ -233,15 +231,12 @@ def delete_categoria(id_categoria):
 
 @bp.route('/categorias/import', methods=['POST'])
 @jwt_required()
+@require_role('admin')
 def import_categorias():
     """Importa categorias de arquivo Excel (apenas admin)"""
     try:
-        user_id = get_jwt_identity()
-        current_user = Usuario.query.get(user_id)
-        
-        if current_user.papel != 'admin':
-            return jsonify({'error': 'Acesso negado'}), 403
-        
+        current_user = usuario_token()
+
         if 'file' not in request.files:
             return jsonify({'error': 'Nenhum arquivo enviado'}), 400
         
@@ -253,66 +248,26 @@ def import_categorias():
         if not file.filename.endswith(('.xlsx', '.xls')):
             return jsonify({'error': 'Formato de arquivo inválido. Use Excel (.xlsx ou .xls)'}), 400
         
-        # Ler Excel
-        df = pd.read_excel(file)
+        # Ler Excel em blocos, sem carregar a planilha inteira
+        leitor = LeitorPlanilha(file)
         
         # Validar colunas obrigatórias
         required_columns = ['categoria']
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        missing_columns = [col for col in required_columns if col not in leitor.colunas]
         
         if missing_columns:
             return jsonify({
                 'error': f'Colunas obrigatórias ausentes: {", ".join(missing_columns)}'
             }), 400
         
-        # Processar cada linha
-        imported = 0
-        errors = []
-        
-        for index, row in df.iterrows():
-            # Inicia um ponto de salvamento (savepoint) para a transação atual.
-            # Isso permite reverter apenas a inserção da linha atual em caso de erro,
-            # sem invalidar a transação inteira.
-            db.session.begin_nested()
-            try:
-                # Verificar se já existe uma categoria com a mesma combinação.
-                # A verificação agora considera todos os campos da linha para definir uma duplicata.
-                existing = Categoria.query.filter_by(
-                    categoria=row.get('categoria'),
-                    uf=str(row.get('uf')) if pd.notna(row.get('uf')) else None,
-                    master=str(row.get('master')) if pd.notna(row.get('master')) else None,
-                    grupo=str(row.get('grupo')) if pd.notna(row.get('grupo')) else None,
-                    cod_class=str(row.get('cod_class')) if pd.notna(row.get('cod_class')) else None,
-                    classe_custo=str(row.get('classe_custo')) if pd.notna(row.get('classe_custo')) else None
-                ).first()
-                
-                if existing:
-                    # Se já existe, reverte o savepoint e continua para a próxima linha.
-                    db.session.rollback()
-                    errors.append(f'Linha {index + 2}: Categoria já existe (duplicada) e foi ignorada.')
-                    continue
-                
-                categoria = Categoria(
-                    categoria=row.get('categoria'),
-                    uf=str(row.get('uf')) if row.get('uf') else None,
-                    master=str(row.get('master')) if row.get('master') else None,
-                    grupo=str(row.get('grupo')) if row.get('grupo') else None,
-                    cod_class=str(row.get('cod_class')) if row.get('cod_class') else None,
-                    classe_custo=str(row.get('classe_custo')) if row.get('classe_custo') else None
-                )
-                
-                db.session.add(categoria)
-                db.session.commit() # Comita a linha atual
-                imported += 1
-                
-            except Exception as e:
-                db.session.rollback() # Reverte a transação da linha atual em caso de erro
-                # Verifica se o erro é de duplicidade (IntegrityError)
-                if 'IntegrityError' in str(type(e.orig)):
-                    errors.append(f'Linha {index + 2}: Categoria já existe (duplicada) e foi ignorada.')
-                else:
-                    # Para outros tipos de erro, mostra a mensagem completa
-                    errors.append(f'Linha {index + 2}: {str(e)}')
+        # Processar em lote: duplicatas detectadas em memória, inserção em executemany
+        importacao = ImportacaoCategorias(db.session)
+        importacao.processar(leitor)
+        marcar_dados_alterados()
+        db.session.commit()
+
+        imported = importacao.imported
+        errors = importacao.mensagens()
         
         # Registrar no log
         log = Log(
@@ -342,19 +297,9 @@ def import_categorias():
 @bp.route('/categorias/filtros', methods=['GET'])
 @jwt_required()
 def get_filtros():
-    """Retorna valores únicos para filtros"""
+    """Retorna valores únicos para filtros (catálogo compartilhado)"""
     try:
-        categorias = db.session.query(Categoria.categoria).distinct().order_by(Categoria.uf).all()
-        ufs = db.session.query(Categoria.uf).filter(Categoria.uf.isnot(None)).distinct().order_by(Categoria.uf).all()
-        masters = db.session.query(Categoria.master).filter(Categoria.master.isnot(None)).distinct().order_by(Categoria.master).all()
-        grupos = db.session.query(Categoria.grupo).filter(Categoria.grupo.isnot(None)).distinct().order_by(Categoria.grupo).all()
-        
-        return jsonify({
-            'categorias': [c[0] for c in categorias if c[0]], # Garante que a lista de categorias seja retornada
-            'ufs': [u[0] for u in ufs if u[0]],
-            'masters': [m[0] for m in masters if m[0]], # Retorna os centros de custo
-            'grupos': [g[0] for g in grupos if g[0]]
-        }), 200
+        return jsonify(catalogo_dimensoes('categorias', 'ufs', 'masters', 'grupos')), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
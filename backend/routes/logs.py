@@ -1,21 +1,17 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from models import db, Usuario, Log
+from services.autorizacao import require_role
 from datetime import datetime, timedelta
 
 bp = Blueprint('logs', __name__)
 
 @bp.route('/logs', methods=['GET'])
 @jwt_required()
+@require_role('admin')
 def list_logs():
     """Lista logs de auditoria (apenas admin)"""
     try:
-        user_id = get_jwt_identity()
-        current_user = Usuario.query.get(user_id)
-        
-        if current_user.papel != 'admin':
-            return jsonify({'error': 'Acesso negado'}), 403
-        
         # Paginação
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 50, type=int)
@@ -94,15 +90,10 @@ def list_logs():
 
 @bp.route('/logs/<int:id_log>', methods=['GET'])
 @jwt_required()
+@require_role('admin')
 def get_log(id_log):
     """Retorna um log específico (apenas admin)"""
     try:
-        user_id = get_jwt_identity()
-        current_user = Usuario.query.get(user_id)
-        
-        if current_user.papel != 'admin':
-            return jsonify({'error': 'Acesso negado'}), 403
-        
         log = Log.query.get(id_log)
         
         if not log:
@@ -115,15 +106,10 @@ def get_log(id_log):
 
 @bp.route('/logs/usuario/<int:id_usuario>', methods=['GET'])
 @jwt_required()
+@require_role('admin')
 def get_logs_usuario(id_usuario):
     """Retorna logs de um usuário específico (apenas admin)"""
     try:
-        user_id = get_jwt_identity()
-        current_user = Usuario.query.get(user_id)
-        
-        if current_user.papel != 'admin':
-            return jsonify({'error': 'Acesso negado'}), 403
-        
         # Verificar se usuário existe
         usuario = Usuario.query.get(id_usuario)
         if not usuario:
@@ -160,15 +146,10 @@ def get_logs_usuario(id_usuario):
 
 @bp.route('/logs/tabela/<string:tabela>', methods=['GET'])
 @jwt_required()
+@require_role('admin')
 def get_logs_tabela(tabela):
     """Retorna logs de uma tabela específica (apenas admin)"""
     try:
-        user_id = get_jwt_identity()
-        current_user = Usuario.query.get(user_id)
-        
-        if current_user.papel != 'admin':
-            return jsonify({'error': 'Acesso negado'}), 403
-        
         # Validar nome da tabela
         tabelas_validas = ['usuarios', 'categorias', 'orcamentos', 'sistema']
         if tabela not in tabelas_validas:
@@ -205,15 +186,10 @@ def get_logs_tabela(tabela):
 
 @bp.route('/logs/resumo', methods=['GET'])
 @jwt_required()
+@require_role('admin')
 def get_resumo_logs():
     """Retorna resumo estatístico dos logs (apenas admin)"""
     try:
-        user_id = get_jwt_identity()
-        current_user = Usuario.query.get(user_id)
-        
-        if current_user.papel != 'admin':
-            return jsonify({'error': 'Acesso negado'}), 403
-        
         # Total de logs
         total_logs = Log.query.count()
         
@@ -283,15 +259,10 @@ def get_resumo_logs():
 
 @bp.route('/logs/exportar', methods=['GET'])
 @jwt_required()
+@require_role('admin')
 def exportar_logs():
     """Exporta logs em formato CSV (apenas admin)"""
     try:
-        user_id = get_jwt_identity()
-        current_user = Usuario.query.get(user_id)
-        
-        if current_user.papel != 'admin':
-            return jsonify({'error': 'Acesso negado'}), 403
-        
         from flask import send_file
         import pandas as pd
         from io import BytesIO
@@ -358,15 +329,10 @@ def exportar_logs():
 
 @bp.route('/logs/search', methods=['POST'])
 @jwt_required()
+@require_role('admin')
 def search_logs():
     """Busca avançada em logs (apenas admin)"""
     try:
-        user_id = get_jwt_identity()
-        current_user = Usuario.query.get(user_id)
-        
-        if current_user.papel != 'admin':
-            return jsonify({'error': 'Acesso negado'}), 403
-        
         data = request.get_json()
         
         # Query base
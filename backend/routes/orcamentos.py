@@ -1,315 +1,259 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Usuario, Categoria, Orcamento, Log
+from models import db, Categoria, Orcamento, Log, ImportacaoJob, atualizar_resumo_materializado
+from services.importacao import ImportacaoOrcamentos
+from services.lancamentos import LoteOrcamentos
+from services.cache_respostas import marcar_dados_alterados, resposta_em_cache
+from services.fluxo_aprovacao import (
+    registrar_submissao, registrar_reprovacao, listar_submissoes, listar_reprovacoes, filtros_submissoes
+)
+from services.catalogo import catalogo_dimensoes
+from services.autorizacao import require_role, usuario_token
+from services.status_orcamentos import histograma_status, pendentes, AgrupamentoInvalido
+from services.jobs_importacao import criar_job, verificar_jobs_interrompidos
+from services.planilhas import LeitorPlanilha
+from services.previas import PreviaImportacao
+from services.comum import em_lotes
 from datetime import datetime
+from sqlalchemy import update, case, or_, and_
+from sqlalchemy.orm import contains_eager, load_only
 
-import pandas as pd
-import re
+import base64
+import binascii
 import json
-from difflib import SequenceMatcher
-from decimal import Decimal, InvalidOperation
 
 bp = Blueprint('orcamentos', __name__)
 
 MESES = ['Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho',
          'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro']
 
-MONTH_MAP = {
-    'jan': 'Janeiro', 'janeiro': 'Janeiro',
-    'fev': 'Fevereiro', 'fevereiro': 'Fevereiro',
-    'mar': 'Março', 'março': 'Março',
-    'abr': 'Abril', 'abril': 'Abril',
-    'mai': 'Maio', 'maio': 'Maio',
-    'jun': 'Junho', 'junho': 'Junho',
-    'jul': 'Julho', 'julho': 'Julho',
-    'ago': 'Agosto', 'agosto': 'Agosto',
-    'set': 'Setembro', 'setembro': 'Setembro',
-    'out': 'Outubro', 'outubro': 'Outubro',
-    'nov': 'Novembro', 'novembro': 'Novembro',
-    'dez': 'Dezembro', 'dezembro': 'Dezembro'
-}
-
-def build_category_key(master, grupo, uf):
-    """Cria uma chave única para combinações de Centro de Custo / Grupo / UF."""
-    return f"{(master or '').strip()}|{(grupo or '').strip()}|{(uf or '').strip()}"
-
-def compute_similarity(a, b):
-    return SequenceMatcher(None, (a or '').lower(), (b or '').lower()).ratio()
-
-def find_best_category_suggestion(master, grupo, uf, categorias):
-    if not categorias:
-        return None
-
-    best = None
-    best_score = 0.0
-    base_master = (master or '').strip()
-    base_grupo = (grupo or '').strip()
-    base_uf = (uf or '').strip().lower()
-
-    for categoria in categorias:
-        master_score = compute_similarity(base_master, categoria.master)
-        grupo_score = compute_similarity(base_grupo, categoria.grupo)
-        uf_score = 1.0 if categoria.uf and categoria.uf.strip().lower() == base_uf and base_uf else 0.0
-        total_score = (master_score + grupo_score + uf_score) / 3.0
-        if total_score > best_score:
-            best_score = total_score
-            best = categoria
-
-    if best and best_score >= 0.45:
-        return {
-            'id_categoria': best.id_categoria,
-            'categoria': best.categoria,
-            'master': best.master,
-            'grupo': best.grupo,
-            'uf': best.uf,
-            'score': round(best_score, 3)
-        }
-
-    return None
-
-def to_decimal(value):
-    if value is None:
-        return Decimal('0')
-    if isinstance(value, Decimal):
-        return value
+TAMANHO_LOTE_IDS = 1000
+
+def _lotes_ids(ids):
+    """IDs numéricos distintos em lotes de até TAMANHO_LOTE_IDS (IDs inválidos ficam de fora)"""
+    ids_validos = dict.fromkeys(int(i) for i in ids if str(i).strip().isdigit())
+    return em_lotes(ids_validos, TAMANHO_LOTE_IDS)
+
+def _carregar_chaves_orcamentos(ids):
+    """{id (texto): id, status e chave do resumo} para os IDs existentes, em lotes de IN"""
+    encontrados = {}
+    for lote in _lotes_ids(ids):
+        linhas = db.session.query(
+            Orcamento.id_orcamento, Orcamento.status, Orcamento.id_categoria, Orcamento.ano, Orcamento.mes
+        ).filter(Orcamento.id_orcamento.in_(lote)).all()
+        for linha in linhas:
+            encontrados[str(linha.id_orcamento)] = linha._asdict()
+    return encontrados
+
+def _carregar_orcamentos_com_categoria(ids):
+    """{id (texto): (Orcamento, Categoria)} com um SELECT com JOIN por lote de IDs"""
+    encontrados = {}
+    for lote in _lotes_ids(ids):
+        linhas = db.session.query(Orcamento, Categoria)\
+            .outerjoin(Categoria, Categoria.id_categoria == Orcamento.id_categoria)\
+            .filter(Orcamento.id_orcamento.in_(lote)).all()
+        for orcamento, categoria in linhas:
+            encontrados[str(orcamento.id_orcamento)] = (orcamento, categoria)
+    return encontrados
+
+def _snapshot_orcamento(orcamento, categoria):
+    """Dados do orçamento e da categoria guardados nos logs de submissão/reprovação"""
+    return {
+        'id_orcamento': orcamento.id_orcamento,
+        'id_categoria': orcamento.id_categoria,
+        'categoria_nome': categoria.categoria,
+        'master': categoria.master,
+        'uf': categoria.uf,
+        'grupo': categoria.grupo,
+        'mes': orcamento.mes,
+        'ano': orcamento.ano
+    }
+
+# Número do mês (1-12) para ordenar e paginar na ordem do calendário
+ORDEM_MES = case({mes: numero for numero, mes in enumerate(MESES, start=1)}, value=Orcamento.mes)
+
+def _gerar_cursor(ano, mes, id_orcamento):
+    return base64.urlsafe_b64encode(json.dumps([ano, mes, id_orcamento]).encode()).decode()
+
+def _ler_cursor(cursor):
+    """(ano, número do mês, id_orcamento) do último item da página anterior"""
     try:
-        return Decimal(str(value))
-    except (InvalidOperation, ValueError, TypeError):
-        return Decimal('0')
-
-
-def normalize_months(mes_str):
-    """Converte strings de meses (jan, fev, janeiro/fevereiro) em lista de nomes de meses válidos"""
-    if pd.isna(mes_str):
-        return []
-    
-    # Substituir delimitadores comuns por espaços
-    normalized = re.sub(r'[,/;]', ' ', str(mes_str).lower())
-    parts = normalized.split()
-    
-    result = []
-    for part in parts:
-        # Remover pontos (ex: jan.)
-        clean_part = part.strip('.')
-        if clean_part in MONTH_MAP:
-            result.append(MONTH_MAP[clean_part])
-    
-    return list(set(result)) # Remover duplicatas
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        ano, mes, id_orcamento = (int(v) for v in valores)
+    except (TypeError, ValueError, binascii.Error):
+        raise ValueError('cursor inválido')
+    return ano, mes, id_orcamento
+
+def _opcoes_importacao(form):
+    """Lê create_missing, skip_missing e missing_actions do formulário de importação"""
+    create_missing = form.get('create_missing') == 'true'
+    skip_missing = form.get('skip_missing') == 'true'
+    missing_actions_payload = form.get('missing_actions')
+    missing_actions = {}
+    if missing_actions_payload:
+        try:
+            parsed_actions = json.loads(missing_actions_payload)
+            if isinstance(parsed_actions, dict):
+                for key, value in parsed_actions.items():
+                    raw_value = str(value or '').strip()
+                    if raw_value.startswith('use_suggestion:'):
+                        missing_actions[key] = raw_value
+                    else:
+                        normalized = raw_value.lower()
+                        if normalized not in ['create', 'skip']:
+                            normalized = 'skip'
+                        missing_actions[key] = normalized
+        except (json.JSONDecodeError, TypeError):
+            missing_actions = {}
+    return {
+        'create_missing': create_missing,
+        'skip_missing': skip_missing,
+        'missing_actions': missing_actions
+    }
 
 @bp.route('/orcamentos/import', methods=['POST'])
 @jwt_required()
+@require_role('admin')
 def import_orcamentos():
     """Importa orçamentos de arquivo Excel"""
     try:
         user_id = get_jwt_identity()
-        current_user = Usuario.query.get(user_id)
-        
-        if current_user.papel != 'admin':
-            return jsonify({'error': 'Acesso negado'}), 403
-            
-        if 'file' not in request.files:
-            return jsonify({'error': 'Nenhum arquivo enviado'}), 400
-            
-        file = request.files['file']
-        create_missing = request.form.get('create_missing') == 'true'
-        skip_missing = request.form.get('skip_missing') == 'true'
-        missing_actions_payload = request.form.get('missing_actions')
-        missing_actions = {}
-        if missing_actions_payload:
+        current_user = usuario_token()
+
+        opcoes = _opcoes_importacao(request.form)
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        ttl = current_app.config['IMPORT_PREVIEW_TTL']
+        previa = None
+
+        preview_token = request.form.get('preview_token')
+        if preview_token and 'file' not in request.files:
+            # Confirmação: aplica as decisões sobre a prévia, sem reenviar o arquivo
+            previa = PreviaImportacao.abrir(upload_folder, preview_token, current_user.id_usuario, ttl)
+            if not previa:
+                return jsonify({'error': 'Pré-visualização expirada ou inválida. Envie o arquivo novamente.'}), 410
+            importacao = ImportacaoOrcamentos.da_previa(previa, user_id, **opcoes)
+            arquivo = previa.meta['arquivo']
+        else:
+            if 'file' not in request.files:
+                return jsonify({'error': 'Nenhum arquivo enviado'}), 400
+
+            file = request.files['file']
+            if file.filename == '':
+                return jsonify({'error': 'Nenhum arquivo selecionado'}), 400
+
+            # Leitura em blocos: a planilha nunca é carregada inteira na memória
+            importacao = ImportacaoOrcamentos(LeitorPlanilha(file), user_id, **opcoes)
+            arquivo = file.filename
+
+            if not importacao.colunas:
+                return jsonify({
+                    'error': 'Colunas obrigatórias ausentes. Certifique-se de que o Excel possui: Centro de Custo, Grupo, UF, Ano, Mes(es), Valor'
+                }), 400
+
+        # Validar categorias uma vez por combinação
+        missing_categories = importacao.validar()
+
+        # Se houver categorias faltando e o usuário ainda não decidiu o que fazer,
+        # guarda a planilha normalizada para a confirmação
+        if missing_categories and not importacao.decidido:
+            PreviaImportacao.limpar_expiradas(upload_folder, ttl)
+            previa = PreviaImportacao.criar(upload_folder, current_user.id_usuario, arquivo)
             try:
-                parsed_actions = json.loads(missing_actions_payload)
-                if isinstance(parsed_actions, dict):
-                    for key, value in parsed_actions.items():
-                        raw_value = str(value or '').strip()
-                        if raw_value.startswith('use_suggestion:'):
-                            missing_actions[key] = raw_value
-                        else:
-                            normalized = raw_value.lower()
-                            if normalized not in ['create', 'skip']:
-                                normalized = 'skip'
-                            missing_actions[key] = normalized
-            except (json.JSONDecodeError, TypeError):
-                missing_actions = {}
-        
-        if file.filename == '':
-            return jsonify({'error': 'Nenhum arquivo selecionado'}), 400
-            
-        df = pd.read_excel(file)
-        
-        # Mapeamento de colunas (case-insensitive e flexível)
-        col_map = {col.lower(): col for col in df.columns}
-        
-        def get_col(names):
-            for name in names:
-                if name.lower() in col_map:
-                    return col_map[name.lower()]
-            return None
-
-        cc_col = get_col(['Centro de Custo', 'CC', 'Master'])
-        grupo_col = get_col(['Grupo'])
-        uf_col = get_col(['UF'])
-        ano_col = get_col(['Ano'])
-        mes_col = get_col(['Mes(es)', 'Mes', 'Mês', 'Meses'])
-        valor_col = get_col(['Valor', 'Orçado'])
-
-        if not all([cc_col, grupo_col, uf_col, ano_col, mes_col, valor_col]):
-            return jsonify({
-                'error': 'Colunas obrigatórias ausentes. Certifique-se de que o Excel possui: Centro de Custo, Grupo, UF, Ano, Mes(es), Valor'
-            }), 400
-
-        all_categories = Categoria.query.all()
-        categoria_by_key = {}
-        categoria_by_id = {}
-        for categoria in all_categories:
-            candidate_key = build_category_key(categoria.master, categoria.grupo, categoria.uf)
-            if candidate_key not in categoria_by_key:
-                categoria_by_key[candidate_key] = categoria
-            categoria_by_id[categoria.id_categoria] = categoria
-
-        missing_categories = []
-        missing_category_keys = set()
-        valid_items = []
-        
-        # Primeira passada: Validar categorias
-        for index, row in df.iterrows():
-            master = str(row[cc_col]).strip() if pd.notna(row[cc_col]) else None
-            grupo = str(row[grupo_col]).strip() if pd.notna(row[grupo_col]) else None
-            uf = str(row[uf_col]).strip() if pd.notna(row[uf_col]) else None
-            key = build_category_key(master, grupo, uf)
-            
-            # Buscar categoria
-            categoria = categoria_by_key.get(key)
-            suggestion = None
-            if not categoria and key not in missing_category_keys:
-                missing_category_keys.add(key)
-                suggestion = find_best_category_suggestion(master, grupo, uf, all_categories)
-                missing_categories.append({
-                    'master': master,
-                    'grupo': grupo,
-                    'uf': uf,
-                    'key': key,
-                    'suggestion': suggestion
-                })
-            
-            valid_items.append({
-                'index': index,
-                'master': master,
-                'grupo': grupo,
-                'uf': uf,
-                'key': key,
-                'ano': int(row[ano_col]) if pd.notna(row[ano_col]) else None,
-                'meses': normalize_months(row[mes_col]),
-                'valor': to_decimal(row[valor_col]) if pd.notna(row[valor_col]) else Decimal('0'),
-                'categoria_id': categoria.id_categoria if categoria else None
-            })
-
-        # Se houver categorias faltando e o usuário ainda não decidiu o que fazer
-        if missing_categories and not (create_missing or skip_missing or missing_actions):
+                importacao.guardar_previa(previa)
+            except Exception:
+                previa.descartar()
+                raise
             return jsonify({
                 'status': 'missing_categories',
                 'missing': missing_categories,
-                'message': 'Algumas categorias (Centro de Custo/Grupo) não existem.'
+                'message': 'Algumas categorias (Centro de Custo/Grupo) não existem.',
+                'preview_token': previa.token,
+                'preview_expires_in': ttl
             }), 200
 
-        # Processar importação
-        created_count = 0
-        updated_count = 0
-        categories_created = 0
-        created_category_ids = {}
-        
-        for item in valid_items:
-            cat_id = item['categoria_id']
-            
-            if not cat_id:
-                action = None
-                if missing_actions:
-                    action = missing_actions.get(item['key'])
-                if not action:
-                    if create_missing:
-                        action = 'create'
-                    elif skip_missing:
-                        action = 'skip'
-                if action and action.startswith('use_suggestion:'):
-                    try:
-                        suggestion_id = int(action.split(':', 1)[1])
-                    except (ValueError, IndexError):
-                        continue
-                    suggested = categoria_by_id.get(suggestion_id)
-                    if not suggested:
-                        continue
-                    cat_id = suggested.id_categoria
-                elif action == 'create':
-                    if item['key'] in created_category_ids:
-                        cat_id = created_category_ids[item['key']]
-                    else:
-                        new_cat = Categoria(
-                            categoria=item['grupo'],  # Usando grupo como nome da categoria por padrão
-                            master=item['master'],
-                            grupo=item['grupo'],
-                            uf=item['uf']
-                        )
-                        db.session.add(new_cat)
-                        db.session.flush()  # Para pegar o ID
-                        cat_id = new_cat.id_categoria
-                        created_category_ids[item['key']] = cat_id
-                        categories_created += 1
-                elif action == 'skip' or action is None:
-                    continue
-                else:
-                    continue  # Segurança
-
-            for mes in item['meses']:
-                orcamento = Orcamento.query.filter_by(
-                    id_categoria=cat_id,
-                    mes=mes,
-                    ano=item['ano']
-                ).first()
-                
-                if orcamento:
-                    if orcamento.status != 'aprovado':
-                        orcamento.orcado = item['valor']
-                        orcamento.atualizado_por = user_id
-                        updated_count += 1
-                else:
-                    orcamento = Orcamento(
-                        id_categoria=cat_id,
-                        mes=mes,
-                        ano=item['ano'],
-                        orcado=item['valor'],
-                        criado_por=user_id,
-                        status='aguardando_aprovacao'
-                    )
-                    db.session.add(orcamento)
-                    created_count += 1
-
-        db.session.commit()
-        
-        # Log
-        log = Log(
-            id_usuario=current_user.id_usuario,
-            acao=f'Importação Excel: {created_count} criados, {updated_count} atualizados, {categories_created} categorias criadas',
-            tabela_afetada='orcamentos',
-            detalhes={
-                'criados': created_count,
-                'atualizados': updated_count,
-                'categorias_criadas': categories_created,
-                'arquivo': file.filename
-            }
-        )
-        db.session.add(log)
+        # Processar importação: lançamentos, categorias criadas e log numa transação só
+        resumo = importacao.gravar()
+        importacao.registrar_log(current_user.id_usuario, arquivo)
+        marcar_dados_alterados()
         db.session.commit()
 
+        if previa:
+            previa.descartar()
+
         return jsonify({
             'message': 'Importação concluída com sucesso',
-            'created': created_count,
-            'updated': updated_count,
-            'categories_created': categories_created
+            **resumo
         }), 200
 
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/orcamentos/import/jobs', methods=['POST'])
+@jwt_required()
+@require_role('admin')
+def create_import_job():
+    """Enfileira a importação de um arquivo Excel para processamento em segundo plano"""
+    try:
+        verificar_jobs_interrompidos()
+        current_user = usuario_token()
+
+        opcoes = _opcoes_importacao(request.form)
+        preview_token = request.form.get('preview_token')
+        if preview_token and 'file' not in request.files:
+            # Confirmação de uma prévia gerada por um job anterior
+            previa = PreviaImportacao.abrir(current_app.config['UPLOAD_FOLDER'], preview_token,
+                                            current_user.id_usuario, current_app.config['IMPORT_PREVIEW_TTL'])
+            if not previa:
+                return jsonify({'error': 'Pré-visualização expirada ou inválida. Envie o arquivo novamente.'}), 410
+            job = criar_job(None, current_user.id_usuario, opcoes, previa=previa)
+        else:
+            if 'file' not in request.files:
+                return jsonify({'error': 'Nenhum arquivo enviado'}), 400
+
+            file = request.files['file']
+            if file.filename == '':
+                return jsonify({'error': 'Nenhum arquivo selecionado'}), 400
+
+            job = criar_job(file, current_user.id_usuario, opcoes)
+
+        return jsonify(job.to_dict()), 202
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/orcamentos/import/jobs', methods=['GET'])
+@jwt_required()
+def list_import_jobs():
+    """Lista os jobs de importação mais recentes do usuário"""
+    try:
+        verificar_jobs_interrompidos()
+        user_id = get_jwt_identity()
+        jobs = ImportacaoJob.query.filter_by(id_usuario=int(user_id)) \
+            .order_by(ImportacaoJob.criado_em.desc()).limit(20).all()
+        return jsonify([job.to_dict() for job in jobs]), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/orcamentos/import/jobs/<id_job>', methods=['GET'])
+@jwt_required()
+def get_import_job(id_job):
+    """Andamento e resultado de um job de importação"""
+    try:
+        verificar_jobs_interrompidos()
+        current_user = usuario_token()
+
+        job = db.session.get(ImportacaoJob, id_job)
+        if not job:
+            return jsonify({'error': 'Job não encontrado'}), 404
+        if job.id_usuario != current_user.id_usuario and current_user.papel != 'admin':
+            return jsonify({'error': 'Acesso negado'}), 403
+
+        return jsonify(job.to_dict()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/orcamentos', methods=['GET'])
 @jwt_required()
 def list_orcamentos():
@@ -353,10 +297,50 @@ def list_orcamentos():
         if categoria_filter and categoria_filter.strip():
             query = query.filter(Categoria.categoria == categoria_filter)
         
-        orcamentos = query.order_by(Orcamento.ano.desc(), 
-                                    Orcamento.mes).all()
-        
-        return jsonify([o.to_dict(include_categoria=True) for o in orcamentos]), 200
+        # Projeção opcional (?fields=...): só as colunas pedidas saem do banco
+        campos = None
+        if request.args.get('fields'):
+            campos = {c.strip() for c in request.args['fields'].split(',') if c.strip()}
+            invalidos = campos - set(Orcamento.CAMPOS_DICT) - {'categoria'}
+            if invalidos:
+                return jsonify({'error': f'Campos inválidos: {", ".join(sorted(invalidos))}'}), 400
+            colunas = {'id_orcamento', 'ano', 'mes'} | (campos & set(Orcamento.CAMPOS_DICT))
+            query = query.options(load_only(*[getattr(Orcamento, c) for c in colunas]))
+        incluir_categoria = campos is None or 'categoria' in campos
+        if incluir_categoria:
+            # A categoria vem no mesmo JOIN usado pelos filtros, sem lazy load por linha
+            query = query.options(contains_eager(Orcamento.categoria))
+
+        # Paginação por cursor (keyset) em (ano desc, mês, id_orcamento)
+        limite = min(
+            request.args.get('limit', current_app.config['ITEMS_PER_PAGE'], type=int),
+            current_app.config['MAX_ITEMS_PER_PAGE']
+        )
+        if limite < 1:
+            return jsonify({'error': 'limit deve ser maior que zero'}), 400
+        if request.args.get('cursor'):
+            try:
+                cursor_ano, cursor_mes, cursor_id = _ler_cursor(request.args['cursor'])
+            except ValueError:
+                return jsonify({'error': 'Cursor inválido'}), 400
+            query = query.filter(or_(
+                Orcamento.ano < cursor_ano,
+                and_(Orcamento.ano == cursor_ano, or_(
+                    ORDEM_MES > cursor_mes,
+                    and_(ORDEM_MES == cursor_mes, Orcamento.id_orcamento > cursor_id)
+                ))
+            ))
+
+        orcamentos = query.order_by(Orcamento.ano.desc(), ORDEM_MES, Orcamento.id_orcamento)\
+            .limit(limite + 1).all()
+
+        resposta = jsonify([o.to_dict(include_categoria=incluir_categoria, campos=campos)
+                            for o in orcamentos[:limite]])
+        if len(orcamentos) > limite:
+            ultimo = orcamentos[limite - 1]
+            resposta.headers['X-Next-Cursor'] = _gerar_cursor(ultimo.ano, MESES.index(ultimo.mes) + 1,
+                                                              ultimo.id_orcamento)
+        return resposta, 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -406,15 +390,13 @@ def get_orcamentos_categoria_ano(id_categoria, ano):
 
 @bp.route('/orcamentos', methods=['POST'])
 @jwt_required()
+@require_role('admin')
 def create_or_update_orcamento():
     """Cria ou atualiza orçamento (admin)"""
     try:
         user_id = get_jwt_identity()
-        current_user = Usuario.query.get(user_id)
-        
-        if current_user.papel != 'admin':
-            return jsonify({'error': 'Acesso negado'}), 403
-        
+        current_user = usuario_token()
+
         data = request.get_json()
         
         # Validações
@@ -468,6 +450,7 @@ def create_or_update_orcamento():
         if is_new:
             db.session.add(orcamento)
         
+        marcar_dados_alterados()
         db.session.commit()
         
         # Registrar no log
@@ -496,50 +479,78 @@ def create_or_update_orcamento():
 
 @bp.route('/orcamentos/batch_approve', methods=['POST'])
 @jwt_required()
+@require_role('gestor')
 def batch_approve_orcamentos():
     """Aprova múltiplos orçamentos em lote (gestor/admin)"""
     try:
         user_id = get_jwt_identity()
-        current_user = Usuario.query.get(user_id)
-
-        if current_user.papel != 'gestor':
-            return jsonify({'error': 'Acesso negado'}), 403
+        current_user = usuario_token()
 
         data = request.get_json()
         if 'ids' not in data or not isinstance(data['ids'], list):
             return jsonify({'error': 'Lista de IDs de orçamentos inválida'}), 400
 
         orcamento_ids = data['ids']
-        updated_count = 0
         errors = []
 
-        for orc_id in orcamento_ids:
-            orcamento = Orcamento.query.get(orc_id)
-            if not orcamento:
+        # Uma consulta por lote de IDs, em vez de um SELECT por orçamento
+        encontrados = _carregar_chaves_orcamentos(orcamento_ids)
+        candidatos = {}
+        for orc_id in dict.fromkeys(map(str, orcamento_ids)):
+            chave = encontrados.get(orc_id)
+            if chave is None:
                 errors.append(f'Orçamento com ID {orc_id} não encontrado.')
+            elif chave['status'] == 'aprovado':
+                errors.append(f'Orçamento com ID {orc_id} já está aprovado.')
+            else:
+                candidatos[chave['id_orcamento']] = chave
+
+        # Trava as linhas ainda não aprovadas (status nulo conta como não aprovado, como no
+        # fluxo linha a linha) e aprova exatamente essas: o log e o resumo usam a mesma lista
+        nao_aprovado = or_(Orcamento.status.is_(None), Orcamento.status != 'aprovado')
+        agora = datetime.utcnow()
+        atualizados = set()
+        for lote in _lotes_ids(list(candidatos)):
+            ids = [id_orcamento for (id_orcamento,) in db.session.query(Orcamento.id_orcamento)
+                   .filter(Orcamento.id_orcamento.in_(lote), nao_aprovado).with_for_update()]
+            if not ids:
                 continue
+            db.session.execute(
+                update(Orcamento)
+                .where(Orcamento.id_orcamento.in_(ids))
+                .values(status='aprovado', aprovado_por=user_id, data_aprovacao=agora,
+                        atualizado_por=user_id, atualizado_em=agora),
+                execution_options={'synchronize_session': False}
+            )
+            atualizados.update(ids)
+
+        aprovados = [chave for id_orcamento, chave in candidatos.items() if id_orcamento in atualizados]
+        # Aprovados por outra requisição entre a leitura e a trava
+        errors += [f'Orçamento com ID {id_orcamento} já está aprovado.'
+                   for id_orcamento in candidatos if id_orcamento not in atualizados]
+        updated_count = len(aprovados)
+
+        # O UPDATE não passa pelo flush da sessão: atualiza o resumo materializado aqui
+        atualizar_resumo_materializado(
+            db.session.connection(),
+            {(p['id_categoria'], p['ano'], p['mes']) for p in aprovados}
+        )
 
-            if orcamento.status == 'aprovado':
-                # já aprovado, pular
-                continue
-
-            orcamento.status = 'aprovado'
-            orcamento.aprovado_por = user_id
-            orcamento.data_aprovacao = datetime.utcnow()
-            orcamento.atualizado_por = user_id
-            updated_count += 1
-
-        db.session.commit()
-
-        # Registrar no log
+        # Registrar no log, na mesma transação da aprovação
         log = Log(
             id_usuario=current_user.id_usuario,
             acao=f'Aprovação em lote: {updated_count} aprovados',
             tabela_afetada='orcamentos',
             id_registro=None,
-            detalhes={'ids': orcamento_ids, 'atualizados': updated_count, 'erros': len(errors)}
+            detalhes={
+                'ids': orcamento_ids,
+                'aprovados': [p['id_orcamento'] for p in aprovados],
+                'atualizados': updated_count,
+                'erros': len(errors)
+            }
         )
         db.session.add(log)
+        marcar_dados_alterados()
         db.session.commit()
 
         return jsonify({'message': f'{updated_count} orçamentos aprovados.', 'errors': errors}), 200
@@ -550,14 +561,12 @@ def batch_approve_orcamentos():
 
 @bp.route('/orcamentos/batch_reprove', methods=['POST'])
 @jwt_required()
+@require_role('gestor', 'admin')
 def batch_reprove_orcamentos():
     """Reprova (marca como reprovado) múltiplos orçamentos em lote (gestor/admin)"""
     try:
         user_id = get_jwt_identity()
-        current_user = Usuario.query.get(user_id)
-
-        if current_user.papel not in ['gestor', 'admin']:
-            return jsonify({'error': 'Acesso negado'}), 403
+        current_user = usuario_token()
 
         data = request.get_json()
         if 'ids' not in data or not isinstance(data['ids'], list):
@@ -569,11 +578,13 @@ def batch_reprove_orcamentos():
         errors = []
         reprovados_detalhes = []
 
-        for orc_id in orcamento_ids:
-            orcamento = Orcamento.query.get(orc_id)
-            if not orcamento:
+        # Orçamentos e categorias em um único SELECT por lote, sem consultas por linha
+        encontrados = _carregar_orcamentos_com_categoria(orcamento_ids)
+        for orc_id in dict.fromkeys(map(str, orcamento_ids)):
+            if orc_id not in encontrados:
                 errors.append(f'Orçamento com ID {orc_id} não encontrado.')
                 continue
+            orcamento, categoria = encontrados[orc_id]
 
             orcamento.status = 'reprovado'
             orcamento.aprovado_por = None
@@ -582,19 +593,10 @@ def batch_reprove_orcamentos():
             updated_count += 1
             
             # Coletar informações para o log
-            categoria = Categoria.query.get(orcamento.id_categoria)
             if categoria:
-                reprovados_detalhes.append({
-                    'id_orcamento': orcamento.id_orcamento,
-                    'id_categoria': orcamento.id_categoria,
-                    'categoria_nome': categoria.categoria,
-                    'master': categoria.master,
-                    'uf': categoria.uf,
-                    'grupo': categoria.grupo,
-                    'mes': orcamento.mes,
-                    'ano': orcamento.ano
-                })
+                reprovados_detalhes.append(_snapshot_orcamento(orcamento, categoria))
 
+        marcar_dados_alterados()
         db.session.commit()
 
         # Registrar reprovação no log com detalhes para rastreamento pelo admin
@@ -614,6 +616,7 @@ def batch_reprove_orcamentos():
                 }
             )
             db.session.add(log)
+            registrar_reprovacao(log, reprovados_detalhes, motivo, current_user.nome, total=updated_count)
             db.session.commit()
 
         return jsonify({'message': f'{updated_count} orçamentos reprovados.', 'errors': errors}), 200
@@ -624,120 +627,53 @@ def batch_reprove_orcamentos():
 @bp.route('/orcamentos/filtros', methods=['GET'])
 @jwt_required()
 def get_orcamento_filtros():
-    """Retorna valores únicos para os filtros da tela de lançamentos"""
+    """Retorna valores únicos para os filtros da tela de lançamentos (catálogo compartilhado)"""
     try:
-        anos = db.session.query(Orcamento.ano).distinct().order_by(Orcamento.ano.desc()).all()
-        status = db.session.query(Orcamento.status).distinct().order_by(Orcamento.status).all()
-        
-        # Filtros que vêm da tabela de Categoria
-        ufs = db.session.query(Categoria.uf).distinct().order_by(Categoria.uf).all()
-        masters = db.session.query(Categoria.master).distinct().order_by(Categoria.master).all()
-        
-        # Lista de categorias distintas para o novo filtro
-        categorias_q = db.session.query(Categoria.categoria).distinct().order_by(Categoria.categoria).all()
+        return jsonify(catalogo_dimensoes('anos', 'status', 'ufs', 'masters', 'categorias')), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        return jsonify({
-            'anos': [a[0] for a in anos if a[0]],
-            'status': [s[0] for s in status if s[0]],
-            'ufs': [u[0] for u in ufs if u[0]],
-            'masters': [m[0] for m in masters if m[0]],
-            'categorias': [c[0] for c in categorias_q if c[0]]
-        }), 200
+@bp.route('/orcamentos/status', methods=['GET'])
+@jwt_required()
+@resposta_em_cache
+def get_status_contagens():
+    """Quantidade de orçamentos por status (contadores do menu lateral)
+
+    Filtros: ano, uf, master; por: ano, uf e/ou master separados por vírgula
+    """
+    try:
+        por = [d.strip() for d in request.args.get('por', '').split(',') if d.strip()]
+        histograma = histograma_status(
+            ano=request.args.get('ano', type=int),
+            uf=request.args.get('uf'),
+            master=request.args.get('master'),
+            por=por
+        )
+        return jsonify(histograma if not por else {'por': por, 'grupos': histograma}), 200
+    except AgrupamentoInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @bp.route('/orcamentos/batch', methods=['POST'])
 @jwt_required()
+@require_role('admin', 'gestor')
 def batch_update_orcamentos():
     """Atualiza múltiplos orçamentos de uma vez, com permissões granulares."""
     try:
-        user_id = get_jwt_identity()
-        current_user = Usuario.query.get(user_id)
-        
-        # Permitir acesso para admin e gestor
-        if current_user.papel not in ['admin', 'gestor']:
-            return jsonify({'error': 'Acesso negado'}), 403
-        
+        current_user = usuario_token()
+
         data = request.get_json()
         
         if 'orcamentos' not in data or not isinstance(data['orcamentos'], list):
             return jsonify({'error': 'Lista de orçamentos inválida'}), 400
         
-        updated = 0
-        created = 0
-        errors = []
-        processed_orcamentos = []
-        
-        for orc_data in data['orcamentos']:
-            try:
-                # Validar dados mínimos para busca ou criação
-                if 'id_categoria' not in orc_data or 'mes' not in orc_data or 'ano' not in orc_data:
-                    errors.append(f'Dados incompletos para um orçamento: {orc_data}')
-                    continue
-                
-                # Garante que o mês seja o nome, não o número
-                mes_valor = orc_data['mes']
-                mes_nome = MESES[mes_valor - 1] if isinstance(mes_valor, int) and 1 <= mes_valor <= 12 else mes_valor
-
-                # Buscar ou criar
-                orcamento = Orcamento.query.filter_by(
-                    id_categoria=orc_data['id_categoria'],
-                    mes=mes_nome,
-                    ano=orc_data['ano']
-                ).first()
-                
-                if orcamento: # Orçamento existente
-                    if orcamento.status == 'aprovado':
-                        if 'realizado' in orc_data:
-                            orcamento.realizado = orc_data['realizado']
-                            orcamento.atualizado_por = user_id
-                            updated += 1
-                        # Outras alterações em orçamentos aprovados são ignoradas
-                    elif current_user.papel == 'admin': # Não aprovado, apenas admin pode editar
-                        orcamento.atualizado_por = user_id
-                        if 'orcado' in orc_data:
-                            orcamento.orcado = orc_data['orcado']
-                        if 'realizado' in orc_data:
-                            orcamento.realizado = orc_data['realizado']
-                        if 'status' in orc_data and orc_data['status']:
-                            orcamento.status = orc_data['status']
-                        updated += 1
-                    else:
-                        errors.append(f'Apenas administradores podem editar orçamentos com status "{orcamento.status}".')
-
-                else: # Novo orçamento
-                    if current_user.papel == 'admin':
-                        orcamento = Orcamento(
-                            id_categoria=orc_data['id_categoria'],
-                            mes=mes_nome,
-                            ano=orc_data['ano'],
-                            criado_por=user_id,
-                            status='rascunho'
-                        )
-                        db.session.add(orcamento)
-                        if 'orcado' in orc_data:
-                            orcamento.orcado = orc_data['orcado']
-                        if 'realizado' in orc_data:
-                            orcamento.realizado = orc_data['realizado']
-                        if 'status' in orc_data and orc_data['status']:
-                            orcamento.status = orc_data['status']
-                        created += 1
-                    else:
-                        errors.append('Apenas administradores podem criar novos orçamentos.')
-
-            except Exception as e:
-                errors.append(f'Erro processando {orc_data.get("id_categoria", "N/A")}: {str(e)}')
-
-        db.session.flush()
-        for orc_data in data['orcamentos']:
-            try:
-                mes_nome = MESES[orc_data['mes'] - 1] if isinstance(orc_data['mes'], int) else orc_data['mes']
-                orc = Orcamento.query.filter_by(id_categoria=orc_data['id_categoria'], mes=mes_nome, ano=orc_data['ano']).first()
-                if orc:
-                    processed_orcamentos.append({'id_orcamento': orc.id_orcamento})
-            except (KeyError, TypeError): # Lida com orc_data malformado que já foi logado
-                pass
+        # Uma passada: chaves resolvidas em lote, regras aplicadas em memória, gravação em massa
+        lote = LoteOrcamentos(db.session, current_user)
+        processed_orcamentos = lote.processar(data['orcamentos'])
+        created, updated, errors = lote.created, lote.updated, lote.errors
 
+        marcar_dados_alterados()
         db.session.commit()
         
         # Registrar no log
@@ -765,14 +701,12 @@ def batch_update_orcamentos():
 
 @bp.route('/orcamentos/batch_submit', methods=['POST'])
 @jwt_required()
+@require_role('admin')
 def batch_submit_orcamentos():
     """Submete múltiplos orçamentos para aprovação."""
     try:
         user_id = get_jwt_identity()
-        current_user = Usuario.query.get(user_id)
-
-        if current_user.papel != 'admin':
-            return jsonify({'error': 'Acesso negado'}), 403
+        current_user = usuario_token()
 
         data = request.get_json()
         if 'ids' not in data or not isinstance(data['ids'], list):
@@ -783,32 +717,27 @@ def batch_submit_orcamentos():
         errors = []
         submitted_orcamentos = []
 
-        for orc_id in orcamento_ids:
-            orcamento = Orcamento.query.get(orc_id)
-            if not orcamento:
+        # Orçamentos e categorias em um único SELECT por lote, sem consultas por linha
+        encontrados = _carregar_orcamentos_com_categoria(orcamento_ids)
+        for orc_id in dict.fromkeys(map(str, orcamento_ids)):
+            if orc_id not in encontrados:
                 errors.append(f'Orçamento com ID {orc_id} não encontrado.')
                 continue
+            orcamento, categoria = encontrados[orc_id]
             
             if orcamento.status in ['rascunho', 'reprovado']:
                 orcamento.status = 'aguardando_aprovacao'
                 orcamento.atualizado_por = user_id
                 updated_count += 1
                 # Coletar informações para o log
-                categoria = Categoria.query.get(orcamento.id_categoria)
                 if categoria:
                     submitted_orcamentos.append({
-                        'id_orcamento': orcamento.id_orcamento,
-                        'id_categoria': orcamento.id_categoria,
-                        'categoria_nome': categoria.categoria,
-                        'master': categoria.master,
-                        'uf': categoria.uf,
-                        'grupo': categoria.grupo,
-                        'mes': orcamento.mes,
-                        'ano': orcamento.ano,
+                        **_snapshot_orcamento(orcamento, categoria),
                         'orcado': float(orcamento.orcado),
                         'realizado': float(orcamento.realizado)
                     })
 
+        marcar_dados_alterados()
         db.session.commit()
 
         # Registrar submissão no log com detalhes para rastreamento pelo gestor
@@ -826,6 +755,7 @@ def batch_submit_orcamentos():
                 }
             )
             db.session.add(log)
+            registrar_submissao(log, submitted_orcamentos)
             db.session.commit()
 
         return jsonify({
@@ -838,15 +768,13 @@ def batch_submit_orcamentos():
 
 @bp.route('/orcamentos/<int:id_orcamento>/aprovar', methods=['POST'])
 @jwt_required()
+@require_role('gestor')
 def aprovar_orcamento(id_orcamento):
     """Aprova um orçamento (apenas gestor ou admin)"""
     try:
         user_id = get_jwt_identity()
-        current_user = Usuario.query.get(user_id)
-        
-        if current_user.papel != 'gestor':
-            return jsonify({'error': 'Acesso negado'}), 403
-        
+        current_user = usuario_token()
+
         orcamento = Orcamento.query.get(id_orcamento)
         if not orcamento:
             return jsonify({'error': 'Orçamento não encontrado'}), 404
@@ -858,6 +786,7 @@ def aprovar_orcamento(id_orcamento):
         orcamento.aprovado_por = user_id
         orcamento.data_aprovacao = datetime.utcnow()
         
+        marcar_dados_alterados()
         db.session.commit()
         
         # Registrar no log
@@ -879,15 +808,12 @@ def aprovar_orcamento(id_orcamento):
 
 @bp.route('/orcamentos/<int:id_orcamento>/reprovar', methods=['POST'])
 @jwt_required()
+@require_role('gestor', 'admin')
 def reprovar_orcamento(id_orcamento):
     """Reprova um orçamento (apenas gestor ou admin) — marca como 'reprovado'"""
     try:
-        user_id = get_jwt_identity()
-        current_user = Usuario.query.get(user_id)
-        
-        if current_user.papel not in ['gestor', 'admin']:
-            return jsonify({'error': 'Acesso negado'}), 403
-        
+        current_user = usuario_token()
+
         orcamento = Orcamento.query.get(id_orcamento)
         if not orcamento:
             return jsonify({'error': 'Orçamento não encontrado'}), 404
@@ -899,6 +825,7 @@ def reprovar_orcamento(id_orcamento):
         orcamento.aprovado_por = None
         orcamento.data_aprovacao = None
         
+        marcar_dados_alterados()
         db.session.commit()
         
         # Registrar no log
@@ -913,6 +840,8 @@ def reprovar_orcamento(id_orcamento):
             }
         )
         db.session.add(log)
+        itens = [_snapshot_orcamento(orcamento, orcamento.categoria)] if orcamento.categoria else []
+        registrar_reprovacao(log, itens, motivo, current_user.nome, tipo='individual')
         db.session.commit()
         
         return jsonify(orcamento.to_dict(include_categoria=True)), 200
@@ -923,15 +852,12 @@ def reprovar_orcamento(id_orcamento):
 
 @bp.route('/orcamentos/<int:id_orcamento>', methods=['DELETE'])
 @jwt_required()
+@require_role('admin')
 def delete_orcamento(id_orcamento):
     """Deleta orçamento (apenas admin)"""
     try:
-        user_id = get_jwt_identity()
-        current_user = Usuario.query.get(user_id)
-        
-        if current_user.papel != 'admin':
-            return jsonify({'error': 'Acesso negado'}), 403
-        
+        current_user = usuario_token()
+
         orcamento = Orcamento.query.get(id_orcamento)
         if not orcamento:
             return jsonify({'error': 'Orçamento não encontrado'}), 404
@@ -939,6 +865,7 @@ def delete_orcamento(id_orcamento):
         orcamento_data = orcamento.to_dict(include_categoria=True)
         
         db.session.delete(orcamento)
+        marcar_dados_alterados()
         db.session.commit()
         
         # Registrar no log
@@ -961,228 +888,48 @@ def delete_orcamento(id_orcamento):
 
 @bp.route('/orcamentos/submissions', methods=['GET'])
 @jwt_required()
+@require_role('gestor')
 def get_submissions():
-    """Retorna submissões de orçamentos para o gestor (logs com detalhes de submissões + orçamentos soltos em aguardando_aprovacao)"""
+    """Retorna submissões para o gestor, paginadas e filtradas por ano, mes, master e uf"""
     try:
-        user_id = get_jwt_identity()
-        current_user = Usuario.query.get(user_id)
+        # Paginação
+        page = request.args.get('page', 1, type=int)
+        per_page = min(request.args.get('per_page', 20, type=int), 100)
 
-        if current_user.papel != 'gestor':
-            return jsonify({'error': 'Acesso negado'}), 403
-
-        # 1. Buscar logs de submissão em lote (ação contém 'Submissão em lote')
-        logs = db.session.query(Log).filter(
-            Log.acao.contains('Submissão em lote'),
-            Log.tabela_afetada == 'orcamentos'
-        ).order_by(Log.timestamp.desc()).all()
+        # Filtros (mês aceita número ou nome)
+        mes = request.args.get('mes')
+        if mes and mes.isdigit() and 1 <= int(mes) <= 12:
+            mes = MESES[int(mes) - 1]
+        filtros = {
+            'ano': request.args.get('ano', type=int),
+            'mes': mes,
+            'master': request.args.get('master'),
+            'uf': request.args.get('uf')
+        }
 
-        resultado = []
-        orcamento_ids_em_logs = set()
-        
-        for log in logs:
-            # Extrair detalhes do log
-            detalhes = log.detalhes or {}
-            orcamentos_submetidos = detalhes.get('orcamentos_submetidos', [])
-            
-            # Coletar IDs dos orçamentos neste log
-            for orc in orcamentos_submetidos:
-                orc_id = orc.get('id_orcamento')
-                orcamento_ids_em_logs.add(orc_id)
-                
-                # Buscar objeto atual do banco para hidratação
-                db_orc = Orcamento.query.get(orc_id)
-                
-                # Hidratar com valor atual do banco se não estiver no log (logs antigos)
-                # ou para garantir valor atualizado
-                if 'orcado' not in orc:
-                    if db_orc:
-                        orc['orcado'] = float(db_orc.orcado)
-                        orc['realizado'] = float(db_orc.realizado)
-                    else:
-                        orc['orcado'] = 0.0
-                        orc['realizado'] = 0.0
-                
-                # Hidratar detalhes da categoria se não estiverem no log
-                if 'categoria_nome' not in orc or 'master' not in orc:
-                    if db_orc:
-                        categoria = Categoria.query.get(db_orc.id_categoria)
-                        if categoria:
-                            orc['categoria_nome'] = categoria.categoria
-                            orc['master'] = categoria.master
-                            orc['uf'] = categoria.uf
-                            orc['grupo'] = categoria.grupo
-                            # Garantir mes/ano também
-                            if 'mes' not in orc: orc['mes'] = db_orc.mes
-                            if 'ano' not in orc: orc['ano'] = db_orc.ano
-            
-            # Agrupar por master, uf, categoria para exibição
-            primeiro_orcamento = orcamentos_submetidos[0] if orcamentos_submetidos else {}
-            submission = {
-                'id_log': log.id_log,
-                'data': log.timestamp.isoformat() if log.timestamp else None,
-                'admin_usuario': log.usuario.nome if log.usuario else 'Desconhecido',
-                'total_submetidos': detalhes.get('total_submetidos', 0),
-                'ano': primeiro_orcamento.get('ano'),
-                'mes': primeiro_orcamento.get('mes'),
-                'orcamentos': orcamentos_submetidos,
-                # Agrupar únicos para filtro rápido
-                'masters': list(set([o.get('master') for o in orcamentos_submetidos if o.get('master')])),
-                'ufs': list(set([o.get('uf') for o in orcamentos_submetidos if o.get('uf')])),
-                'categorias': list(set([o.get('categoria_nome') for o in orcamentos_submetidos if o.get('categoria_nome')])),
-            }
-            resultado.append(submission)
-        
-        # 2. Buscar orçamentos em 'aguardando_aprovacao' que não estão em nenhum log (foram adicionados manualmente)
-        orcamentos_soltos = Orcamento.query.filter(
-            Orcamento.status == 'aguardando_aprovacao'
-        ).all()
-        
-        # Criar uma "submissão virtual" para os orçamentos sem log
-        orcamentos_sem_log = []
-        for orc in orcamentos_soltos:
-            if orc.id_orcamento not in orcamento_ids_em_logs:
-                categoria = Categoria.query.get(orc.id_categoria)
-                if categoria:
-                    orcamentos_sem_log.append({
-                        'id_orcamento': orc.id_orcamento,
-                        'id_categoria': orc.id_categoria,
-                        'categoria_nome': categoria.categoria,
-                        'master': categoria.master,
-                        'uf': categoria.uf,
-                        'grupo': categoria.grupo,
-                        'mes': orc.mes,
-                        'ano': orc.ano,
-                        'orcado': float(orc.orcado),
-                        'realizado': float(orc.realizado)
-                    })
-        
-        # Se houver orçamentos sem log, criar uma submissão virtual
-        if orcamentos_sem_log:
-            primeiro_orcamento_virtual = orcamentos_sem_log[0] if orcamentos_sem_log else {}
-            virtual_submission = {
-                'id_log': None,  # Sem log real
-                'data': None,
-                'admin_usuario': 'Importado',
-                'total_submetidos': len(orcamentos_sem_log),
-                'ano': primeiro_orcamento_virtual.get('ano'),
-                'mes': primeiro_orcamento_virtual.get('mes'),
-                'orcamentos': orcamentos_sem_log,
-                'masters': list(set([o.get('master') for o in orcamentos_sem_log if o.get('master')])),
-                'ufs': list(set([o.get('uf') for o in orcamentos_sem_log if o.get('uf')])),
-                'categorias': list(set([o.get('categoria_nome') for o in orcamentos_sem_log if o.get('categoria_nome')])),
+        submissoes, pagination = listar_submissoes(filtros, page, per_page)
+        return jsonify({
+            'submissoes': submissoes,
+            'filtros': filtros_submissoes(),
+            'pendentes': pendentes(**filtros),
+            'pagination': {
+                'page': page,
+                'per_page': per_page,
+                'total': pagination.total,
+                'pages': pagination.pages,
+                'has_next': pagination.has_next,
+                'has_prev': pagination.has_prev
             }
-            resultado.insert(0, virtual_submission)  # Adicionar no início
-
-        return jsonify(resultado), 200
+        }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @bp.route('/orcamentos/rejections', methods=['GET'])
 @jwt_required()
+@require_role('admin')
 def get_rejections():
-    """Retorna rejeições de orçamentos para o admin (logs com detalhes de reprovações em lote e individuais)"""
+    """Retorna rejeições de orçamentos para o admin (reprovações em lote e individuais)"""
     try:
-        user_id = get_jwt_identity()
-        current_user = Usuario.query.get(user_id)
-
-        if current_user.papel != 'admin':
-            return jsonify({'error': 'Acesso negado'}), 403
-
-        resultado = []
-
-        # 1. Buscar logs de reprovação em lote (ação contém 'Reprovação em lote')
-        logs_lote = db.session.query(Log).filter(
-            Log.acao.contains('Reprovação em lote'),
-            Log.tabela_afetada == 'orcamentos'
-        ).order_by(Log.timestamp.desc()).all()
-
-        for log in logs_lote:
-            detalhes = log.detalhes or {}
-            orcamentos_reprovados = detalhes.get('orcamentos_reprovados', [])
-            
-            primeiro_orcamento_reprovado = orcamentos_reprovados[0] if orcamentos_reprovados else {}
-            rejection = {
-                'id_log': log.id_log,
-                'data': log.timestamp.isoformat() if log.timestamp else None,
-                'gestor_usuario': detalhes.get('gestor_usuario', log.usuario.nome if log.usuario else 'Desconhecido'),
-                'total_reprovados': detalhes.get('total_reprovados', 0),
-                'motivo': detalhes.get('motivo', 'Sem motivo especificado'),
-                'tipo': 'lote',
-                'ano': primeiro_orcamento_reprovado.get('ano'),
-                'mes': primeiro_orcamento_reprovado.get('mes'),
-                'orcamentos': orcamentos_reprovados,
-                'masters': list(set([o.get('master') for o in orcamentos_reprovados if o.get('master')])),
-                'ufs': list(set([o.get('uf') for o in orcamentos_reprovados if o.get('uf')])),
-                'categorias': list(set([o.get('categoria_nome') for o in orcamentos_reprovados if o.get('categoria_nome')])),
-            }
-            resultado.append(rejection)
-
-        # 2. Buscar logs de reprovações individuais (ação contém 'Reprovou')
-        logs_individuais = db.session.query(Log).filter(
-            Log.acao.contains('Reprovou'),
-            Log.tabela_afetada == 'orcamentos'
-        ).order_by(Log.timestamp.desc()).all()
-
-        # Agrupar reprovações individuais por data/gestor
-        reprovacoes_por_gestor = {}
-        for log in logs_individuais:
-            detalhes = log.detalhes or {}
-            orcamento = detalhes.get('orcamento', {})
-            motivo = detalhes.get('motivo', 'Sem motivo especificado')
-            
-            # Chave para agrupar: data do log + id do usuário + motivo
-            key = (log.timestamp, log.id_usuario, motivo)
-            
-            if key not in reprovacoes_por_gestor:
-                reprovacoes_por_gestor[key] = {
-                    'id_log': log.id_log,
-                    'data': log.timestamp.isoformat() if log.timestamp else None,
-                    'gestor_usuario': log.usuario.nome if log.usuario else 'Desconhecido',
-                    'motivo': motivo,
-                    'tipo': 'individual',
-                    'orcamentos': [],
-                    'masters': set(),
-                    'ufs': set(),
-                    'categorias': set(),
-                    'ano': None, # Será preenchido abaixo
-                    'mes': None, # Será preenchido abaixo
-                }
-            
-            if orcamento:
-                categoria = Categoria.query.get(orcamento.get('id_categoria'))
-                orc_detail = {
-                    'id_orcamento': orcamento.get('id_orcamento'),
-                    'id_categoria': orcamento.get('id_categoria'),
-                    'categoria_nome': categoria.categoria if categoria else 'Desconhecida',
-                    'master': categoria.master if categoria else '-',
-                    'uf': categoria.uf if categoria else '-',
-                    'grupo': categoria.grupo if categoria else '-',
-                    'mes': orcamento.get('mes'),
-                    'ano': orcamento.get('ano'),
-                }
-                reprovacoes_por_gestor[key]['orcamentos'].append(orc_detail)
-                if categoria:
-                    reprovacoes_por_gestor[key]['masters'].add(categoria.master)
-                    reprovacoes_por_gestor[key]['ufs'].add(categoria.uf)
-                    reprovacoes_por_gestor[key]['categorias'].add(categoria.categoria)
-                
-                # Preencher ano e mês do grupo com o primeiro orçamento encontrado
-                if not reprovacoes_por_gestor[key]['ano'] and orc_detail.get('ano'):
-                    reprovacoes_por_gestor[key]['ano'] = orc_detail.get('ano')
-                if not reprovacoes_por_gestor[key]['mes'] and orc_detail.get('mes'):
-                    reprovacoes_por_gestor[key]['mes'] = orc_detail.get('mes')
-
-        # Converter sets para lists e calcular total
-        for rejection_group in reprovacoes_por_gestor.values():
-            rejection_group['total_reprovados'] = len(rejection_group['orcamentos'])
-            rejection_group['masters'] = list(rejection_group['masters'])
-            rejection_group['ufs'] = list(rejection_group['ufs'])
-            rejection_group['categorias'] = list(rejection_group['categorias'])
-            resultado.append(rejection_group)
-
-        # Ordenar por data decrescente
-        resultado.sort(key=lambda x: x['data'] if x['data'] else '', reverse=True)
-
-        return jsonify(resultado), 200
+        return jsonify(listar_reprovacoes()), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
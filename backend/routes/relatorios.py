@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, send_file
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Usuario, ResumoOrcamento, Orcamento, Categoria
+from models import db, Usuario, Orcamento, Categoria
+from services.resumo import Resumo, ORDEM_MES, consulta_resumo, linha_resumo
 from sqlalchemy import and_, or_
 import pandas as pd
 from io import BytesIO
@@ -21,29 +22,29 @@ def get_relatorios():
         grupo = request.args.get('grupo')
         mes = request.args.get('mes')
         
-        # Query base na view
-        query = ResumoOrcamento.query
+        # Query base no resumo materializado (mesmas colunas da view)
+        query = consulta_resumo()
         
         # Aplicar filtros
         if ano:
-            query = query.filter(ResumoOrcamento.ano == ano)
+            query = query.filter(Resumo.ano == ano)
         if categoria:
-            query = query.filter(ResumoOrcamento.categoria == categoria)
+            query = query.filter(Categoria.categoria == categoria)
         if uf:
-            query = query.filter(ResumoOrcamento.uf == uf)
+            query = query.filter(Categoria.uf == uf)
         if grupo:
-            query = query.filter(ResumoOrcamento.grupo == grupo)
+            query = query.filter(Categoria.grupo == grupo)
         if mes:
-            query = query.filter(ResumoOrcamento.mes == mes)
+            query = query.filter(Resumo.mes == mes)
         
         # Ordenar
         resultados = query.order_by(
-            ResumoOrcamento.ano.desc(),
-            ResumoOrcamento.categoria,
-            ResumoOrcamento.grupo
+            Resumo.ano.desc(),
+            Categoria.categoria,
+            Categoria.grupo
         ).all()
         
-        return jsonify([r.to_dict() for r in resultados]), 200
+        return jsonify([linha_resumo(r) for r in resultados]), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -101,18 +102,19 @@ def export_excel():
         grupo = request.args.get('grupo')
         
         # Query
-        query = ResumoOrcamento.query
+        query = consulta_resumo()
         
         if ano:
-            query = query.filter(ResumoOrcamento.ano == ano)
+            query = query.filter(Resumo.ano == ano)
         if categoria:
-            query = query.filter(ResumoOrcamento.categoria == categoria)
+            query = query.filter(Categoria.categoria == categoria)
         if uf:
-            query = query.filter(ResumoOrcamento.uf == uf)
+            query = query.filter(Categoria.uf == uf)
         if grupo:
-            query = query.filter(ResumoOrcamento.grupo == grupo)
+            query = query.filter(Categoria.grupo == grupo)
         
-        resultados = query.all()
+        # A tabela materializada não tem a ordem da view: ano mais recente, meses em ordem
+        resultados = query.order_by(Resumo.ano.desc(), ORDEM_MES, Categoria.categoria).all()
         
         # Converter para DataFrame
         dados = [{
@@ -204,18 +206,21 @@ def export_pdf():
         grupo = request.args.get('grupo')
         
         # Query
-        query = ResumoOrcamento.query
+        query = consulta_resumo()
         
         if ano:
-            query = query.filter(ResumoOrcamento.ano == ano)
+            query = query.filter(Resumo.ano == ano)
         if categoria:
-            query = query.filter(ResumoOrcamento.categoria == categoria)
+            query = query.filter(Categoria.categoria == categoria)
         if uf:
-            query = query.filter(ResumoOrcamento.uf == uf)
+            query = query.filter(Categoria.uf == uf)
         if grupo:
-            query = query.filter(ResumoOrcamento.grupo == grupo)
+            query = query.filter(Categoria.grupo == grupo)
         
-        resultados = query.limit(100).all()  # Limitar para não sobrecarregar PDF
+        # Ordem fixa antes do limite: as 100 linhas são sempre as mesmas para os mesmos filtros
+        resultados = query.order_by(
+            Resumo.ano.desc(), ORDEM_MES, Categoria.categoria
+        ).limit(100).all()  # Limitar para não sobrecarregar PDF
         
         # Criar PDF em memória
         output = BytesIO()
@@ -393,19 +398,19 @@ def get_comparativo():
             return jsonify({'error': 'Anos são obrigatórios'}), 400
         
         # Dados ano 1
-        dados_ano1 = ResumoOrcamento.query.filter_by(ano=ano1).all()
+        dados_ano1 = consulta_resumo().filter(Resumo.ano == ano1).all()
         
         # Dados ano 2
-        dados_ano2 = ResumoOrcamento.query.filter_by(ano=ano2).all()
+        dados_ano2 = consulta_resumo().filter(Resumo.ano == ano2).all()
         
         return jsonify({
             'ano1': {
                 'ano': ano1,
-                'dados': [d.to_dict() for d in dados_ano1]
+                'dados': [linha_resumo(d) for d in dados_ano1]
             },
             'ano2': {
                 'ano': ano2,
-                'dados': [d.to_dict() for d in dados_ano2]
+                'dados': [linha_resumo(d) for d in dados_ano2]
             }
         }), 200
         
@@ -43,16 +43,18 @@ def create_app(config_name='default'):
         origins=cors_origins, 
         supports_credentials=True,
         methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        allow_headers=["Content-Type", "Authorization", "X-Requested-With"]
+        allow_headers=["Content-Type", "Authorization", "X-Requested-With"],
+        expose_headers=["X-Next-Cursor"]
     )
     jwt = JWTManager(app)
 
     @jwt.token_in_blocklist_loader
     def check_if_token_revoked(_, payload):
-        from models import TokenBlacklist
-        jti = payload['jti']
-        token = TokenBlacklist.query.filter_by(jti=jti).first()
-        return token is not None
+        # Set de jti revogados por processo (services/revogacao_tokens.py), sem consulta por requisição;
+        # tokens sem claims ou de usuário alterado depois da emissão também são recusados
+        from services.revogacao_tokens import token_revogado
+        from services.autorizacao import token_desatualizado
+        return token_revogado(payload['jti']) or token_desatualizado(payload)
     
     # Criar diretórios necessários
     print(f"Using config: {config_name}")
@@ -61,7 +63,7 @@ def create_app(config_name='default'):
     os.makedirs(app.config['EXPORT_FOLDER'], exist_ok=True)
     
     # Registrar blueprints
-    from routes import auth, categorias, orcamentos, dashboard, relatorios, logs
+    from routes import auth, categorias, orcamentos, dashboard, relatorios, logs, analytics
     
     # Registrar blueprints sob o prefixo /api para coincidir com o frontend
     api_prefix = '/api'
@@ -71,6 +73,7 @@ def create_app(config_name='default'):
     app.register_blueprint(dashboard.bp, url_prefix=api_prefix)
     app.register_blueprint(relatorios.bp, url_prefix=api_prefix)
     app.register_blueprint(logs.bp, url_prefix=api_prefix)
+    app.register_blueprint(analytics.bp, url_prefix=api_prefix)
 
     # Handlers de erro JWT
     @jwt.expired_token_loader
@@ -0,0 +1,4 @@
+"""
+Módulo de serviços da aplicação
+Concentra a lógica compartilhada entre os blueprints (importação, agregações e caches)
+"""
@@ -0,0 +1,252 @@
+"""
+Agregações do dashboard a partir de uma única consulta
+- Os fatos aprovados vêm agrupados em (mes, master, categoria) em um só round trip
+- Totais, série mensal, top centros de custo e visão por categoria são derivados em memória
+- As somas continuam em Decimal, então os valores são idênticos aos do SUM no banco
+- `ResumoStatus` resolve KPIs e comparativo anual em outra consulta agrupada em (ano, status);
+  juntas, as duas alimentam o GET /dashboard/bundle
+- `TendenciaOrcamentos` agrupa um intervalo de anos em (ano, mes) numa consulta; YoY e CAGR
+  saem de matrizes NumPy (anos x meses)
+"""
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal
+
+import numpy as np
+from sqlalchemy import func, or_, select
+
+from models import db, Orcamento, Categoria
+from services.comum import MESES, somar
+
+Fato = namedtuple('Fato', ['mes', 'master', 'categoria', 'orcado', 'realizado', 'dif'])
+
+
+class FatosDashboard:
+    """Fatos aprovados já filtrados por ano/UF, com os recortes de cada visão do dashboard.
+
+    Cada visão ignora um filtro diferente (o top de centros de custo não filtra por
+    centro de custo; a visão por categoria não filtra por categoria), por isso a
+    consulta traz a união necessária e cada método aplica o seu recorte.
+    """
+
+    def __init__(self, ano=None, categoria=None, uf=None, centro_custo=None):
+        self.categoria = categoria
+        self.centro_custo = centro_custo
+
+        query = db.session.query(
+            Orcamento.mes,
+            Categoria.master,
+            Categoria.categoria,
+            func.sum(Orcamento.orcado),
+            func.sum(Orcamento.realizado),
+            func.sum(Orcamento.dif)
+        ).join(Categoria, Categoria.id_categoria == Orcamento.id_categoria)\
+         .filter(Orcamento.status == 'aprovado')
+
+        if ano:
+            query = query.filter(Orcamento.ano == ano)
+        if uf:
+            query = query.filter(Categoria.uf == uf)
+        if categoria and centro_custo:
+            # Linhas fora dos dois filtros não entram em nenhuma visão
+            query = query.filter(or_(Categoria.categoria == categoria, Categoria.master == centro_custo))
+
+        self.fatos = [Fato(*row) for row in
+                      query.group_by(Orcamento.mes, Categoria.master, Categoria.categoria).all()]
+
+    def _filtrar(self, por_categoria=True, por_centro_custo=True):
+        return [
+            f for f in self.fatos
+            if (not (por_categoria and self.categoria) or f.categoria == self.categoria)
+            and (not (por_centro_custo and self.centro_custo) or f.master == self.centro_custo)
+        ]
+
+    @staticmethod
+    def _agrupar(fatos, campo):
+        grupos = {}
+        for fato in fatos:
+            grupos.setdefault(getattr(fato, campo), []).append(fato)
+        return {
+            chave: (somar(f.orcado for f in itens),
+                    somar(f.realizado for f in itens),
+                    somar(f.dif for f in itens))
+            for chave, itens in grupos.items()
+        }
+
+    def totais(self):
+        """(orcado, realizado, dif) com todos os filtros"""
+        fatos = self._filtrar()
+        return (somar(f.orcado for f in fatos),
+                somar(f.realizado for f in fatos),
+                somar(f.dif for f in fatos))
+
+    def por_mes(self):
+        """mes -> (orcado, realizado, dif) com todos os filtros"""
+        return self._agrupar(self._filtrar(), 'mes')
+
+    def top_centros_custo(self, limite=5):
+        """[(master, orcado, realizado, dif)] pelo maior |dif|, sem o filtro de centro de custo"""
+        grupos = self._agrupar(self._filtrar(por_centro_custo=False), 'master')
+        ordenados = sorted(
+            grupos.items(),
+            key=lambda item: abs(item[1][2]) if item[1][2] is not None else -1,
+            reverse=True
+        )
+        return [(master, *somas) for master, somas in ordenados[:limite]]
+
+    def por_categoria(self):
+        """[(categoria, orcado, realizado, dif)] sem o filtro de categoria"""
+        grupos = self._agrupar(self._filtrar(por_categoria=False), 'categoria')
+        return [(categoria, *grupos[categoria])
+                for categoria in sorted(grupos, key=lambda c: (c is None, c or ''))]
+
+    def distribuicao(self, campo):
+        """[(nome, orcado, realizado)] com todos os filtros, agrupado por 'categoria' ou 'master'"""
+        grupos = self._agrupar(self._filtrar(), campo)
+        return [(nome, grupos[nome][0], grupos[nome][1]) for nome in sorted(n for n in grupos if n)]
+
+
+class ResumoStatus:
+    """Contagem e somas dos orçamentos por (ano, status), mais o total de categorias.
+
+    Sem `anos`, traz todos os anos (o comparativo usa o maior deles como ano atual).
+    """
+
+    def __init__(self, anos=None):
+        # O total de categorias vai na mesma linha; MAX de uma constante é aceito com ONLY_FULL_GROUP_BY
+        total_categorias = select(func.count(Categoria.id_categoria)).scalar_subquery()
+        query = db.session.query(
+            Orcamento.ano,
+            Orcamento.status,
+            func.count(Orcamento.id_orcamento),
+            func.sum(Orcamento.orcado),
+            func.sum(Orcamento.realizado),
+            func.sum(Orcamento.dif),
+            func.max(total_categorias)
+        )
+        if anos:
+            query = query.filter(Orcamento.ano.in_(anos))
+        rows = query.group_by(Orcamento.ano, Orcamento.status).all()
+
+        self.linhas = {(row[0], row[1]): row[2:6] for row in rows}
+        self.total_categorias = rows[0][6] if rows else Categoria.query.count()
+
+    def maior_ano(self):
+        anos = [ano for ano, _ in self.linhas if ano is not None]
+        return max(anos) if anos else None
+
+    def contagem(self, ano=None, status=None):
+        """Quantidade de orçamentos, opcionalmente restrita a um ano e/ou status"""
+        return sum(
+            linha[0] for (a, s), linha in self.linhas.items()
+            if (ano is None or a == ano) and (status is None or s == status)
+        )
+
+    def totais_aprovados(self, ano):
+        """(orcado, realizado, dif) dos aprovados no ano, como o SUM do banco"""
+        return tuple(self.linhas.get((ano, 'aprovado'), (0, None, None, None))[1:])
+
+
+MEDIDAS_TENDENCIA = ('orcado', 'realizado', 'dif')
+
+
+def _centavos(valor):
+    return int((Decimal(str(valor)) * 100).to_integral_value()) if valor is not None else 0
+
+
+def variacao_percentual(atual, anterior):
+    """Regra de `calcular_variacao` do comparativo, elemento a elemento"""
+    atual = np.asarray(atual, dtype=float)
+    anterior = np.asarray(anterior, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = (atual - anterior) / np.abs(anterior) * 100
+    return np.where(anterior == 0, np.where(atual > 0, 100.0, 0.0), pct)
+
+
+def cagr_percentual(inicial, final, periodos):
+    """Crescimento anual composto; None sem período ou com valores não positivos"""
+    if periodos < 1 or inicial <= 0 or final <= 0:
+        return None
+    return float(((final / inicial) ** (1.0 / periodos) - 1) * 100)
+
+
+class TendenciaOrcamentos:
+    """Aprovados por (ano, mes) de `ano_inicio` a `ano_fim`, com os filtros de GET /dashboard.
+
+    A consulta inclui o ano anterior ao intervalo para que o primeiro ano também tenha YoY.
+    Sem `ano_fim`, o intervalo termina no último ano com aprovados e cobre `anos` anos.
+    Valores em centavos (int64): os totais anuais batem com o SUM do banco.
+    """
+
+    def __init__(self, ano_inicio=None, ano_fim=None, anos=5, categoria=None, uf=None, centro_custo=None):
+        query = db.session.query(
+            Orcamento.ano,
+            Orcamento.mes,
+            func.sum(Orcamento.orcado),
+            func.sum(Orcamento.realizado),
+            func.sum(Orcamento.dif)
+        ).join(Categoria, Categoria.id_categoria == Orcamento.id_categoria)\
+         .filter(Orcamento.status == 'aprovado')
+
+        if categoria:
+            query = query.filter(Categoria.categoria == categoria)
+        if uf:
+            query = query.filter(Categoria.uf == uf)
+        if centro_custo:
+            query = query.filter(Categoria.master == centro_custo)
+        if ano_inicio:
+            query = query.filter(Orcamento.ano >= ano_inicio - 1)
+        if ano_fim:
+            query = query.filter(Orcamento.ano <= ano_fim)
+
+        rows = query.group_by(Orcamento.ano, Orcamento.mes).all()
+
+        if ano_fim is None:
+            ano_fim = max((row[0] for row in rows), default=datetime.now().year)
+        if ano_inicio is None:
+            ano_inicio = ano_fim - anos + 1
+        self.anos = list(range(ano_inicio, ano_fim + 1))
+
+        # Linha 0 é o ano anterior ao intervalo, usado só como base do YoY
+        self.valores = np.zeros((len(MEDIDAS_TENDENCIA), len(self.anos) + 1, len(MESES)), dtype=np.int64)
+        for ano, mes, *somas in rows:
+            if ano_inicio - 1 <= ano <= ano_fim and mes in MESES:
+                linha, coluna = ano - ano_inicio + 1, MESES.index(mes)
+                for i, soma in enumerate(somas):
+                    self.valores[i, linha, coluna] = _centavos(soma)
+
+    def para_dict(self):
+        mensal = self.valores[:, 1:, :]
+        anual = self.valores.sum(axis=2)
+        yoy_mensal = {m: variacao_percentual(self.valores[i, 1:, :], self.valores[i, :-1, :])
+                      for i, m in enumerate(MEDIDAS_TENDENCIA)}
+        yoy_anual = {m: variacao_percentual(anual[i, 1:], anual[i, :-1])
+                     for i, m in enumerate(MEDIDAS_TENDENCIA)}
+        periodos = len(self.anos) - 1
+
+        anos = []
+        for a, ano in enumerate(self.anos):
+            meses = [
+                {
+                    'mes': mes,
+                    **{m: int(mensal[i, a, c]) / 100 for i, m in enumerate(MEDIDAS_TENDENCIA)},
+                    'yoy_pct': {m: float(yoy_mensal[m][a, c]) for m in MEDIDAS_TENDENCIA}
+                }
+                for c, mes in enumerate(MESES)
+            ]
+            anos.append({
+                'ano': ano,
+                **{m: int(anual[i, a + 1]) / 100 for i, m in enumerate(MEDIDAS_TENDENCIA)},
+                'yoy_pct': {m: float(yoy_anual[m][a]) for m in MEDIDAS_TENDENCIA},
+                'meses': meses
+            })
+
+        return {
+            'ano_inicio': self.anos[0],
+            'ano_fim': self.anos[-1],
+            'anos': anos,
+            'cagr_pct': {
+                m: cagr_percentual(int(anual[i, 1]) / 100, int(anual[i, -1]) / 100, periodos)
+                for i, m in enumerate(('orcado', 'realizado'))
+            }
+        }
@@ -0,0 +1,97 @@
+"""
+Autorização pelas claims do token, sem consultar usuarios a cada requisição
+- O /login grava papel, nome e versao_token no access token (`claims_usuario`)
+- `require_role('admin', ...)` confere o papel pelas claims; `usuario_token()` entrega
+  id_usuario/nome/papel para logs e serviços
+- `token_desatualizado` roda junto da checagem de revogação: compara a versao_token do token
+  com a do usuário num cache por processo (USUARIO_CACHE_TTL segundos); mudar papel ou nome
+  em update_usuario incrementa a versão e os tokens antigos deixam de valer (no próprio worker
+  na hora, nos demais em até USUARIO_CACHE_TTL segundos)
+- Tokens emitidos antes das claims são recusados (401) e o frontend volta para o login
+"""
+import threading
+import time
+from collections import namedtuple
+from functools import wraps
+
+from flask import current_app, jsonify
+from flask_jwt_extended import get_jwt, get_jwt_identity
+
+from models import db, Usuario
+from services.comum import instancia_da_aplicacao
+
+UsuarioToken = namedtuple('UsuarioToken', ['id_usuario', 'nome', 'papel'])
+
+
+def claims_usuario(usuario):
+    """additional_claims do create_access_token"""
+    return {'papel': usuario.papel, 'nome': usuario.nome, 'versao_token': usuario.versao_token}
+
+
+def usuario_token():
+    """Usuário da requisição segundo o token (sem ir ao banco)"""
+    claims = get_jwt()
+    return UsuarioToken(int(get_jwt_identity()), claims.get('nome'), claims.get('papel'))
+
+
+def require_role(*papeis):
+    """Decorator (depois do @jwt_required()) que restringe a rota aos papéis dados"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if get_jwt().get('papel') not in papeis:
+                return jsonify({'error': 'Acesso negado'}), 403
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class CacheUsuarios:
+    """Fotografia (to_dict + versao_token) dos usuários por id, válida por `ttl` segundos"""
+
+    def __init__(self, ttl=30.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._itens = {}
+        self.hits = 0
+        self.misses = 0
+
+    def obter(self, id_usuario):
+        """{'dados': to_dict(), 'versao_token': n} ou None se o usuário não existe"""
+        id_usuario = int(id_usuario)
+        agora = time.monotonic()
+        with self._lock:
+            item = self._itens.get(id_usuario)
+            if item is not None and agora - item[0] < self.ttl:
+                self.hits += 1
+                return item[1]
+            self.misses += 1
+
+        usuario = db.session.get(Usuario, id_usuario)
+        foto = {'dados': usuario.to_dict(), 'versao_token': usuario.versao_token} if usuario else None
+        with self._lock:
+            self._itens[id_usuario] = (agora, foto)
+        return foto
+
+    def invalidar(self, id_usuario):
+        with self._lock:
+            self._itens.pop(int(id_usuario), None)
+
+    def estatisticas(self):
+        with self._lock:
+            return {'itens': len(self._itens), 'ttl': self.ttl, 'hits': self.hits, 'misses': self.misses}
+
+
+def cache_usuarios():
+    """Instância da aplicação corrente (app.extensions), criada no primeiro uso"""
+    return instancia_da_aplicacao(
+        'cache_usuarios', lambda: CacheUsuarios(current_app.config.get('USUARIO_CACHE_TTL', 30.0))
+    )
+
+
+def token_desatualizado(payload):
+    """True se o token não tem as claims ou se o usuário mudou (ou sumiu) depois da emissão"""
+    if 'papel' not in payload or 'versao_token' not in payload:
+        return True
+    foto = cache_usuarios().obter(payload[current_app.config.get('JWT_IDENTITY_CLAIM', 'sub')])
+    return foto is None or foto['versao_token'] != payload['versao_token']
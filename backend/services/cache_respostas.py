@@ -0,0 +1,178 @@
+"""
+Cache de respostas dos endpoints do dashboard
+- A chave é (versão dos dados, endpoint, filtros normalizados); toda escrita em orçamentos
+  ou categorias chama `marcar_dados_alterados`, e as entradas da versão antiga deixam de
+  ser usadas e saem pelo LRU
+- A versão fica na tabela versao_dados, então todos os workers invalidam juntos; cada
+  requisição em cache custa uma leitura por chave primária
+- O ETag deriva da mesma chave: com If-None-Match válido a resposta é 304 sem recalcular nada
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, request, make_response
+from sqlalchemy import update
+
+from models import db, VersaoDados
+from services.comum import instancia_da_aplicacao
+
+NOME_VERSAO = 'orcamentos'
+
+
+def versao_dados():
+    """Versão atual dos dados de orçamento (0 se o contador ainda não existe)"""
+    versao = db.session.query(VersaoDados.versao).filter_by(nome=NOME_VERSAO).scalar()
+    return versao or 0
+
+
+def marcar_dados_alterados():
+    """Incrementa a versão na transação corrente; chamar logo antes do commit de cada escrita.
+
+    O incremento trava a linha do contador até o commit, então as transações de escrita em
+    orçamentos/categorias se serializam nesse trecho final; por isso a chamada vem depois de
+    todo o trabalho da transação, imediatamente antes do commit.
+    """
+    dialeto = db.session.get_bind().dialect.name
+    if dialeto == 'mysql':
+        _incrementar_versao_mysql()
+    elif dialeto == 'sqlite':
+        _incrementar_versao_sqlite()
+    else:
+        _incrementar_versao_portavel()
+
+
+def _incrementar_versao_mysql():
+    """INSERT ... ON DUPLICATE KEY UPDATE: a primeira escrita cria o contador sem corrida entre workers"""
+    from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+    agora = datetime.utcnow()
+    stmt = mysql_insert(VersaoDados).values(nome=NOME_VERSAO, versao=1, atualizado_em=agora)
+    db.session.execute(stmt.on_duplicate_key_update(versao=stmt.table.c.versao + 1, atualizado_em=agora))
+
+
+def _incrementar_versao_sqlite():
+    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+    agora = datetime.utcnow()
+    stmt = sqlite_insert(VersaoDados).values(nome=NOME_VERSAO, versao=1, atualizado_em=agora)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['nome'], set_={'versao': stmt.table.c.versao + 1, 'atualizado_em': agora}
+    ))
+
+
+def _incrementar_versao_portavel():
+    """UPDATE e, se o contador ainda não existe, INSERT (dois workers podem colidir na criação)"""
+    resultado = db.session.execute(
+        update(VersaoDados).where(VersaoDados.nome == NOME_VERSAO)
+        .values(versao=VersaoDados.versao + 1)
+    )
+    if resultado.rowcount == 0:
+        db.session.add(VersaoDados(nome=NOME_VERSAO, versao=1))
+
+
+class CacheRespostas:
+    """LRU limitado de corpos de resposta, com contadores para monitoramento"""
+
+    def __init__(self, max_itens=256):
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self.misses += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.hits += 1
+            return item
+
+    def guardar(self, chave, item):
+        with self._lock:
+            self._itens[chave] = item
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+                self.evictions += 1
+
+    def registrar_304(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                'itens': len(self._itens),
+                'max_itens': self.max_itens,
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'evictions': self.evictions,
+                'hit_ratio': (self.hits / consultas) if consultas else 0.0
+            }
+
+
+def cache_respostas():
+    """Cache da aplicação, dimensionado por DASHBOARD_CACHE_SIZE"""
+    return instancia_da_aplicacao('cache_respostas', lambda: CacheRespostas(
+        current_app.config.get('DASHBOARD_CACHE_SIZE', 256)
+    ))
+
+
+def _filtros_normalizados():
+    """Argumentos da query string ordenados, com os valores exatamente como as views os leem.
+
+    Nada de strip: as views usam request.args sem normalizar, e `uf= BA` filtra diferente
+    de `uf=BA`. Vazios ficam, pois `master=` no pivot não é ausência.
+    """
+    return tuple(sorted(
+        (nome, valor)
+        for nome, valores in request.args.lists()
+        for valor in valores
+    ))
+
+
+def _etag(chave):
+    return hashlib.sha1(repr(chave).encode('utf-8')).hexdigest()
+
+
+def resposta_em_cache(view):
+    """Decorator para GETs cujo resultado depende só dos filtros e dos dados de orçamento"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = cache_respostas()
+        chave = (versao_dados(), request.endpoint, _filtros_normalizados())
+        etag = _etag(chave)
+
+        if etag in request.if_none_match:
+            cache.registrar_304()
+            resposta = make_response('', 304)
+        else:
+            item = cache.obter(chave)
+            if item is not None:
+                corpo, mimetype = item
+                resposta = current_app.response_class(corpo, status=200, mimetype=mimetype)
+            else:
+                resposta = make_response(view(*args, **kwargs))
+                if resposta.status_code != 200:
+                    return resposta
+                cache.guardar(chave, (resposta.get_data(), resposta.mimetype))
+
+        resposta.set_etag(etag)
+        # Os dados exigem JWT: o navegador guarda a resposta, mas sempre revalida
+        resposta.headers['Cache-Control'] = 'private, no-cache'
+        return resposta
+    return wrapper
@@ -0,0 +1,159 @@
+"""
+Catálogo de dimensões para os filtros (anos, status, ufs, masters, grupos, categorias)
+- Serve /dashboard/filtros, /orcamentos/filtros e /categorias/filtros
+- Válido enquanto a versão dos dados (versao_dados, incrementada em toda escrita de
+  orçamentos e categorias) não muda; cada requisição custa a leitura dessa versão
+- Guardado em memória no processo e num arquivo SQLite local (CATALOGO_CACHE_PATH) que os
+  workers do gunicorn compartilham: só o primeiro a ver uma versão nova consulta o banco
+- Recalcular custa duas consultas (DISTINCT em orcamentos por idx_orcamento_ano_status e um
+  UNION das colunas de categorias), no lugar das cinco ou seis que cada rota fazia; os textos
+  vêm ordenados pelo banco, na collation das colunas, como nos ORDER BY dessas rotas
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from flask import current_app
+
+from sqlalchemy import select, union, literal
+
+from models import db, Orcamento, Categoria
+from services.cache_respostas import versao_dados
+from services.status_orcamentos import STATUS
+from services.comum import instancia_da_aplicacao
+
+DIMENSOES = ('anos', 'status', 'ufs', 'masters', 'grupos', 'categorias')
+
+
+def _ler_banco():
+    """Uma consulta por tabela; nulos e vazios ficam de fora"""
+    anos, status = set(), set()
+    for ano, st in db.session.query(Orcamento.ano, Orcamento.status).distinct():
+        if ano:
+            anos.add(int(ano))
+        if st:
+            status.add(st)
+
+    # sorted() do Python ordenaria por código (maiúsculas e acentos fora do lugar); o ORDER BY
+    # usa a collation do banco. O UNION já tira as repetições de cada dimensão
+    textos = union(*(
+        select(literal(dimensao).label('dimensao'), coluna.label('valor')).where(coluna.isnot(None), coluna != '')
+        for dimensao, coluna in (('ufs', Categoria.uf), ('masters', Categoria.master),
+                                 ('grupos', Categoria.grupo), ('categorias', Categoria.categoria))
+    )).subquery()
+    valores = {'ufs': [], 'masters': [], 'grupos': [], 'categorias': []}
+    for dimensao, valor in db.session.execute(
+        select(textos.c.dimensao, textos.c.valor).order_by(textos.c.dimensao, textos.c.valor)
+    ):
+        valores[dimensao].append(valor)
+
+    return {
+        'anos': sorted(anos, reverse=True),
+        # Ordem da enum, como o ORDER BY status do MySQL
+        'status': [s for s in STATUS if s in status],
+        **valores,
+    }
+
+
+class CatalogoDimensoes:
+    """Catálogo da versão atual: memória do processo -> arquivo compartilhado -> banco"""
+
+    def __init__(self, caminho, banco):
+        self.caminho = caminho
+        # Bancos diferentes (ex.: homologação e produção no mesmo host) não dividem entradas
+        self.banco = hashlib.sha1(banco.encode('utf-8')).hexdigest()
+        self._lock = threading.Lock()
+        self._versao = None
+        self._dados = None
+        self.hits_memoria = 0
+        self.hits_arquivo = 0
+        self.recalculos = 0
+        self.erros_arquivo = 0
+
+    def _conectar(self):
+        os.makedirs(os.path.dirname(self.caminho) or '.', exist_ok=True)
+        conexao = sqlite3.connect(self.caminho, timeout=5)
+        conexao.execute('PRAGMA journal_mode=WAL')
+        conexao.execute(
+            'CREATE TABLE IF NOT EXISTS catalogo ('
+            'banco TEXT PRIMARY KEY, versao INTEGER NOT NULL, dados TEXT NOT NULL, gerado_em REAL NOT NULL)'
+        )
+        return conexao
+
+    def _ler_arquivo(self, versao):
+        if not self.caminho:
+            return None
+        try:
+            with closing(self._conectar()) as conexao, conexao:
+                row = conexao.execute(
+                    'SELECT dados FROM catalogo WHERE banco = ? AND versao = ?', (self.banco, versao)
+                ).fetchone()
+            return json.loads(row[0]) if row else None
+        except (sqlite3.Error, OSError, ValueError) as e:
+            self.erros_arquivo += 1
+            current_app.logger.warning(f"Catálogo: falha ao ler {self.caminho}: {e}")
+            return None
+
+    def _gravar_arquivo(self, versao, dados):
+        if not self.caminho:
+            return
+        try:
+            with closing(self._conectar()) as conexao, conexao:
+                # Nunca troca uma versão mais nova por uma mais velha (workers concorrentes)
+                conexao.execute(
+                    'INSERT INTO catalogo (banco, versao, dados, gerado_em) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT(banco) DO UPDATE SET versao = excluded.versao, dados = excluded.dados, '
+                    'gerado_em = excluded.gerado_em WHERE excluded.versao >= catalogo.versao',
+                    (self.banco, versao, json.dumps(dados), time.time())
+                )
+        except (sqlite3.Error, OSError) as e:
+            self.erros_arquivo += 1
+            current_app.logger.warning(f"Catálogo: falha ao gravar {self.caminho}: {e}")
+
+    def obter(self):
+        versao = versao_dados()
+        with self._lock:
+            if self._versao == versao:
+                self.hits_memoria += 1
+                return self._dados
+
+        dados = self._ler_arquivo(versao)
+        if dados is not None:
+            self.hits_arquivo += 1
+        else:
+            dados = _ler_banco()
+            self.recalculos += 1
+            self._gravar_arquivo(versao, dados)
+
+        with self._lock:
+            self._versao, self._dados = versao, dados
+        return dados
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                'versao': self._versao,
+                'arquivo': self.caminho,
+                'hits_memoria': self.hits_memoria,
+                'hits_arquivo': self.hits_arquivo,
+                'recalculos': self.recalculos,
+                'erros_arquivo': self.erros_arquivo,
+            }
+
+
+def catalogo():
+    """Instância da aplicação corrente (app.extensions), criada no primeiro uso"""
+    return instancia_da_aplicacao('catalogo_dimensoes', lambda: CatalogoDimensoes(
+        current_app.config.get('CATALOGO_CACHE_PATH'),
+        db.engine.url.render_as_string(hide_password=True)
+    ))
+
+
+def catalogo_dimensoes(*dimensoes):
+    """Catálogo atual; com `dimensoes`, só as pedidas (na ordem dada)"""
+    dados = catalogo().obter()
+    return {d: dados[d] for d in (dimensoes or DIMENSOES)}
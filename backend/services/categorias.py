@@ -0,0 +1,95 @@
+"""
+Importação de categorias em lote
+- Uma única consulta carrega as categorias existentes para detectar duplicatas em memória
+- Duplicatas dentro do próprio arquivo são detectadas pelo mesmo conjunto
+- Inserção via executemany em lotes, dentro de uma transação
+"""
+import pandas as pd
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Categoria
+
+TAMANHO_LOTE = 500
+
+CAMPOS = ['categoria', 'uf', 'master', 'grupo', 'cod_class', 'classe_custo']
+
+MENSAGEM_DUPLICADA = 'Categoria já existe (duplicada) e foi ignorada.'
+
+
+def _texto(valor):
+    """Célula vazia (None/NaN/'') vira None; o resto vira texto"""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return None
+    return str(valor) if str(valor) != '' else None
+
+
+def _chave_unica(linha):
+    """Chave da constraint `unique_categoria`; como no MySQL, NULL nunca conflita"""
+    chave = (linha['categoria'], linha['grupo'], linha['cod_class'])
+    return chave if all(v is not None for v in chave) else None
+
+
+class ImportacaoCategorias:
+    """Importa as linhas de um `LeitorPlanilha` e acumula as mensagens "Linha N: ..." """
+
+    def __init__(self, session, tamanho_lote=TAMANHO_LOTE):
+        self.session = session
+        self.tamanho_lote = tamanho_lote
+        self.imported = 0
+        self.errors = []
+
+        existentes = session.execute(
+            db.select(*[getattr(Categoria, campo) for campo in CAMPOS])
+        ).all()
+        self._tuplas = {tuple(row) for row in existentes}
+        self._unicas = {chave for chave in (_chave_unica(dict(zip(CAMPOS, row))) for row in existentes) if chave}
+        self._pendentes = []  # (número da linha, valores)
+
+    def processar(self, leitor):
+        for bloco in leitor.blocos():
+            colunas = [campo for campo in CAMPOS if campo in bloco.columns]
+            registros = bloco[colunas].to_dict('records')
+            for index, registro in zip(bloco.index, registros):
+                self._processar_linha(index + 2, registro)
+            self._gravar_pendentes()
+
+    def _processar_linha(self, numero, registro):
+        linha = {campo: _texto(registro.get(campo)) for campo in CAMPOS}
+        if linha['categoria'] is None:
+            self.errors.append((numero, 'Campo categoria é obrigatório'))
+            return
+
+        tupla = tuple(linha[campo] for campo in CAMPOS)
+        chave = _chave_unica(linha)
+        if tupla in self._tuplas or (chave and chave in self._unicas):
+            self.errors.append((numero, MENSAGEM_DUPLICADA))
+            return
+
+        self._tuplas.add(tupla)
+        if chave:
+            self._unicas.add(chave)
+        self._pendentes.append((numero, linha))
+        if len(self._pendentes) >= self.tamanho_lote:
+            self._gravar_pendentes()
+
+    def _gravar_pendentes(self):
+        if not self._pendentes:
+            return
+        pendentes, self._pendentes = self._pendentes, []
+        try:
+            with self.session.begin_nested():
+                self.session.execute(insert(Categoria), [linha for _, linha in pendentes])
+            self.imported += len(pendentes)
+        except IntegrityError:
+            # Conflito com uma gravação concorrente: refaz o lote linha a linha
+            for numero, linha in pendentes:
+                try:
+                    with self.session.begin_nested():
+                        self.session.execute(insert(Categoria), [linha])
+                    self.imported += 1
+                except IntegrityError:
+                    self.errors.append((numero, MENSAGEM_DUPLICADA))
+
+    def mensagens(self):
+        return [f'Linha {numero}: {mensagem}' for numero, mensagem in sorted(self.errors)]
@@ -0,0 +1,42 @@
+"""
+Utilitários compartilhados pelos serviços e rotas
+
+- MESES: nomes dos meses como o banco armazena (Orcamento.mes), na ordem do calendário
+- somar: soma com a semântica do SUM do SQL (ignora NULL)
+- em_lotes: fatia uma sequência para consultas IN e executemany
+- instancia_da_aplicacao: objeto por aplicação em app.extensions, criado no primeiro uso
+"""
+import threading
+
+from flask import current_app
+
+MESES = ['Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho',
+         'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro']
+
+
+def somar(valores):
+    """SUM do SQL: ignora NULL e devolve None se não houver nenhum valor"""
+    total = None
+    for valor in valores:
+        if valor is not None:
+            total = valor if total is None else total + valor
+    return total
+
+
+def em_lotes(valores, tamanho):
+    valores = list(valores)
+    for inicio in range(0, len(valores), tamanho):
+        yield valores[inicio:inicio + tamanho]
+
+
+# Reentrante: a fábrica de uma instância pode pedir outra
+_lock_instancias = threading.RLock()
+
+
+def instancia_da_aplicacao(chave, criar):
+    """Instância da aplicação corrente em app.extensions[chave]; `criar()` só roda no primeiro uso"""
+    with _lock_instancias:
+        instancia = current_app.extensions.get(chave)
+        if instancia is None:
+            instancia = current_app.extensions[chave] = criar()
+    return instancia
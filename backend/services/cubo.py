@@ -0,0 +1,323 @@
+"""
+Cubo analítico em memória dos orçamentos aprovados (GET /analytics/query)
+- Carregado de resumo_orcamento_mat + categorias: uma linha por chave (id_categoria, ano, mes)
+- Dimensões (ano, mes, uf, master, grupo, categoria) codificadas em dicionário como int32;
+  medidas (orcado, realizado, dif) em centavos int64, então as somas são exatas como o SUM
+- Filtro, agrupamento e top-N são máscaras e bincount do NumPy, sem ida ao banco
+- Cada consulta lê a versão dos dados (uma leitura por PK); se mudou, o cubo aplica só as
+  chaves novas do feed resumo_alteracoes, relidas do resumo materializado
+"""
+import threading
+from decimal import Decimal
+
+import numpy as np
+from sqlalchemy import func, tuple_
+
+from models import db, Categoria, ResumoOrcamentoMaterializado as Resumo, AlteracaoResumo
+from services.cache_respostas import versao_dados
+from services.comum import MESES, em_lotes, instancia_da_aplicacao
+from services.resumo import garantir_resumo
+
+DIMENSOES = ('ano', 'mes', 'uf', 'master', 'grupo', 'categoria')
+MEDIDAS = ('orcado', 'realizado', 'dif')
+ORDENACOES = MEDIDAS + ('linhas',)
+
+TAMANHO_LOTE = 500
+# Ids do feed já aplicados que continuam sendo conferidos: transações concorrentes podem
+# confirmar fora da ordem dos ids, e reaplicar uma chave é idempotente
+JANELA_FEED = 1000
+# Acima disso, recarregar tudo sai mais barato que aplicar chave a chave
+MAX_ALTERACOES_INCREMENTAIS = 50_000
+# Agrupamentos com até tantas combinações de códigos somam num vetor denso
+MAX_GRUPOS_DENSOS = 1_000_000
+
+
+class ConsultaInvalida(ValueError):
+    """Dimensão, medida ou ordenação que o cubo não conhece"""
+
+
+def _centavos(valor):
+    if valor is None:
+        return 0
+    return int((Decimal(str(valor)) * 100).to_integral_value())
+
+
+def _centavos_varios(valores):
+    return np.fromiter(
+        (int(v.scaleb(2).to_integral_value()) if isinstance(v, Decimal) else _centavos(v) for v in valores),
+        dtype=np.int64, count=len(valores)
+    )
+
+
+class _Dicionario:
+    """Codificação valor -> código inteiro de uma dimensão"""
+
+    def __init__(self, valores=()):
+        self.valores = []
+        self.codigos = {}
+        for valor in valores:
+            self.codificar(valor)
+
+    def codificar(self, valor):
+        codigo = self.codigos.get(valor)
+        if codigo is None:
+            codigo = self.codigos[valor] = len(self.valores)
+            self.valores.append(valor)
+        return codigo
+
+    def codificar_varios(self, valores):
+        for valor in set(valores) - self.codigos.keys():
+            self.codificar(valor)
+        codigos = self.codigos
+        return np.fromiter((codigos[valor] for valor in valores), dtype=np.int32, count=len(valores))
+
+    def procurar(self, valores):
+        return [self.codigos[valor] for valor in valores if valor in self.codigos]
+
+
+class CuboOrcamentos:
+    """Fatos aprovados em colunas NumPy, sincronizados com o banco pela versão dos dados"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.versao = None
+        self.recargas = 0
+        self.atualizacoes = 0
+        self._limpar()
+
+    def _limpar(self):
+        # Meses codificados na ordem do calendário: ordenar pelo código é ordenar pelo mês
+        self.dicionarios = {d: _Dicionario(MESES if d == 'mes' else ()) for d in DIMENSOES}
+        self.dims = {d: np.empty(0, dtype=np.int32) for d in DIMENSOES}
+        self.medidas = {m: np.empty(0, dtype=np.int64) for m in MEDIDAS}
+        self.ativo = np.empty(0, dtype=bool)
+        self.id_categoria = np.empty(0, dtype=np.int64)
+        self.posicoes = {}  # (id_categoria, ano, mes) -> linha
+        self.cursor = 0     # maior id_alteracao já aplicado
+        self._vistos = set()
+
+    # ----- sincronização -----
+
+    def atualizar(self):
+        """Aplica as alterações pendentes se a versão dos dados mudou; retorna a versão"""
+        versao = versao_dados()
+        with self._lock:
+            if versao != self.versao:
+                if self.versao is None or not self._aplicar_feed():
+                    self._recarregar()
+                self.versao = versao
+        return versao
+
+    def _recarregar(self):
+        garantir_resumo()
+        self._limpar()
+        # O feed é lido antes dos dados: o que for gravado durante a carga volta por ele; os
+        # ids já visíveis agora estão refletidos na carga e não são reaplicados
+        self.cursor = db.session.query(func.max(AlteracaoResumo.id_alteracao)).scalar() or 0
+        self._vistos = {row.id_alteracao for row in db.session.query(AlteracaoResumo.id_alteracao)
+                        .filter(AlteracaoResumo.id_alteracao > self.cursor - JANELA_FEED)}
+        self._aplicar_linhas(self._consulta().all(), [])
+        self.recargas += 1
+
+    def _consulta(self):
+        return db.session.query(
+            Resumo.id_categoria, Resumo.ano, Resumo.mes,
+            Resumo.total_orcado, Resumo.total_realizado, Resumo.total_dif,
+            Categoria.uf, Categoria.master, Categoria.grupo, Categoria.categoria
+        ).join(Categoria, Categoria.id_categoria == Resumo.id_categoria)
+
+    def _aplicar_feed(self):
+        """Aplica as chaves novas do feed; False quando é preciso recarregar tudo"""
+        alteracoes = db.session.query(
+            AlteracaoResumo.id_alteracao, AlteracaoResumo.id_categoria,
+            AlteracaoResumo.ano, AlteracaoResumo.mes
+        ).filter(AlteracaoResumo.id_alteracao > self.cursor - JANELA_FEED)\
+         .order_by(AlteracaoResumo.id_alteracao).all()
+        novas = [a for a in alteracoes if a.id_alteracao not in self._vistos]
+
+        # O último id aplicado sumiu do feed (limpeza): pode ter sumido algo que o cubo não viu
+        if self.cursor and not (alteracoes and alteracoes[0].id_alteracao <= self.cursor):
+            return False
+        if len(novas) > MAX_ALTERACOES_INCREMENTAIS or any(a.id_categoria is None for a in novas):
+            return False
+
+        categorias = sorted({a.id_categoria for a in novas if a.ano is None or a.mes is None})
+        chaves = sorted({(a.id_categoria, a.ano, a.mes) for a in novas
+                         if a.ano is not None and a.mes is not None and a.id_categoria not in categorias})
+
+        linhas = []
+        for lote in em_lotes(categorias, TAMANHO_LOTE):
+            linhas += self._consulta().filter(Resumo.id_categoria.in_(lote)).all()
+        for lote in em_lotes(chaves, TAMANHO_LOTE):
+            linhas += self._consulta().filter(
+                tuple_(Resumo.id_categoria, Resumo.ano, Resumo.mes).in_(lote)
+            ).all()
+
+        tocadas = list(chaves)
+        if categorias:
+            da_categoria = np.flatnonzero(np.isin(self.id_categoria, categorias))
+            chave_da_linha = {linha: chave for chave, linha in self.posicoes.items()}
+            tocadas += [chave_da_linha[linha] for linha in da_categoria.tolist()]
+        self._aplicar_linhas(linhas, tocadas)
+
+        self._vistos.update(a.id_alteracao for a in novas)
+        if alteracoes:
+            self.cursor = max(self.cursor, alteracoes[-1].id_alteracao)
+        self._vistos = {i for i in self._vistos if i > self.cursor - JANELA_FEED}
+        self.atualizacoes += 1
+
+        # Muitas linhas inativas: compactar recarregando
+        inativas = len(self.ativo) - int(self.ativo.sum())
+        return not (inativas > 10_000 and inativas > len(self.ativo) // 2)
+
+    def _aplicar_linhas(self, linhas, tocadas):
+        """Grava `linhas` do resumo no cubo; chaves `tocadas` que não vieram ficam inativas"""
+        anteriores = [self.posicoes[chave] for chave in tocadas if chave in self.posicoes]
+        if anteriores:
+            self.ativo[anteriores] = False
+            for medida in MEDIDAS:
+                self.medidas[medida][anteriores] = 0
+        if not linhas:
+            return
+
+        # Colunas na ordem de `_consulta`
+        ids, anos, meses, orcados, realizados, difs, ufs, masters, grupos, nomes = zip(*linhas)
+        valores = {
+            'ano': anos, 'mes': meses, 'uf': ufs, 'master': masters, 'grupo': grupos, 'categoria': nomes
+        }
+        codigos = {dim: self.dicionarios[dim].codificar_varios(valores[dim]) for dim in DIMENSOES}
+        centavos = {
+            'orcado': _centavos_varios(orcados),
+            'realizado': _centavos_varios(realizados),
+            'dif': _centavos_varios(difs),
+        }
+
+        posicoes = np.fromiter(
+            (self.posicoes.get(chave, -1) for chave in zip(ids, anos, meses)), dtype=np.int64, count=len(ids)
+        )
+        existentes = posicoes >= 0
+        if existentes.any():
+            destino = posicoes[existentes]
+            self.ativo[destino] = True
+            for dim in DIMENSOES:
+                self.dims[dim][destino] = codigos[dim][existentes]
+            for medida in MEDIDAS:
+                self.medidas[medida][destino] = centavos[medida][existentes]
+
+        novas = np.flatnonzero(~existentes)
+        if len(novas):
+            inicio = len(self.ativo)
+            for deslocamento, i in enumerate(novas.tolist()):
+                self.posicoes[(ids[i], anos[i], meses[i])] = inicio + deslocamento
+            for dim in DIMENSOES:
+                self.dims[dim] = np.concatenate([self.dims[dim], codigos[dim][novas]])
+            for medida in MEDIDAS:
+                self.medidas[medida] = np.concatenate([self.medidas[medida], centavos[medida][novas]])
+            self.id_categoria = np.concatenate(
+                [self.id_categoria, np.array(ids, dtype=np.int64)[novas]])
+            self.ativo = np.concatenate([self.ativo, np.ones(len(novas), dtype=bool)])
+
+    # ----- consultas -----
+
+    def consultar(self, filtros=None, agrupar=(), ordenar=None, decrescente=True,
+                  valor_absoluto=False, limite=None):
+        """Somas das medidas por `agrupar`, nas linhas que atendem `filtros` {dimensão: valor(es)}.
+
+        Sem `ordenar`, os grupos saem na ordem das dimensões (mês no calendário); com
+        `ordenar`, pela medida (ou por |medida|) e, com `limite`, só os N primeiros.
+        """
+        filtros = filtros or {}
+        agrupar = list(agrupar)
+        for dim in list(filtros) + agrupar:
+            if dim not in DIMENSOES:
+                raise ConsultaInvalida(f'Dimensão inválida: {dim}')
+        if len(set(agrupar)) != len(agrupar):
+            raise ConsultaInvalida('Dimensão repetida em agrupar')
+        if ordenar is not None and ordenar not in ORDENACOES:
+            raise ConsultaInvalida(f'Ordenação inválida: {ordenar}')
+
+        with self._lock:
+            mascara = self.ativo.copy()
+            for dim, valores in filtros.items():
+                if not isinstance(valores, (list, tuple, set)):
+                    valores = [valores]
+                codigos_filtro = self.dicionarios[dim].procurar(valores)
+                if len(codigos_filtro) == 1:
+                    mascara &= self.dims[dim] == codigos_filtro[0]
+                else:
+                    mascara &= np.isin(self.dims[dim], codigos_filtro)
+            linhas = np.flatnonzero(mascara)
+            colunas = [self.dims[dim][linhas] for dim in agrupar]
+            medidas = {m: self.medidas[m][linhas] for m in MEDIDAS}
+            valores_dim = {dim: list(self.dicionarios[dim].valores) for dim in agrupar}
+
+        if agrupar:
+            formato = tuple(max(len(valores_dim[dim]), 1) for dim in agrupar)
+            chave = np.ravel_multi_index([c.astype(np.int64) for c in colunas], formato)
+            if np.prod(formato) <= MAX_GRUPOS_DENSOS:
+                # Poucas combinações possíveis: bincount direto na chave, sem ordenar
+                contagem = np.bincount(chave, minlength=int(np.prod(formato)))
+                grupos = np.flatnonzero(contagem)
+                inverso, tamanho = chave, len(contagem)
+            else:
+                grupos, inverso = np.unique(chave, return_inverse=True)
+                tamanho = len(grupos)
+            # bincount soma em float64: exato para totais até 2^53 centavos
+            somas = {m: np.rint(np.bincount(inverso, weights=medidas[m], minlength=tamanho)).astype(np.int64)
+                     for m in MEDIDAS}
+            somas['linhas'] = np.bincount(inverso, minlength=tamanho)
+            if tamanho != len(grupos):
+                somas = {m: valores[grupos] for m, valores in somas.items()}
+            codigos = np.unravel_index(grupos, formato)
+        else:
+            somas = {m: np.array([int(medidas[m].sum())]) for m in MEDIDAS}
+            somas['linhas'] = np.array([len(linhas)])
+            codigos = ()
+
+        total = len(somas['linhas'])
+        if ordenar is not None:
+            chave_ordem = somas[ordenar].astype(np.float64)
+            if valor_absoluto:
+                chave_ordem = np.abs(chave_ordem)
+            ordem = np.argsort(-chave_ordem if decrescente else chave_ordem, kind='stable')
+        else:
+            ordem = sorted(range(total), key=lambda i: tuple(
+                _chave_ordem(dim, valores_dim[dim], int(codigos[j][i])) for j, dim in enumerate(agrupar)
+            ))
+        if limite is not None:
+            ordem = ordem[:limite]
+
+        resultado = []
+        for i in list(ordem):
+            item = {dim: valores_dim[dim][int(codigos[j][i])] for j, dim in enumerate(agrupar)}
+            for medida in MEDIDAS:
+                item[medida] = int(somas[medida][i]) / 100
+            item['linhas'] = int(somas['linhas'][i])
+            resultado.append(item)
+        return resultado
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                'versao': self.versao,
+                'linhas': int(self.ativo.sum()),
+                'linhas_inativas': int(len(self.ativo) - self.ativo.sum()),
+                'cursor_feed': self.cursor,
+                'cardinalidades': {d: len(self.dicionarios[d].valores) for d in DIMENSOES},
+                'recargas': self.recargas,
+                'atualizacoes_incrementais': self.atualizacoes
+            }
+
+
+def _chave_ordem(dim, valores, codigo):
+    """Mês pela ordem do calendário; demais dimensões pelo valor, com nulos no fim"""
+    if dim == 'mes':
+        return (False, codigo)
+    return (valores[codigo] is None, valores[codigo])
+
+
+def cubo_orcamentos():
+    """Cubo da aplicação corrente, sincronizado com a versão atual dos dados"""
+    cubo = instancia_da_aplicacao('cubo_orcamentos', CuboOrcamentos)
+    cubo.atualizar()
+    return cubo
@@ -0,0 +1,337 @@
+"""
+Submissões e reprovações de orçamentos em tabelas próprias
+- As rotas de lote gravam o cabeçalho (submissoes / reprovacoes) e os itens com os dados da
+  categoria no momento da ação, na mesma transação do log de auditoria
+- As caixas de entrada do gestor e do admin leem essas tabelas por índice, sem varrer
+  os logs com LIKE nem decodificar o JSON de `detalhes`
+- `migrar_historico_logs` (flask backfill-fluxo) importa o histórico gravado só nos logs
+"""
+from flask import current_app
+from sqlalchemy import insert, exists, func
+from sqlalchemy.orm import joinedload
+
+from models import (
+    db, Categoria, Orcamento, Log, Submissao, SubmissaoItem, Reprovacao, ReprovacaoItem
+)
+from services.cache_respostas import marcar_dados_alterados, versao_dados
+from services.comum import em_lotes
+
+TAMANHO_LOTE = 500
+# Itens da submissão virtual (orçamentos soltos) devolvidos por resposta
+LIMITE_SUBMISSAO_VIRTUAL = 500
+
+CAMPOS_ITEM = ('id_orcamento', 'id_categoria', 'categoria_nome', 'master', 'uf', 'grupo', 'mes', 'ano')
+
+
+def _gravar_itens(modelo, chave, id_cabecalho, itens, campos):
+    """Itens via executemany: o ORM faria um INSERT por linha no MySQL (sem RETURNING)"""
+    for lote in em_lotes(itens, TAMANHO_LOTE):
+        db.session.execute(insert(modelo), [
+            {chave: id_cabecalho, **{campo: item.get(campo) for campo in campos}}
+            for item in lote
+        ])
+
+
+def registrar_submissao(log, itens):
+    """Grava a submissão ligada ao `log` (já adicionado à sessão); não faz commit"""
+    db.session.flush()
+    submissao = Submissao(
+        id_usuario=log.id_usuario,
+        id_log=log.id_log,
+        criado_em=log.timestamp,
+        total=len(itens)
+    )
+    db.session.add(submissao)
+    db.session.flush()
+    _gravar_itens(SubmissaoItem, 'id_submissao', submissao.id_submissao, itens,
+                  CAMPOS_ITEM + ('orcado', 'realizado'))
+    return submissao
+
+
+def registrar_reprovacao(log, itens, motivo, gestor_usuario, tipo='lote', total=None):
+    """Grava a reprovação ligada ao `log` (já adicionado à sessão); não faz commit"""
+    db.session.flush()
+    reprovacao = Reprovacao(
+        id_usuario=log.id_usuario,
+        id_log=log.id_log,
+        tipo=tipo,
+        motivo=motivo,
+        gestor_usuario=gestor_usuario,
+        criado_em=log.timestamp,
+        total=len(itens) if total is None else total
+    )
+    db.session.add(reprovacao)
+    db.session.flush()
+    _gravar_itens(ReprovacaoItem, 'id_reprovacao', reprovacao.id_reprovacao, itens, CAMPOS_ITEM)
+    return reprovacao
+
+
+def _facetas(orcamentos):
+    """masters/ufs/categorias distintos de um lote, para o filtro rápido da tela"""
+    return {
+        'masters': list({o['master'] for o in orcamentos if o.get('master')}),
+        'ufs': list({o['uf'] for o in orcamentos if o.get('uf')}),
+        'categorias': list({o['categoria_nome'] for o in orcamentos if o.get('categoria_nome')}),
+    }
+
+
+def _periodo(orcamentos):
+    primeiro = orcamentos[0] if orcamentos else {}
+    return {'ano': primeiro.get('ano'), 'mes': primeiro.get('mes')}
+
+
+def submissao_to_dict(submissao):
+    orcamentos = [item.to_dict() for item in submissao.itens]
+    return {
+        'id_log': submissao.id_log,
+        'id_submissao': submissao.id_submissao,
+        'data': submissao.criado_em.isoformat() if submissao.criado_em else None,
+        'admin_usuario': submissao.usuario.nome if submissao.usuario else 'Desconhecido',
+        'total_submetidos': submissao.total,
+        **_periodo(orcamentos),
+        'orcamentos': orcamentos,
+        **_facetas(orcamentos),
+    }
+
+
+def _filtrar_itens(query, modelo, filtros):
+    """Aplica ano/mes/master/uf às colunas de um modelo com os dados do orçamento"""
+    for campo in ('ano', 'mes', 'master', 'uf'):
+        if filtros.get(campo):
+            query = query.filter(getattr(modelo, campo) == filtros[campo])
+    return query
+
+
+def submissao_virtual(filtros=None):
+    """Orçamentos aguardando aprovação que não vieram de nenhuma submissão (ex.: importados).
+
+    Uma importação pode deixar dezenas de milhares deles: a resposta traz o total, as facetas
+    de todos e só os LIMITE_SUBMISSAO_VIRTUAL primeiros itens (`truncado` indica o corte).
+    """
+    filtros = filtros or {}
+    query = db.session.query(Orcamento)\
+        .join(Categoria, Categoria.id_categoria == Orcamento.id_categoria)\
+        .filter(
+            Orcamento.status == 'aguardando_aprovacao',
+            ~exists().where(SubmissaoItem.id_orcamento == Orcamento.id_orcamento)
+        )
+    query = _filtrar_itens(query, Orcamento, {k: filtros.get(k) for k in ('ano', 'mes')})
+    query = _filtrar_itens(query, Categoria, {k: filtros.get(k) for k in ('master', 'uf')})
+
+    total = query.with_entities(func.count(Orcamento.id_orcamento)).scalar()
+    if not total:
+        return None
+
+    rows = query.with_entities(Orcamento, Categoria)\
+        .order_by(Orcamento.id_orcamento).limit(LIMITE_SUBMISSAO_VIRTUAL).all()
+    orcamentos = [{
+        'id_orcamento': orc.id_orcamento,
+        'id_categoria': orc.id_categoria,
+        'categoria_nome': categoria.categoria,
+        'master': categoria.master,
+        'uf': categoria.uf,
+        'grupo': categoria.grupo,
+        'mes': orc.mes,
+        'ano': orc.ano,
+        'orcado': float(orc.orcado),
+        'realizado': float(orc.realizado)
+    } for orc, categoria in rows]
+    if total > len(orcamentos):
+        facetas = _facetas([
+            {'master': master, 'uf': uf, 'categoria_nome': categoria}
+            for master, uf, categoria in query.with_entities(
+                Categoria.master, Categoria.uf, Categoria.categoria
+            ).distinct()
+        ])
+    else:
+        facetas = _facetas(orcamentos)
+    return {
+        'id_log': None,  # Sem log real
+        'id_submissao': None,
+        'data': None,
+        'admin_usuario': 'Importado',
+        'total_submetidos': total,
+        'truncado': total > len(orcamentos),
+        **_periodo(orcamentos),
+        'orcamentos': orcamentos,
+        **facetas,
+    }
+
+
+def listar_submissoes(filtros=None, page=1, per_page=20):
+    """Página de submissões (mais recentes primeiro) que têm algum item nos filtros.
+
+    Uma consulta para a página (com o usuário), uma para os itens (selectin) e as da
+    submissão virtual (contagem, itens e, se cortada, facetas), que vem no início da primeira página.
+    """
+    filtros = filtros or {}
+    query = Submissao.query.options(joinedload(Submissao.usuario))
+    if any(filtros.get(campo) for campo in ('ano', 'mes', 'master', 'uf')):
+        itens = _filtrar_itens(
+            db.session.query(SubmissaoItem.id_item)
+            .filter(SubmissaoItem.id_submissao == Submissao.id_submissao),
+            SubmissaoItem, filtros
+        )
+        query = query.filter(itens.exists())
+
+    pagination = query.order_by(Submissao.criado_em.desc(), Submissao.id_submissao.desc())\
+        .paginate(page=page, per_page=per_page, error_out=False)
+    resultado = [submissao_to_dict(s) for s in pagination.items]
+    if page == 1:
+        virtual = submissao_virtual(filtros)
+        if virtual:
+            resultado.insert(0, virtual)
+    return resultado, pagination
+
+
+def filtros_submissoes():
+    """Valores disponíveis para os filtros da caixa de entrada do gestor.
+
+    Submissões só mudam junto com a versão dos dados (as rotas de lote chamam
+    marcar_dados_alterados), então o DISTINCT roda uma vez por versão em cada processo.
+    """
+    versao = versao_dados()
+    guardado = current_app.extensions.get('filtros_submissoes')
+    if guardado is not None and guardado[0] == versao:
+        return guardado[1]
+
+    rows = db.session.query(SubmissaoItem.ano, SubmissaoItem.master, SubmissaoItem.uf).distinct().all()
+    filtros = {
+        'anos': sorted({r.ano for r in rows if r.ano}, reverse=True),
+        'masters': sorted({r.master for r in rows if r.master}),
+        'ufs': sorted({r.uf for r in rows if r.uf}),
+    }
+    current_app.extensions['filtros_submissoes'] = (versao, filtros)
+    return filtros
+
+
+def reprovacao_to_dict(reprovacao):
+    orcamentos = [item.to_dict() for item in reprovacao.itens]
+    return {
+        'id_log': reprovacao.id_log,
+        'id_reprovacao': reprovacao.id_reprovacao,
+        'data': reprovacao.criado_em.isoformat() if reprovacao.criado_em else None,
+        'gestor_usuario': reprovacao.gestor_usuario or 'Desconhecido',
+        'total_reprovados': reprovacao.total,
+        'motivo': reprovacao.motivo or 'Sem motivo especificado',
+        'tipo': reprovacao.tipo,
+        **_periodo(orcamentos),
+        'orcamentos': orcamentos,
+        **_facetas(orcamentos),
+    }
+
+
+def listar_reprovacoes():
+    reprovacoes = Reprovacao.query\
+        .order_by(Reprovacao.criado_em.desc(), Reprovacao.id_reprovacao.desc()).all()
+    return [reprovacao_to_dict(r) for r in reprovacoes]
+
+
+def _carregar_orcamentos(ids):
+    """{id_orcamento: (Orcamento, Categoria)} em um SELECT por lote"""
+    encontrados = {}
+    for lote in em_lotes(sorted({i for i in ids if isinstance(i, int)}), TAMANHO_LOTE):
+        rows = db.session.query(Orcamento, Categoria)\
+            .outerjoin(Categoria, Categoria.id_categoria == Orcamento.id_categoria)\
+            .filter(Orcamento.id_orcamento.in_(lote)).all()
+        encontrados.update({orc.id_orcamento: (orc, categoria) for orc, categoria in rows})
+    return encontrados
+
+
+def _carregar_categorias(ids):
+    encontradas = {}
+    for lote in em_lotes(sorted({i for i in ids if isinstance(i, int)}), TAMANHO_LOTE):
+        encontradas.update({c.id_categoria: c for c in Categoria.query.filter(Categoria.id_categoria.in_(lote))})
+    return encontradas
+
+
+def _hidratar_submetido(orc, atuais):
+    """Completa itens de logs antigos com os valores atuais, como a caixa de entrada fazia"""
+    orc = dict(orc)
+    db_orc, categoria = atuais.get(orc.get('id_orcamento'), (None, None))
+    if 'orcado' not in orc:
+        orc['orcado'] = float(db_orc.orcado) if db_orc else 0.0
+        orc['realizado'] = float(db_orc.realizado) if db_orc else 0.0
+    if ('categoria_nome' not in orc or 'master' not in orc) and db_orc and categoria:
+        orc.update(categoria_nome=categoria.categoria, master=categoria.master,
+                   uf=categoria.uf, grupo=categoria.grupo)
+        orc.setdefault('mes', db_orc.mes)
+        orc.setdefault('ano', db_orc.ano)
+    return orc
+
+
+def migrar_historico_logs():
+    """Cria submissões/reprovações a partir dos logs ainda não migrados; retorna as contagens"""
+    migrados = {
+        id_log for (id_log,) in db.session.query(Submissao.id_log).filter(Submissao.id_log.isnot(None))
+    } | {
+        id_log for (id_log,) in db.session.query(Reprovacao.id_log).filter(Reprovacao.id_log.isnot(None))
+    }
+
+    def logs_com(texto):
+        return [
+            log for log in Log.query.options(joinedload(Log.usuario)).filter(
+                Log.acao.contains(texto), Log.tabela_afetada == 'orcamentos'
+            ).order_by(Log.id_log)
+            if log.id_log not in migrados
+        ]
+
+    logs_submissao = logs_com('Submissão em lote')
+    logs_lote = logs_com('Reprovação em lote')
+    logs_individuais = logs_com('Reprovou')
+
+    ids_orcamentos = [
+        orc.get('id_orcamento')
+        for log in logs_submissao
+        for orc in (log.detalhes or {}).get('orcamentos_submetidos', [])
+    ]
+    atuais = _carregar_orcamentos(ids_orcamentos)
+    categorias = _carregar_categorias([
+        (log.detalhes or {}).get('orcamento', {}).get('id_categoria') for log in logs_individuais
+    ])
+
+    for log in logs_submissao:
+        detalhes = log.detalhes or {}
+        itens = [_hidratar_submetido(orc, atuais) for orc in detalhes.get('orcamentos_submetidos', [])]
+        submissao = registrar_submissao(log, itens)
+        submissao.total = detalhes.get('total_submetidos', 0)
+
+    for log in logs_lote:
+        detalhes = log.detalhes or {}
+        registrar_reprovacao(
+            log,
+            detalhes.get('orcamentos_reprovados', []),
+            detalhes.get('motivo', 'Sem motivo especificado'),
+            detalhes.get('gestor_usuario', log.usuario.nome if log.usuario else 'Desconhecido'),
+            tipo='lote',
+            total=detalhes.get('total_reprovados', 0)
+        )
+
+    for log in logs_individuais:
+        detalhes = log.detalhes or {}
+        orcamento = detalhes.get('orcamento') or {}
+        itens = []
+        if orcamento:
+            categoria = categorias.get(orcamento.get('id_categoria'))
+            itens.append({
+                'id_orcamento': orcamento.get('id_orcamento'),
+                'id_categoria': orcamento.get('id_categoria'),
+                'categoria_nome': categoria.categoria if categoria else 'Desconhecida',
+                'master': categoria.master if categoria else '-',
+                'uf': categoria.uf if categoria else '-',
+                'grupo': categoria.grupo if categoria else '-',
+                'mes': orcamento.get('mes'),
+                'ano': orcamento.get('ano'),
+            })
+        registrar_reprovacao(
+            log, itens, detalhes.get('motivo', 'Sem motivo especificado'),
+            log.usuario.nome if log.usuario else 'Desconhecido', tipo='individual'
+        )
+
+    marcar_dados_alterados()
+    db.session.commit()
+    return {
+        'submissoes': len(logs_submissao),
+        'reprovacoes_lote': len(logs_lote),
+        'reprovacoes_individuais': len(logs_individuais),
+    }
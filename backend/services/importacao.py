@@ -0,0 +1,506 @@
+"""
+Importação de orçamentos a partir de planilhas
+- Leitura colunar da planilha (pandas/NumPy) no lugar de `df.iterrows()`
+- Gravação em massa com carga em lote das chaves existentes (id_categoria, mes, ano)
+- `ImportacaoOrcamentos` concentra o fluxo usado pela rota síncrona e pelos jobs
+- Quando faltam categorias e ainda não há decisões, `guardar_previa` grava os lançamentos
+  normalizados numa `PreviaImportacao` para que a confirmação aplique as decisões sem
+  reenviar nem reprocessar a planilha; sem categorias ausentes nada vai para o disco
+"""
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+import re
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, insert, update, case, func, or_, bindparam
+
+from models import db, Categoria, Orcamento, Log
+from services.sugestoes import IndiceSugestoes
+from services.comum import em_lotes
+
+TAMANHO_LOTE = 500
+
+MONTH_MAP = {
+    'jan': 'Janeiro', 'janeiro': 'Janeiro',
+    'fev': 'Fevereiro', 'fevereiro': 'Fevereiro',
+    'mar': 'Março', 'março': 'Março',
+    'abr': 'Abril', 'abril': 'Abril',
+    'mai': 'Maio', 'maio': 'Maio',
+    'jun': 'Junho', 'junho': 'Junho',
+    'jul': 'Julho', 'julho': 'Julho',
+    'ago': 'Agosto', 'agosto': 'Agosto',
+    'set': 'Setembro', 'setembro': 'Setembro',
+    'out': 'Outubro', 'outubro': 'Outubro',
+    'nov': 'Novembro', 'novembro': 'Novembro',
+    'dez': 'Dezembro', 'dezembro': 'Dezembro'
+}
+
+
+def build_category_key(master, grupo, uf):
+    """Cria uma chave única para combinações de Centro de Custo / Grupo / UF."""
+    return f"{(master or '').strip()}|{(grupo or '').strip()}|{(uf or '').strip()}"
+
+
+def to_decimal(value):
+    if value is None:
+        return Decimal('0')
+    if isinstance(value, Decimal):
+        return value
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, ValueError, TypeError):
+        return Decimal('0')
+
+
+def normalize_months(mes_str):
+    """Converte strings de meses (jan, fev, janeiro/fevereiro) em lista de nomes de meses válidos"""
+    if pd.isna(mes_str):
+        return []
+    
+    # Substituir delimitadores comuns por espaços
+    normalized = re.sub(r'[,/;]', ' ', str(mes_str).lower())
+    parts = normalized.split()
+    
+    result = []
+    for part in parts:
+        # Remover pontos (ex: jan.)
+        clean_part = part.strip('.')
+        if clean_part in MONTH_MAP:
+            result.append(MONTH_MAP[clean_part])
+    
+    return list(set(result)) # Remover duplicatas
+
+
+def _texto_celula(serie):
+    """Equivalente colunar de `str(valor).strip() if pd.notna(valor) else None`"""
+    valores = np.full(len(serie), None, dtype=object)
+    preenchidos = serie.notna().to_numpy()
+    if preenchidos.any():
+        valores[preenchidos] = serie[preenchidos].astype(str).str.strip().to_numpy(dtype=object)
+    return pd.Series(valores, index=serie.index, dtype=object)
+
+
+def _ano_celula(serie):
+    """Equivalente colunar de `int(valor) if pd.notna(valor) else None`"""
+    valores = np.full(len(serie), None, dtype=object)
+    preenchidos = serie.notna().to_numpy()
+    if preenchidos.any():
+        numeros = pd.to_numeric(serie[preenchidos], errors='coerce').to_numpy(dtype=float)
+        anos = np.full(len(numeros), None, dtype=object)
+        validos = ~np.isnan(numeros)
+        anos[validos] = np.trunc(numeros[validos]).astype(np.int64).tolist()
+        # Células que o pandas não converte seguem a regra antiga (e o mesmo erro) de int()
+        for pos in np.flatnonzero(~validos):
+            anos[pos] = int(serie[preenchidos].iloc[pos])
+        valores[preenchidos] = anos
+    return pd.Series(valores, index=serie.index, dtype=object)
+
+
+def _decimal_celula(serie):
+    """Equivalente colunar de `to_decimal(valor) if pd.notna(valor) else Decimal('0')`.
+
+    Converte apenas os valores distintos e espalha o resultado com indexação NumPy.
+    """
+    codigos, distintos = pd.factorize(serie, use_na_sentinel=True)
+    convertidos = np.empty(len(distintos) + 1, dtype=object)
+    convertidos[:len(distintos)] = [to_decimal(v) for v in distintos]
+    convertidos[-1] = Decimal('0')  # código -1 (célula vazia) aponta para a última posição
+    return pd.Series(convertidos[codigos], index=serie.index, dtype=object)
+
+
+def _explodir_meses(serie):
+    """Quebra a coluna "Mes(es)" em uma série longa (índice da linha -> nome do mês)"""
+    preenchidos = serie.notna()
+    texto = serie[preenchidos].astype(str).str.lower().str.replace(r'[,/;]', ' ', regex=True)
+    partes = texto.str.split().explode().dropna()
+    meses = partes.str.strip('.').map(MONTH_MAP).dropna()
+    # Remove meses repetidos na mesma linha mantendo a ordem de aparição
+    repetidos = pd.MultiIndex.from_arrays([meses.index, meses.to_numpy()]).duplicated()
+    return meses[~repetidos].astype(object)
+
+
+def parse_planilha_orcamentos(df, colunas):
+    """Normaliza a planilha de orçamentos de forma colunar.
+
+    `colunas` mapeia master, grupo, uf, ano, mes e valor para os nomes reais no DataFrame.
+    Retorna `(linhas, lancamentos)`:
+    - linhas: uma linha por linha da planilha (index, master, grupo, uf, key, ano, valor)
+    - lancamentos: formato longo (index, key, ano, mes, valor), um registro por mês
+    """
+    master = _texto_celula(df[colunas['master']])
+    grupo = _texto_celula(df[colunas['grupo']])
+    uf = _texto_celula(df[colunas['uf']])
+    key = master.fillna('').str.cat([grupo.fillna(''), uf.fillna('')], sep='|')
+
+    linhas = pd.DataFrame({
+        'index': df.index,
+        'master': master,
+        'grupo': grupo,
+        'uf': uf,
+        'key': key.astype(object),
+        'ano': _ano_celula(df[colunas['ano']]),
+        'valor': _decimal_celula(df[colunas['valor']]),
+    }, index=df.index)
+
+    meses = _explodir_meses(df[colunas['mes']])
+    lancamentos = linhas.loc[meses.index, ['index', 'key', 'ano', 'valor']]
+    lancamentos.insert(3, 'mes', meses.to_numpy())
+    lancamentos = lancamentos.reset_index(drop=True)
+
+    return linhas.reset_index(drop=True), lancamentos
+
+
+class UpsertOrcamentos:
+    """Aplica valores orçados em lote sem nunca sobrescrever orçamentos aprovados.
+
+    O estado das chaves já vistas é mantido entre chamadas de `processar`, de modo que
+    as contagens de criados/atualizados ficam idênticas às do processamento linha a linha,
+    inclusive quando a mesma chave aparece mais de uma vez na planilha.
+    """
+
+    def __init__(self, session, user_id, tamanho_lote=TAMANHO_LOTE):
+        self.session = session
+        self.user_id = user_id
+        self.tamanho_lote = tamanho_lote
+        self.created = 0
+        self.updated = 0
+        self._status = {}  # (id_categoria, mes, ano) -> status atual
+
+    def processar(self, itens):
+        """Recebe (id_categoria, mes, ano, valor) na ordem da planilha e grava o lote"""
+        itens = list(itens)
+        if not itens:
+            return
+
+        self._carregar_existentes(itens)
+
+        novos = {}
+        alterados = {}
+        for cat_id, mes, ano, valor in itens:
+            key = (cat_id, mes, ano)
+            status = self._status.get(key)
+            if status is None:
+                self._status[key] = 'aguardando_aprovacao'
+                novos[key] = valor
+                self.created += 1
+            elif status != 'aprovado':
+                # A última ocorrência da chave prevalece, como no fluxo antigo
+                if key in novos:
+                    novos[key] = valor
+                else:
+                    alterados[key] = valor
+                self.updated += 1
+
+        if self.session.get_bind().dialect.name == 'mysql':
+            self._gravar_mysql(novos, alterados)
+        else:
+            self._gravar_portavel(novos, alterados)
+
+    def _carregar_existentes(self, itens):
+        """Carrega o status das chaves ainda desconhecidas com poucas consultas em lote"""
+        pendentes = {(c, m, a) for c, m, a, _ in itens if (c, m, a) not in self._status}
+        if not pendentes:
+            return
+
+        anos = {a for _, _, a in pendentes if a is not None}
+        categorias = {c for c, _, _ in pendentes}
+        if not anos:
+            return
+
+        for lote in em_lotes(sorted(categorias), self.tamanho_lote):
+            rows = self.session.execute(
+                select(Orcamento.id_categoria, Orcamento.mes, Orcamento.ano, Orcamento.status)
+                .where(Orcamento.id_categoria.in_(lote), Orcamento.ano.in_(anos))
+            ).all()
+            for row in rows:
+                # Status nulo é tratado como editável, assim como no fluxo antigo
+                self._status[(row.id_categoria, row.mes, row.ano)] = row.status or ''
+
+    def _linha_nova(self, key, valor, agora):
+        cat_id, mes, ano = key
+        return {
+            'id_categoria': cat_id,
+            'mes': mes,
+            'ano': ano,
+            'orcado': valor,
+            'realizado': Decimal('0'),
+            'dif': valor,
+            'status': 'aguardando_aprovacao',
+            'criado_por': self.user_id,
+            'criado_em': agora,
+            'atualizado_em': agora,
+        }
+
+    def _gravar_mysql(self, novos, alterados):
+        """INSERT ... ON DUPLICATE KEY UPDATE sobre `unique_orcamento`"""
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+        agora = datetime.utcnow()
+        tabela = Orcamento.__table__
+        linhas = [self._linha_nova(k, v, agora) for k, v in novos.items()]
+        linhas += [self._linha_nova(k, v, agora) for k, v in alterados.items()]
+
+        for lote in em_lotes(linhas, self.tamanho_lote):
+            stmt = mysql_insert(tabela).values(lote)
+            aprovado = tabela.c.status == 'aprovado'
+            # A guarda de status protege também contra aprovações concorrentes
+            stmt = stmt.on_duplicate_key_update([
+                ('orcado', case((aprovado, tabela.c.orcado), else_=stmt.inserted.orcado)),
+                ('dif', case((aprovado, tabela.c.dif),
+                             else_=stmt.inserted.orcado - func.coalesce(tabela.c.realizado, 0))),
+                ('atualizado_por', case((aprovado, tabela.c.atualizado_por), else_=self.user_id)),
+                ('atualizado_em', case((aprovado, tabela.c.atualizado_em), else_=agora)),
+            ])
+            self.session.execute(stmt)
+
+    def _gravar_portavel(self, novos, alterados):
+        """INSERT e UPDATE via executemany para bancos sem upsert nativo"""
+        agora = datetime.utcnow()
+        tabela = Orcamento.__table__
+
+        for lote in em_lotes(novos.items(), self.tamanho_lote):
+            self.session.execute(insert(tabela), [self._linha_nova(k, v, agora) for k, v in lote])
+
+        stmt = (
+            update(tabela)
+            .where(
+                tabela.c.id_categoria == bindparam('b_id_categoria'),
+                tabela.c.mes == bindparam('b_mes'),
+                tabela.c.ano == bindparam('b_ano'),
+                or_(tabela.c.status.is_(None), tabela.c.status != 'aprovado'),
+            )
+            .values(
+                orcado=bindparam('b_valor'),
+                dif=bindparam('b_valor') - func.coalesce(tabela.c.realizado, 0),
+                atualizado_por=self.user_id,
+                atualizado_em=agora,
+            )
+        )
+        for lote in em_lotes(alterados.items(), self.tamanho_lote):
+            self.session.execute(stmt, [
+                {'b_id_categoria': c, 'b_mes': m, 'b_ano': a, 'b_valor': v}
+                for (c, m, a), v in lote
+            ])
+
+
+COLUNAS_PLANILHA = {
+    'master': ['Centro de Custo', 'CC', 'Master'],
+    'grupo': ['Grupo'],
+    'uf': ['UF'],
+    'ano': ['Ano'],
+    'mes': ['Mes(es)', 'Mes', 'Mês', 'Meses'],
+    'valor': ['Valor', 'Orçado'],
+}
+
+
+class ImportacaoOrcamentos:
+    """Fluxo completo da importação de orçamentos sobre um `LeitorPlanilha`.
+
+    1. `colunas` mapeia os cabeçalhos (None se faltar alguma coluna obrigatória)
+    2. `validar()` lista as combinações sem categoria, com sugestão
+    3. `guardar_previa()` (só se faltam categorias e não há decisões) guarda a planilha
+       normalizada para a confirmação
+    4. `gravar()` aplica as decisões e grava os lançamentos bloco a bloco
+
+    `progresso`, se informado, é chamado após cada bloco gravado com os contadores
+    atuais; os jobs assíncronos o usam para publicar o andamento.
+    """
+
+    def __init__(self, leitor, user_id, create_missing=False, skip_missing=False,
+                 missing_actions=None, progresso=None):
+        self.leitor = leitor
+        self.user_id = user_id
+        self.create_missing = create_missing
+        self.skip_missing = skip_missing
+        self.missing_actions = missing_actions or {}
+        self.progresso = progresso
+
+        self.linhas_lidas = 0  # primeira passada (validação)
+        self.linhas_processadas = 0  # segunda passada (gravação)
+        self.lancamentos_gravados = 0
+        self.linhas_ignoradas = 0
+        self.categories_created = 0
+        self.upsert = None
+
+        self.colunas = None
+        if leitor is not None:
+            colunas = {campo: leitor.get_col(nomes) for campo, nomes in COLUNAS_PLANILHA.items()}
+            self.colunas = colunas if all(colunas.values()) else None
+
+        self.previa = None
+        self._combos = []
+        self._missing = None  # já conhecido quando a importação vem de uma prévia
+
+    @classmethod
+    def da_previa(cls, previa, user_id, **opcoes):
+        """Retoma uma importação validada anteriormente, sem reler a planilha"""
+        importacao = cls(None, user_id, **opcoes)
+        importacao.previa = previa
+        importacao.colunas = previa.meta['colunas']
+        importacao.linhas_lidas = previa.meta['linhas_lidas']
+        importacao._combos = previa.meta['combos']
+        importacao._missing = previa.meta['missing']
+        return importacao
+
+    @property
+    def decidido(self):
+        return bool(self.create_missing or self.skip_missing or self.missing_actions)
+
+    def validar(self):
+        """Primeira passada: combinações distintas da planilha e as que não têm categoria"""
+        if self._missing is not None:
+            return self._missing
+
+        all_categories = Categoria.query.all()
+        categoria_by_key = {}
+        for categoria in all_categories:
+            candidate_key = build_category_key(categoria.master, categoria.grupo, categoria.uf)
+            if candidate_key not in categoria_by_key:
+                categoria_by_key[candidate_key] = categoria
+
+        combinacoes = {}
+        for bloco in self.leitor.blocos():
+            linhas, _ = parse_planilha_orcamentos(bloco, self.colunas)
+            for item in linhas.drop_duplicates('key').to_dict('records'):
+                combinacoes.setdefault(item['key'], item)
+            self.linhas_lidas += len(bloco)
+            if self.progresso:
+                self.progresso(self)
+
+        missing_categories = []
+        indice_sugestoes = None
+        for item in combinacoes.values():
+            categoria = categoria_by_key.get(item['key'])
+            if not categoria:
+                # Índice de trigramas montado sob demanda, uma vez por importação
+                if indice_sugestoes is None:
+                    indice_sugestoes = IndiceSugestoes(all_categories)
+                suggestion = indice_sugestoes.sugerir(item['master'], item['grupo'], item['uf'])
+                missing_categories.append({
+                    'master': item['master'],
+                    'grupo': item['grupo'],
+                    'uf': item['uf'],
+                    'key': item['key'],
+                    'suggestion': suggestion
+                })
+            item['categoria_id'] = categoria.id_categoria if categoria else None
+            self._combos.append(item)
+
+        self._missing = missing_categories
+        return missing_categories
+
+    def guardar_previa(self, previa):
+        """Grava em `previa` os lançamentos normalizados e o resultado de `validar()`.
+
+        Relê a planilha (o leitor volta ao início); a confirmação pelo token e a segunda
+        passada (`gravar`) passam a ler os blocos da prévia.
+        """
+        for bloco in self.leitor.blocos():
+            _, lancamentos = parse_planilha_orcamentos(bloco, self.colunas)
+            previa.adicionar_bloco(len(bloco), lancamentos)
+        previa.meta.update({'colunas': self.colunas, 'linhas_lidas': self.linhas_lidas})
+        previa.salvar(self._combos, self._missing)
+        self.previa = previa
+
+    def _resolver_categorias(self):
+        """Aplica as decisões do usuário e devolve key -> id_categoria"""
+        created_category_ids = {}
+        categoria_ids = {}
+
+        for item in self._combos:
+            cat_id = item['categoria_id']
+
+            if not cat_id:
+                action = None
+                if self.missing_actions:
+                    action = self.missing_actions.get(item['key'])
+                if not action:
+                    if self.create_missing:
+                        action = 'create'
+                    elif self.skip_missing:
+                        action = 'skip'
+                if action and action.startswith('use_suggestion:'):
+                    try:
+                        suggestion_id = int(action.split(':', 1)[1])
+                    except (ValueError, IndexError):
+                        continue
+                    suggested = db.session.get(Categoria, suggestion_id)
+                    if not suggested:
+                        continue
+                    cat_id = suggested.id_categoria
+                elif action == 'create':
+                    if item['key'] in created_category_ids:
+                        cat_id = created_category_ids[item['key']]
+                    else:
+                        new_cat = Categoria(
+                            categoria=item['grupo'],  # Usando grupo como nome da categoria por padrão
+                            master=item['master'],
+                            grupo=item['grupo'],
+                            uf=item['uf']
+                        )
+                        db.session.add(new_cat)
+                        db.session.flush()  # Para pegar o ID
+                        cat_id = new_cat.id_categoria
+                        created_category_ids[item['key']] = cat_id
+                        self.categories_created += 1
+                else:
+                    continue  # 'skip', sem decisão ou ação desconhecida
+
+            categoria_ids[item['key']] = cat_id
+
+        return categoria_ids
+
+    def gravar(self):
+        """Segunda passada: gravação em lote, bloco a bloco (sem commit)"""
+        categoria_ids = self._resolver_categorias()
+
+        self.upsert = UpsertOrcamentos(db.session, self.user_id)
+        for linhas_bloco, lancamentos in self._blocos_lancamentos():
+            lancamentos['categoria_id'] = lancamentos['key'].map(categoria_ids)
+            ignorados = lancamentos['categoria_id'].isna()
+            lancamentos = lancamentos[~ignorados]
+            self.upsert.processar(zip(
+                lancamentos['categoria_id'].astype(int).tolist(),
+                lancamentos['mes'].tolist(),
+                lancamentos['ano'].tolist(),
+                lancamentos['valor'].tolist()
+            ))
+
+            self.linhas_processadas += linhas_bloco
+            self.lancamentos_gravados += len(lancamentos)
+            self.linhas_ignoradas += int(ignorados.sum())
+            if self.progresso:
+                self.progresso(self)
+
+        return self.resumo()
+
+    def _blocos_lancamentos(self):
+        if self.previa is not None:
+            yield from self.previa.blocos()
+            return
+        for bloco in self.leitor.blocos():
+            _, lancamentos = parse_planilha_orcamentos(bloco, self.colunas)
+            yield len(bloco), lancamentos
+
+    def resumo(self):
+        return {
+            'created': self.upsert.created if self.upsert else 0,
+            'updated': self.upsert.updated if self.upsert else 0,
+            'categories_created': self.categories_created
+        }
+
+    def registrar_log(self, id_usuario, arquivo):
+        resumo = self.resumo()
+        log = Log(
+            id_usuario=id_usuario,
+            acao=f'Importação Excel: {resumo["created"]} criados, {resumo["updated"]} atualizados, {resumo["categories_created"]} categorias criadas',
+            tabela_afetada='orcamentos',
+            detalhes={
+                'criados': resumo['created'],
+                'atualizados': resumo['updated'],
+                'categorias_criadas': resumo['categories_created'],
+                'arquivo': arquivo
+            }
+        )
+        db.session.add(log)
@@ -0,0 +1,227 @@
+"""
+Importação de orçamentos em segundo plano
+- O upload é salvo em UPLOAD_FOLDER/importacoes e registrado em `importacao_jobs`
+- Um pool de threads do próprio processo (IMPORT_WORKERS) executa o job, sem broker externo
+- A importação é atômica: lançamentos, categorias criadas, log e versão dos dados são
+  confirmados num único commit no fim; uma falha não deixa importação pela metade
+- O andamento de cada bloco vai para importacao_jobs numa conexão própria, fora dessa
+  transação, então o polling de qualquer worker enxerga o progresso sem invalidar caches
+- Sem decisões para as categorias ausentes, o job gera uma prévia (services/previas.py)
+  e um novo job pode confirmá-la pelo token, sem reenviar o arquivo
+- Jobs de um processo encerrado no meio ficam presos em pendente/processando; no primeiro
+  uso das rotas de jobs em cada processo, `encerrar_jobs_interrompidos` marca como erro os
+  que passaram de IMPORT_JOB_TIMEOUT
+"""
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from werkzeug.datastructures import FileStorage
+from werkzeug.utils import secure_filename
+from sqlalchemy import update, or_, and_
+
+from models import db, ImportacaoJob
+from services.cache_respostas import marcar_dados_alterados
+from services.importacao import ImportacaoOrcamentos
+from services.planilhas import LeitorPlanilha
+from services.previas import PreviaImportacao
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config.get('IMPORT_WORKERS', 2),
+                thread_name_prefix='importacao'
+            )
+    return _executor
+
+
+def criar_job(file, id_usuario, opcoes, previa=None):
+    """Salva o upload (ou referencia a prévia), registra o job como pendente e o envia para o pool"""
+    id_job = str(uuid.uuid4())
+    if previa is not None:
+        arquivo = previa.meta['arquivo']
+        caminho = None
+        opcoes = {**opcoes, 'preview_token': previa.token}
+    else:
+        pasta = os.path.join(current_app.config['UPLOAD_FOLDER'], 'importacoes')
+        os.makedirs(pasta, exist_ok=True)
+        arquivo = file.filename
+        caminho = os.path.join(pasta, f"{id_job}_{secure_filename(file.filename) or 'planilha'}")
+        file.save(caminho)
+
+    job = ImportacaoJob(
+        id_job=id_job,
+        id_usuario=id_usuario,
+        arquivo=arquivo,
+        caminho=caminho,
+        opcoes=opcoes,
+        status='pendente'
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    _pool(current_app).submit(executar_job, current_app._get_current_object(), id_job)
+    return job
+
+
+def _contadores(importacao):
+    return {
+        'linhas_lidas': importacao.linhas_lidas,
+        'linhas_processadas': importacao.linhas_processadas,
+        'lancamentos_gravados': importacao.lancamentos_gravados,
+        'linhas_ignoradas': importacao.linhas_ignoradas,
+    }
+
+
+def _publicar_progresso(id_job):
+    """Callback de progresso: grava os contadores do job numa conexão própria, fora da transação da importação.
+
+    O `job` da sessão não é tocado durante a importação: no MySQL o UPDATE dele pela sessão
+    travaria a linha até o commit final e esta conexão ficaria esperando o próprio worker.
+    Os valores finais vão para o job em `_processar`, junto com o commit.
+    """
+    def progresso(importacao):
+        # No SQLite uma segunda conexão esperaria o lock de escrita da importação
+        if db.engine.dialect.name == 'sqlite':
+            return
+        with db.engine.begin() as conexao:
+            conexao.execute(
+                update(ImportacaoJob).where(ImportacaoJob.id_job == id_job).values(**_contadores(importacao))
+            )
+    return progresso
+
+
+def _processar(job, importacao, upload_folder, ttl):
+    missing_categories = importacao.validar()
+    if missing_categories and not importacao.decidido:
+        PreviaImportacao.limpar_expiradas(upload_folder, ttl)
+        previa = PreviaImportacao.criar(upload_folder, job.id_usuario, job.arquivo)
+        try:
+            importacao.guardar_previa(previa)
+        except Exception:
+            previa.descartar()
+            raise
+        for campo, valor in _contadores(importacao).items():
+            setattr(job, campo, valor)
+        job.resultado = {
+            'status': 'missing_categories',
+            'missing': missing_categories,
+            'message': 'Algumas categorias (Centro de Custo/Grupo) não existem.',
+            'preview_token': previa.token,
+            'preview_expires_in': ttl
+        }
+        return
+
+    resumo = importacao.gravar()
+    importacao.registrar_log(job.id_usuario, job.arquivo)
+    job.resultado = {'message': 'Importação concluída com sucesso', **resumo}
+    for campo, valor in _contadores(importacao).items():
+        setattr(job, campo, valor)
+    # O job conclui no mesmo commit dos dados: encerrar_jobs_interrompidos nunca o vê pela metade
+    job.status = 'concluido'
+    job.finalizado_em = datetime.utcnow()
+    # A versão por último: a linha de versao_dados fica travada só até o commit logo abaixo
+    marcar_dados_alterados()
+    db.session.commit()
+    if importacao.previa is not None:
+        importacao.previa.descartar()
+
+
+def executar_job(app, id_job):
+    """Processa um job pendente dentro de um app context próprio (sessão própria)"""
+    with app.app_context():
+        job = db.session.get(ImportacaoJob, id_job)
+        if not job or job.status != 'pendente':
+            return
+
+        job.status = 'processando'
+        job.iniciado_em = datetime.utcnow()
+        db.session.commit()
+
+        upload_folder = app.config['UPLOAD_FOLDER']
+        ttl = app.config['IMPORT_PREVIEW_TTL']
+        opcoes = dict(job.opcoes or {})
+        preview_token = opcoes.pop('preview_token', None)
+        try:
+            if preview_token:
+                previa = PreviaImportacao.abrir(upload_folder, preview_token, job.id_usuario, ttl)
+                if not previa:
+                    raise ValueError('Pré-visualização expirada ou inválida. Envie o arquivo novamente.')
+                importacao = ImportacaoOrcamentos.da_previa(
+                    previa, job.id_usuario, progresso=_publicar_progresso(id_job), **opcoes
+                )
+                _processar(job, importacao, upload_folder, ttl)
+            else:
+                with open(job.caminho, 'rb') as stream:
+                    importacao = ImportacaoOrcamentos(
+                        LeitorPlanilha(FileStorage(stream=stream, filename=job.arquivo)),
+                        job.id_usuario,
+                        progresso=_publicar_progresso(id_job),
+                        **opcoes
+                    )
+                    if not importacao.colunas:
+                        raise ValueError('Colunas obrigatórias ausentes. Certifique-se de que o Excel possui: '
+                                         'Centro de Custo, Grupo, UF, Ano, Mes(es), Valor')
+                    _processar(job, importacao, upload_folder, ttl)
+            job.status = 'concluido'
+        except Exception as e:
+            db.session.rollback()
+            app.logger.exception('Falha no job de importação %s', id_job)
+            job = db.session.get(ImportacaoJob, id_job)
+            job.status = 'erro'
+            job.erro = f'{e} (nenhum lançamento foi gravado)'
+            # Os contadores publicados durante a gravação foram desfeitos junto com ela
+            job.lancamentos_gravados = 0
+        finally:
+            if job.finalizado_em is None:
+                job.finalizado_em = datetime.utcnow()
+            db.session.commit()
+            if job.caminho and os.path.exists(job.caminho):
+                os.remove(job.caminho)
+
+
+def encerrar_jobs_interrompidos(timeout):
+    """Marca como erro os jobs parados em pendente/processando há mais de `timeout` segundos.
+
+    O pool é do processo: se ele terminar no meio (deploy, queda), ninguém retoma o job.
+    Como a importação é atômica, nada dele foi gravado. O prazo evita encerrar jobs que
+    ainda rodam em outro worker.
+    """
+    agora = datetime.utcnow()
+    limite = agora - timedelta(seconds=timeout)
+    encerrados = db.session.query(ImportacaoJob).filter(or_(
+        and_(ImportacaoJob.status == 'processando', ImportacaoJob.iniciado_em < limite),
+        and_(ImportacaoJob.status == 'pendente', ImportacaoJob.criado_em < limite),
+    )).update({
+        'status': 'erro',
+        'erro': 'Importação interrompida pelo reinício do servidor (nenhum lançamento foi gravado). '
+                'Envie o arquivo novamente.',
+        'lancamentos_gravados': 0,
+        'finalizado_em': agora,
+    }, synchronize_session=False)
+    db.session.commit()
+    return encerrados
+
+
+def verificar_jobs_interrompidos():
+    """`encerrar_jobs_interrompidos` uma vez por processo (aplicação), no primeiro uso dos jobs"""
+    with _executor_lock:
+        if current_app.extensions.get('jobs_importacao_verificados'):
+            return
+        current_app.extensions['jobs_importacao_verificados'] = True
+    try:
+        encerrados = encerrar_jobs_interrompidos(current_app.config['IMPORT_JOB_TIMEOUT'])
+        if encerrados:
+            current_app.logger.warning(f"{encerrados} jobs de importação interrompidos marcados como erro")
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.warning(f"Verificação de jobs de importação interrompidos falhou: {e}")
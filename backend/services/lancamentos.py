@@ -0,0 +1,209 @@
+"""
+Gravação em lote da grade de lançamentos (POST /orcamentos/batch)
+- Todas as chaves (id_categoria, mes, ano) do payload são resolvidas com um tuple-IN por lote
+- As regras de permissão (admin x gestor, orçamento aprovado) são aplicadas em memória,
+  item a item e na ordem do payload, como no fluxo linha a linha
+- Inserções e atualizações saem em executemany; os IDs voltam na mesma passada
+- Como a gravação não passa pelo flush da sessão, `dif` é calculado aqui e o resumo
+  materializado é atualizado explicitamente para as chaves tocadas
+"""
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import select, insert, update, bindparam, tuple_
+
+from models import Categoria, Orcamento, atualizar_resumo_materializado
+from services.comum import MESES, em_lotes
+
+TAMANHO_LOTE = 500
+
+CAMPOS_OBRIGATORIOS = ('id_categoria', 'mes', 'ano')
+
+
+def _nome_mes(valor):
+    """Aceita o número (1-12) ou o nome do mês"""
+    return MESES[valor - 1] if isinstance(valor, int) and 1 <= valor <= 12 else valor
+
+
+def _valor(valor):
+    if valor is None:
+        return None
+    try:
+        return Decimal(str(valor))
+    except InvalidOperation:
+        raise ValueError(f'valor inválido: {valor!r}')
+
+
+def _dif(orcado, realizado):
+    """Mesma regra do listener `calculate_dif` de models.py"""
+    if orcado is not None and realizado is not None:
+        return orcado - realizado
+    return 0
+
+
+class LoteOrcamentos:
+    """Aplica um payload da grade de lançamentos com número constante de consultas por lote"""
+
+    def __init__(self, session, current_user, tamanho_lote=TAMANHO_LOTE):
+        self.session = session
+        self.user_id = current_user.id_usuario
+        self.is_admin = current_user.papel == 'admin'
+        self.tamanho_lote = tamanho_lote
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+        self._registros = {}  # (id_categoria, mes, ano) -> estado do orçamento
+
+    def processar(self, itens):
+        """Grava o payload e retorna [{'id_orcamento': ...}] na ordem dos itens"""
+        chaves = [self._chave(orc_data) for orc_data in itens]
+        self._carregar_existentes({c for c in chaves if c})
+        categorias_validas = self._categorias_existentes(
+            {c[0] for c in chaves if c and c not in self._registros}
+        )
+
+        for orc_data, chave in zip(itens, chaves):
+            if chave is None:
+                continue
+            try:
+                self._aplicar(orc_data, chave, categorias_validas)
+            except Exception as e:
+                self.errors.append(f'Erro processando {orc_data.get("id_categoria", "N/A")}: {str(e)}')
+
+        self._gravar()
+
+        return [
+            {'id_orcamento': self._registros[chave]['id_orcamento']}
+            for chave in chaves
+            if chave in self._registros and self._registros[chave].get('id_orcamento')
+        ]
+
+    def _chave(self, orc_data):
+        if any(campo not in orc_data for campo in CAMPOS_OBRIGATORIOS):
+            self.errors.append(f'Dados incompletos para um orçamento: {orc_data}')
+            return None
+        try:
+            chave = (int(orc_data['id_categoria']), _nome_mes(orc_data['mes']), int(orc_data['ano']))
+        except (TypeError, ValueError) as e:
+            self.errors.append(f'Erro processando {orc_data.get("id_categoria", "N/A")}: {str(e)}')
+            return None
+        if chave[1] not in MESES:
+            self.errors.append(f'Erro processando {orc_data["id_categoria"]}: mês inválido {orc_data["mes"]!r}')
+            return None
+        return chave
+
+    def _carregar_existentes(self, chaves):
+        for lote in em_lotes(sorted(chaves), self.tamanho_lote):
+            rows = self.session.execute(
+                select(Orcamento.id_orcamento, Orcamento.id_categoria, Orcamento.mes, Orcamento.ano,
+                       Orcamento.status, Orcamento.orcado, Orcamento.realizado, Orcamento.atualizado_por)
+                .where(tuple_(Orcamento.id_categoria, Orcamento.mes, Orcamento.ano).in_(lote))
+            ).all()
+            for row in rows:
+                self._registros[(row.id_categoria, row.mes, row.ano)] = {
+                    'id_orcamento': row.id_orcamento,
+                    'status': row.status,
+                    'orcado': row.orcado,
+                    'realizado': row.realizado,
+                    'atualizado_por': row.atualizado_por,
+                    'novo': False,
+                    'alterado': False,
+                }
+
+    def _categorias_existentes(self, ids):
+        if not ids or not self.is_admin:
+            return set()
+        existentes = set()
+        for lote in em_lotes(sorted(ids), self.tamanho_lote):
+            existentes.update(self.session.execute(
+                select(Categoria.id_categoria).where(Categoria.id_categoria.in_(lote))
+            ).scalars())
+        return existentes
+
+    def _aplicar(self, orc_data, chave, categorias_validas):
+        registro = self._registros.get(chave)
+
+        if registro is not None:  # Orçamento existente (ou criado antes neste mesmo lote)
+            if registro['status'] == 'aprovado':
+                if 'realizado' in orc_data:
+                    registro['realizado'] = _valor(orc_data['realizado'])
+                    registro['atualizado_por'] = self.user_id
+                    registro['alterado'] = True
+                    self.updated += 1
+                # Outras alterações em orçamentos aprovados são ignoradas
+            elif self.is_admin:  # Não aprovado, apenas admin pode editar
+                novos_valores = {campo: _valor(orc_data[campo])
+                                 for campo in ('orcado', 'realizado') if campo in orc_data}
+                registro.update(novos_valores)
+                if orc_data.get('status'):
+                    registro['status'] = orc_data['status']
+                registro['atualizado_por'] = self.user_id
+                registro['alterado'] = True
+                self.updated += 1
+            else:
+                self.errors.append(f'Apenas administradores podem editar orçamentos com status "{registro["status"]}".')
+            return
+
+        if not self.is_admin:
+            self.errors.append('Apenas administradores podem criar novos orçamentos.')
+            return
+        if chave[0] not in categorias_validas:
+            raise ValueError(f'categoria {chave[0]} não encontrada')
+
+        registro = {
+            'id_orcamento': None,
+            'status': orc_data.get('status') or 'rascunho',
+            'orcado': _valor(orc_data['orcado']) if 'orcado' in orc_data else Decimal('0'),
+            'realizado': _valor(orc_data['realizado']) if 'realizado' in orc_data else Decimal('0'),
+            'atualizado_por': None,
+            'novo': True,
+            'alterado': True,
+        }
+        self._registros[chave] = registro
+        self.created += 1
+
+    def _gravar(self):
+        tabela = Orcamento.__table__
+        novos = [(k, r) for k, r in self._registros.items() if r['novo']]
+        alterados = [(k, r) for k, r in self._registros.items() if r['alterado'] and not r['novo']]
+
+        for lote in em_lotes(novos, self.tamanho_lote):
+            self.session.execute(insert(tabela), [
+                {
+                    'id_categoria': cat_id, 'mes': mes, 'ano': ano,
+                    'orcado': r['orcado'], 'realizado': r['realizado'],
+                    'dif': _dif(r['orcado'], r['realizado']),
+                    'status': r['status'], 'criado_por': self.user_id,
+                    'atualizado_por': r['atualizado_por'],
+                }
+                for (cat_id, mes, ano), r in lote
+            ])
+
+        stmt = (
+            update(tabela)
+            .where(tabela.c.id_orcamento == bindparam('b_id'))
+            .values(
+                orcado=bindparam('b_orcado'),
+                realizado=bindparam('b_realizado'),
+                dif=bindparam('b_dif'),
+                status=bindparam('b_status'),
+                atualizado_por=bindparam('b_atualizado_por'),
+            )
+        )
+        for lote in em_lotes(alterados, self.tamanho_lote):
+            self.session.execute(stmt, [
+                {
+                    'b_id': r['id_orcamento'], 'b_orcado': r['orcado'], 'b_realizado': r['realizado'],
+                    'b_dif': _dif(r['orcado'], r['realizado']), 'b_status': r['status'],
+                    'b_atualizado_por': r['atualizado_por'],
+                }
+                for _, r in lote
+            ])
+
+        if novos:
+            # MySQL não tem RETURNING: os IDs das linhas inseridas vêm de um tuple-IN por lote
+            self._carregar_existentes([k for k, _ in novos])
+
+        # O resumo usa a chave na ordem (id_categoria, ano, mes)
+        tocadas = {(cat_id, ano, mes) for (cat_id, mes, ano), _ in novos + alterados}
+        if tocadas:
+            atualizar_resumo_materializado(self.session.connection(), tocadas)
@@ -0,0 +1,124 @@
+"""
+Pivot hierárquico orçado x realizado (GET /dashboard/pivot)
+- Níveis: centro de custo (master) -> grupo -> categoria -> mês, com subtotais em cada nó
+- Uma única consulta por requisição: GROUP BY ... WITH ROLLUP no MySQL; nos demais bancos
+  o GROUP BY no nível mais fundo pedido e os subtotais somados em memória (em Decimal)
+- Expansão sob demanda: o caminho (master, grupo, categoria) fixa o nó e `profundidade`
+  limita quantos níveis abaixo dele vêm na resposta
+"""
+from sqlalchemy import func
+
+from models import db, Orcamento, Categoria
+from services.comum import MESES, somar
+
+NIVEIS = ('master', 'grupo', 'categoria', 'mes')
+
+# Nulos viram '' para não se confundirem com as linhas de subtotal do ROLLUP
+COLUNAS = {
+    'master': func.coalesce(Categoria.master, ''),
+    'grupo': func.coalesce(Categoria.grupo, ''),
+    'categoria': func.coalesce(Categoria.categoria, ''),
+    'mes': Orcamento.mes,
+}
+
+
+def _consulta(niveis, caminho, ano=None, uf=None):
+    colunas = [COLUNAS[nivel].label(nivel) for nivel in niveis]
+    query = db.session.query(
+        *colunas,
+        func.sum(Orcamento.orcado),
+        func.sum(Orcamento.realizado),
+        func.sum(Orcamento.dif)
+    ).join(Categoria, Categoria.id_categoria == Orcamento.id_categoria)\
+     .filter(Orcamento.status == 'aprovado')
+
+    if ano:
+        query = query.filter(Orcamento.ano == ano)
+    if uf:
+        query = query.filter(Categoria.uf == uf)
+    for nivel, valor in caminho:
+        query = query.filter(COLUNAS[nivel] == valor)
+    return query, [COLUNAS[nivel] for nivel in niveis]
+
+
+def _subtotais_mysql(niveis, caminho, ano, uf):
+    """GROUP BY ... WITH ROLLUP: cada linha com nulos à direita é o subtotal do prefixo"""
+    query, agrupamento = _consulta(niveis, caminho, ano, uf)
+    subtotais = {}
+    for row in query.group_by(*agrupamento).suffix_with('WITH ROLLUP').all():
+        chave = tuple(row[:len(niveis)])
+        profundidade = next((i for i, valor in enumerate(chave) if valor is None), len(niveis))
+        subtotais[chave[:profundidade]] = tuple(row[len(niveis):])
+    return subtotais
+
+
+def _subtotais_portavel(niveis, caminho, ano, uf):
+    """GROUP BY no nível mais fundo; os prefixos são somados em memória"""
+    query, agrupamento = _consulta(niveis, caminho, ano, uf)
+    subtotais = {}
+    for row in query.group_by(*agrupamento).all():
+        chave = tuple(row[:len(niveis)])
+        valores = tuple(row[len(niveis):])
+        for profundidade in range(len(niveis) + 1):
+            prefixo = chave[:profundidade]
+            atual = subtotais.get(prefixo, (None, None, None))
+            subtotais[prefixo] = tuple(somar(par) for par in zip(atual, valores))
+    return subtotais
+
+
+def _ordem(nivel, nome):
+    """Meses no calendário; demais níveis em ordem alfabética"""
+    if nivel == 'mes':
+        return MESES.index(nome) if nome in MESES else len(MESES)
+    return nome
+
+
+def _valores(totais):
+    orcado, realizado, dif = (float(v) if v else 0.0 for v in totais)
+    return {
+        'orcado': orcado,
+        'realizado': realizado,
+        'dif': dif,
+        'percentual_execucao': (realizado / orcado * 100) if orcado > 0 else 0.0,
+    }
+
+
+def _nos(filhos_por_prefixo, subtotais, niveis, caminho, prefixo=()):
+    """Filhos de `prefixo` (relativo ao caminho), já ordenados, com os netos se vierem"""
+    nivel = niveis[len(prefixo)]
+    nos = []
+    for chave in sorted(filhos_por_prefixo.get(prefixo, ()), key=lambda c: _ordem(nivel, c[-1])):
+        no = {
+            'nivel': nivel,
+            'nome': chave[-1],
+            'caminho': dict(list(caminho) + list(zip(niveis, chave))),
+            **_valores(subtotais[chave]),
+            'expansivel': nivel != NIVEIS[-1],
+        }
+        if len(chave) < len(niveis):
+            no['filhos'] = _nos(filhos_por_prefixo, subtotais, niveis, caminho, chave)
+        nos.append(no)
+    return nos
+
+
+def pivot_orcamentos(caminho=(), profundidade=1, ano=None, uf=None):
+    """Nó `caminho` [(nivel, valor), ...] com `profundidade` níveis de filhos e subtotais"""
+    inicio = len(caminho)
+    niveis = NIVEIS[inicio:inicio + profundidade]
+
+    if db.session.get_bind().dialect.name == 'mysql':
+        subtotais = _subtotais_mysql(niveis, caminho, ano, uf)
+    else:
+        subtotais = _subtotais_portavel(niveis, caminho, ano, uf)
+
+    filhos_por_prefixo = {}
+    for chave in subtotais:
+        if chave:
+            filhos_por_prefixo.setdefault(chave[:-1], []).append(chave)
+
+    return {
+        'caminho': dict(caminho),
+        'niveis': list(niveis),
+        'total': _valores(subtotais.get((), (None, None, None))),
+        'filhos': _nos(filhos_por_prefixo, subtotais, niveis, caminho),
+    }
@@ -0,0 +1,93 @@
+"""
+Leitura de planilhas em blocos com memória constante
+- .xlsx/.xlsm: openpyxl em modo `read_only` percorrendo `iter_rows`, sem montar a planilha inteira
+- Demais formatos (.xls): `pd.read_excel` como antes, entregue nos mesmos blocos
+Cada bloco é um DataFrame com os cabeçalhos da primeira linha e o índice igual ao
+que o `pd.read_excel` daria (linha da planilha - 2), preservando as mensagens "Linha N".
+"""
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+TAMANHO_BLOCO = 5000
+
+EXTENSOES_STREAMING = ('.xlsx', '.xlsm')
+
+
+class LeitorPlanilha:
+    """Lê a primeira aba de um arquivo enviado (FileStorage) em blocos de linhas.
+
+    O arquivo pode ser percorrido mais de uma vez (ex.: validação e depois gravação);
+    cada chamada de `blocos()` volta ao início do upload.
+    """
+
+    def __init__(self, file, tamanho_bloco=TAMANHO_BLOCO):
+        self.file = file
+        self.tamanho_bloco = tamanho_bloco
+        self.streaming = (file.filename or '').lower().endswith(EXTENSOES_STREAMING)
+        self._df = None
+        self.colunas = self._ler_cabecalho()
+
+    def get_col(self, names):
+        """Primeira coluna cujo nome (sem diferenciar maiúsculas) está em `names`"""
+        col_map = {str(col).lower(): col for col in self.colunas}
+        for name in names:
+            if name.lower() in col_map:
+                return col_map[name.lower()]
+        return None
+
+    def _abrir(self):
+        self.file.stream.seek(0)
+        return load_workbook(self.file.stream, read_only=True, data_only=True)
+
+    def _ler_cabecalho(self):
+        if not self.streaming:
+            self.file.stream.seek(0)
+            self._df = pd.read_excel(self.file)
+            return list(self._df.columns)
+
+        workbook = self._abrir()
+        try:
+            cabecalho = next(workbook.active.iter_rows(max_row=1, values_only=True), ())
+        finally:
+            workbook.close()
+        return [str(valor) if valor is not None else f'Unnamed: {i}'
+                for i, valor in enumerate(cabecalho)]
+
+    def _montar_bloco(self, linhas, indices):
+        valores = np.empty((len(linhas), len(self.colunas)), dtype=object)
+        valores[:] = np.nan  # célula vazia vira NaN, como no pd.read_excel
+        for pos, linha in enumerate(linhas):
+            for col, valor in enumerate(linha[:len(self.colunas)]):
+                if valor is not None and not (isinstance(valor, str) and valor == ''):
+                    valores[pos, col] = valor
+        return pd.DataFrame(valores, columns=self.colunas, index=pd.Index(indices))
+
+    def blocos(self):
+        """Gera DataFrames de até `tamanho_bloco` linhas, na ordem da planilha"""
+        if not self.streaming:
+            for inicio in range(0, len(self._df), self.tamanho_bloco):
+                yield self._df.iloc[inicio:inicio + self.tamanho_bloco]
+            return
+
+        workbook = self._abrir()
+        try:
+            linhas, indices = [], []
+            vazias = []  # linhas vazias só entram se houver dados depois (o pandas descarta as finais)
+            for indice, linha in enumerate(workbook.active.iter_rows(min_row=2, values_only=True)):
+                if all(valor is None or valor == '' for valor in linha):
+                    vazias.append(indice)
+                    continue
+                for vazia in vazias:
+                    linhas.append(())
+                    indices.append(vazia)
+                vazias = []
+                linhas.append(linha)
+                indices.append(indice)
+                if len(linhas) >= self.tamanho_bloco:
+                    yield self._montar_bloco(linhas, indices)
+                    linhas, indices = [], []
+            if linhas:
+                yield self._montar_bloco(linhas, indices)
+        finally:
+            workbook.close()
@@ -0,0 +1,94 @@
+"""
+Pré-visualização da importação de orçamentos guardada em disco
+- Só existe quando a validação encontra categorias ausentes sem decisão: os lançamentos já
+  normalizados (um pickle por bloco), as combinações e as sugestões vão para
+  UPLOAD_FOLDER/previas/<token>
+- A confirmação referencia o token e só aplica as decisões, sem novo upload nem parsing
+- Tokens expiram após IMPORT_PREVIEW_TTL segundos e são limpos na criação de novas prévias
+"""
+import os
+import pickle
+import re
+import shutil
+import time
+import uuid
+
+NOME_META = 'meta.pkl'
+FORMATO_TOKEN = re.compile(r'^[0-9a-f]{32}$')
+
+
+def _pasta_base(upload_folder):
+    return os.path.join(upload_folder, 'previas')
+
+
+class PreviaImportacao:
+    """Diretório de uma prévia: blocos de lançamentos + metadados (combinações e sugestões)"""
+
+    def __init__(self, token, pasta, meta=None):
+        self.token = token
+        self.pasta = pasta
+        self.meta = meta or {}
+        self._blocos = 0
+
+    @classmethod
+    def criar(cls, upload_folder, id_usuario, arquivo):
+        token = uuid.uuid4().hex
+        pasta = os.path.join(_pasta_base(upload_folder), token)
+        os.makedirs(pasta)
+        return cls(token, pasta, {'id_usuario': id_usuario, 'arquivo': arquivo, 'criado_em': time.time()})
+
+    @classmethod
+    def abrir(cls, upload_folder, token, id_usuario, ttl):
+        """Prévia válida do usuário ou None (token inválido, expirado ou de outro usuário)"""
+        if not token or not FORMATO_TOKEN.match(token):
+            return None
+        pasta = os.path.join(_pasta_base(upload_folder), token)
+        try:
+            with open(os.path.join(pasta, NOME_META), 'rb') as f:
+                meta = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+        previa = cls(token, pasta, meta)
+        if time.time() - meta['criado_em'] > ttl:
+            previa.descartar()
+            return None
+        if meta['id_usuario'] != id_usuario:
+            return None
+        previa._blocos = meta['blocos']
+        return previa
+
+    @staticmethod
+    def limpar_expiradas(upload_folder, ttl):
+        base = _pasta_base(upload_folder)
+        if not os.path.isdir(base):
+            return
+        limite = time.time() - ttl
+        for nome in os.listdir(base):
+            pasta = os.path.join(base, nome)
+            try:
+                if os.path.getmtime(pasta) < limite:
+                    shutil.rmtree(pasta, ignore_errors=True)
+            except OSError:
+                continue
+
+    def adicionar_bloco(self, linhas_lidas, lancamentos):
+        caminho = os.path.join(self.pasta, f'bloco_{self._blocos:05d}.pkl')
+        with open(caminho, 'wb') as f:
+            pickle.dump((linhas_lidas, lancamentos), f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._blocos += 1
+
+    def blocos(self):
+        """Gera (linhas da planilha no bloco, DataFrame de lançamentos) na ordem original"""
+        for numero in range(self._blocos):
+            with open(os.path.join(self.pasta, f'bloco_{numero:05d}.pkl'), 'rb') as f:
+                yield pickle.load(f)
+
+    def salvar(self, combos, missing):
+        """Grava os metadados por último: só então a prévia passa a ser válida"""
+        self.meta.update({'combos': combos, 'missing': missing, 'blocos': self._blocos})
+        with open(os.path.join(self.pasta, NOME_META), 'wb') as f:
+            pickle.dump(self.meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def descartar(self):
+        shutil.rmtree(self.pasta, ignore_errors=True)
@@ -0,0 +1,202 @@
+"""
+Consultas sobre o resumo materializado de orçamentos aprovados (resumo_orcamento_mat)
+- `consulta_resumo` expõe as mesmas colunas da view resumo_orcamento para os relatórios
+- `garantir_resumo` faz a carga inicial: no primeiro uso de cada processo, uma tabela vazia
+  com orçamentos aprovados no banco é reconstruída (primeiro deploy da tabela)
+- `reconstruir_resumo` e `verificar_resumo` atendem os comandos `flask rebuild-resumo` e
+  `flask verify-resumo`; a manutenção incremental fica no listener de models.py
+- `limpar_alteracoes` (flask purge-resumo-alteracoes) apaga o feed lido pelo cubo analítico;
+  o commit de uma transação que escreveu no feed também a dispara numa thread a cada
+  RESUMO_ALTERACOES_LIMPEZA segundos (`agendar_limpeza_alteracoes`), então o feed fica
+  limitado a RESUMO_ALTERACOES_DIAS
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from flask import current_app
+from sqlalchemy import case, delete, event, func
+from sqlalchemy.orm import Session
+
+from models import (
+    db, Categoria, Orcamento, ResumoOrcamento, ResumoOrcamentoMaterializado, AlteracaoResumo,
+    atualizar_resumo_materializado, registrar_alteracao_resumo
+)
+from services.comum import MESES
+
+Resumo = ResumoOrcamentoMaterializado
+
+COLUNAS_CATEGORIA = ('categoria', 'uf', 'master', 'grupo', 'cod_class', 'classe_custo')
+
+# Mês na ordem do calendário (Resumo.mes é o nome), para os ORDER BY dos relatórios
+ORDEM_MES = case({mes: numero for numero, mes in enumerate(MESES, start=1)}, value=Resumo.mes)
+
+
+def consulta_resumo():
+    """Query com as colunas da view (filtrar por Categoria.* e Resumo.ano/mes)"""
+    garantir_resumo()
+    return _consulta_tabela()
+
+
+def _consulta_tabela():
+    return db.session.query(
+        Categoria.categoria,
+        Categoria.uf,
+        Categoria.master,
+        Categoria.grupo,
+        Categoria.cod_class,
+        Categoria.classe_custo,
+        Resumo.ano,
+        Resumo.mes,
+        Resumo.total_orcado,
+        Resumo.total_realizado,
+        Resumo.total_dif
+    ).join(Categoria, Categoria.id_categoria == Resumo.id_categoria)
+
+
+def linha_resumo(row):
+    """Mesmo formato de ResumoOrcamento.to_dict() para uma linha de `consulta_resumo`"""
+    return {
+        'categoria': row.categoria,
+        'uf': row.uf,
+        'master': row.master,
+        'grupo': row.grupo,
+        'cod_class': row.cod_class,
+        'classe_custo': row.classe_custo,
+        'ano': row.ano,
+        'mes': row.mes,
+        'total_orcado': float(row.total_orcado) if row.total_orcado else 0.0,
+        'total_realizado': float(row.total_realizado) if row.total_realizado else 0.0,
+        'total_dif': float(row.total_dif) if row.total_dif else 0.0
+    }
+
+
+def reconstruir_resumo():
+    """Recalcula a tabela inteira a partir dos orçamentos aprovados; retorna o nº de linhas"""
+    connection = db.session.connection()
+    connection.execute(delete(Resumo.__table__))
+    chaves = db.session.query(Orcamento.id_categoria, Orcamento.ano, Orcamento.mes)\
+        .filter(Orcamento.status == 'aprovado').distinct().all()
+    atualizar_resumo_materializado(connection, [tuple(c) for c in chaves], registrar=False)
+    # Uma marca de recarga completa no feed em vez de uma linha por chave
+    registrar_alteracao_resumo(connection)
+    db.session.commit()
+    return db.session.query(Resumo).count()
+
+
+_lock_carga = threading.Lock()
+
+
+def garantir_resumo():
+    """`reconstruir_resumo` uma vez por processo (aplicação) se a tabela estiver vazia e houver aprovados.
+
+    A manutenção incremental só conhece as escritas feitas depois que a tabela existe; sem esta
+    carga, um banco migrado mostraria relatórios e cubo vazios até alguém rodar rebuild-resumo.
+    """
+    with _lock_carga:
+        if current_app.extensions.get('resumo_materializado_verificado'):
+            return
+        current_app.extensions['resumo_materializado_verificado'] = True
+    try:
+        vazia = db.session.query(Resumo.id_categoria).first() is None
+        if vazia and db.session.query(Orcamento.id_orcamento).filter(Orcamento.status == 'aprovado').first():
+            total = reconstruir_resumo()
+            current_app.logger.warning(f"resumo_orcamento_mat estava vazia: {total} linhas reconstruídas")
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.warning(f"Carga inicial de resumo_orcamento_mat falhou: {e}")
+
+
+def limpar_alteracoes(dias=7):
+    """Remove do feed resumo_alteracoes as entradas mais antigas que `dias`; retorna quantas.
+
+    Um cubo que ainda não tinha lido as entradas removidas percebe o buraco e recarrega tudo.
+    """
+    limite = datetime.utcnow() - timedelta(days=dias)
+    # A entrada mais recente fica: com a tabela vazia o banco pode reaproveitar ids já vistos
+    ultimo = db.session.query(func.max(AlteracaoResumo.id_alteracao)).scalar() or 0
+    removidas = db.session.query(AlteracaoResumo).filter(
+        AlteracaoResumo.criado_em < limite,
+        AlteracaoResumo.id_alteracao < ultimo
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return removidas
+
+
+_lock_limpeza = threading.Lock()
+
+
+def agendar_limpeza_alteracoes():
+    """Dispara `limpar_alteracoes` em segundo plano se a última foi há RESUMO_ALTERACOES_LIMPEZA segundos"""
+    intervalo = current_app.config.get('RESUMO_ALTERACOES_LIMPEZA', 3600)
+    if not intervalo:
+        return
+    agora = time.monotonic()
+    with _lock_limpeza:
+        ultima = current_app.extensions.get('limpeza_resumo_alteracoes')
+        if ultima is not None and agora - ultima < intervalo:
+            return
+        current_app.extensions['limpeza_resumo_alteracoes'] = agora
+
+    threading.Thread(
+        target=_limpar_em_segundo_plano, args=(current_app._get_current_object(),),
+        name='limpeza-resumo-alteracoes', daemon=True
+    ).start()
+
+
+@event.listens_for(Session, 'after_commit')
+def _limpeza_apos_commit(session):
+    """Agenda a limpeza depois das transações que escreveram no feed (marcadas em models.py)"""
+    if session.info.pop('feed_resumo_alterado', False):
+        agendar_limpeza_alteracoes()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_marca_feed(session):
+    session.info.pop('feed_resumo_alterado', None)
+
+
+def _limpar_em_segundo_plano(app):
+    with app.app_context():
+        try:
+            removidas = limpar_alteracoes(app.config.get('RESUMO_ALTERACOES_DIAS', 7))
+            if removidas:
+                app.logger.info(f"Limpeza de resumo_alteracoes: {removidas} entradas antigas removidas")
+        except Exception as e:
+            db.session.rollback()
+            app.logger.warning(f"Limpeza de resumo_alteracoes falhou: {e}")
+
+
+def _chave_view(row):
+    return tuple(getattr(row, coluna) for coluna in COLUNAS_CATEGORIA) + (row.ano, row.mes)
+
+
+def _totais(row):
+    return tuple(Decimal(v or 0).quantize(Decimal('0.01'))
+                 for v in (row.total_orcado, row.total_realizado, row.total_dif))
+
+
+def _acumular(rows):
+    """Soma por atributos da categoria + ano/mes (categorias com atributos iguais somam juntas)"""
+    totais = {}
+    for row in rows:
+        chave = _chave_view(row)
+        totais[chave] = tuple(a + b for a, b in zip(totais.get(chave, (0, 0, 0)), _totais(row)))
+    return totais
+
+
+def verificar_resumo():
+    """Compara a tabela com a view resumo_orcamento; retorna a lista de divergências"""
+    colunas_view = [getattr(ResumoOrcamento, coluna) for coluna in
+                    COLUNAS_CATEGORIA + ('ano', 'mes', 'total_orcado', 'total_realizado', 'total_dif')]
+    # Consulta por colunas: a PK artificial do modelo da view juntaria linhas no identity map
+    esperado = _acumular(db.session.query(*colunas_view).all())
+    # A tabela como está, sem a carga inicial: uma tabela vazia aparece como divergência
+    atual = _acumular(_consulta_tabela().all())
+
+    divergencias = []
+    for chave in sorted(set(esperado) | set(atual), key=str):
+        if esperado.get(chave) != atual.get(chave):
+            divergencias.append({'chave': chave, 'view': esperado.get(chave), 'tabela': atual.get(chave)})
+    return divergencias
@@ -0,0 +1,172 @@
+"""
+Cache de tokens revogados (logout) para o token_in_blocklist_loader
+- Cada processo guarda os jti de token_blacklist (com a expiração), carregados na primeira
+  verificação
+- A atualização é incremental: as linhas com id acima do maior id já lido menos JANELA_REVOGACAO,
+  no máximo uma vez a cada JWT_REVOGACAO_INTERVALO segundos; nas demais requisições a
+  verificação não vai ao banco. A janela cobre logouts concorrentes que confirmam fora da
+  ordem dos ids (auto_increment é reservado no INSERT, não no COMMIT)
+- O logout inclui o jti no cache do próprio processo na hora; nos outros workers ele passa a
+  valer na próxima atualização (no máximo JWT_REVOGACAO_INTERVALO segundos depois)
+- O cache é exato: encontrar o jti já é a resposta, sem consulta de confirmação
+- Entradas expiradas são ignoradas; a cada JWT_REVOGACAO_LIMPEZA segundos o processo as tira
+  da memória e dispara `limpar_tokens_expirados` numa thread (também em flask purge-tokens-revogados),
+  então a tabela fica limitada às sessões encerradas dentro da validade do token
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, or_, and_
+
+from models import db, TokenBlacklist
+from services.comum import instancia_da_aplicacao
+
+TAMANHO_LOTE_LIMPEZA = 1000
+# Ids abaixo da marca d'água que continuam sendo relidos: transações concorrentes podem
+# confirmar fora da ordem dos ids, e reincluir um jti é idempotente
+JANELA_REVOGACAO = 1000
+
+
+class CacheRevogacao:
+    """jti revogados -> expiração, com marca d'água em TokenBlacklist.id"""
+
+    def __init__(self, intervalo=5.0, intervalo_limpeza=3600.0, validade=None):
+        self.intervalo = intervalo
+        self.intervalo_limpeza = intervalo_limpeza
+        # Expiração das entradas sem expira_em (anteriores à coluna): criado_em + validade
+        self.validade = validade if isinstance(validade, timedelta) else None
+        self._lock = threading.Lock()
+        self._jtis = {}
+        self._ultimo_id = 0
+        self._atualizado_em = None
+        self._limpeza_em = None
+        self.atualizacoes = 0
+        self.verificacoes = 0
+        self.revogados = 0
+        self.limpezas = 0
+
+    def _atualizar(self):
+        """Lê as revogações novas ainda válidas; chamar com o lock"""
+        rows = db.session.query(
+            TokenBlacklist.id, TokenBlacklist.jti, TokenBlacklist.expira_em, TokenBlacklist.criado_em
+        ).filter(TokenBlacklist.id > self._ultimo_id - JANELA_REVOGACAO).order_by(TokenBlacklist.id).all()
+        agora = datetime.utcnow()
+        for id_token, jti, expira_em, criado_em in rows:
+            if expira_em is None and self.validade and criado_em:
+                expira_em = criado_em + self.validade
+            if expira_em is None or expira_em > agora:
+                self._jtis[jti] = expira_em
+        if rows:
+            self._ultimo_id = max(self._ultimo_id, rows[-1][0])
+        self._atualizado_em = time.monotonic()
+        self.atualizacoes += 1
+
+    def _limpar_memoria(self):
+        """Remove as expiradas do cache; chamar com o lock"""
+        agora = datetime.utcnow()
+        self._jtis = {
+            jti: expira_em for jti, expira_em in self._jtis.items()
+            if expira_em is None or expira_em > agora
+        }
+        self._limpeza_em = time.monotonic()
+        self.limpezas += 1
+
+    def _hora_de_limpar(self):
+        if not self.intervalo_limpeza:
+            return False
+        return self._limpeza_em is None or time.monotonic() - self._limpeza_em >= self.intervalo_limpeza
+
+    def revogado(self, jti):
+        limpar_banco = False
+        with self._lock:
+            self.verificacoes += 1
+            if self._atualizado_em is None or time.monotonic() - self._atualizado_em >= self.intervalo:
+                self._atualizar()
+            if self._hora_de_limpar():
+                self._limpar_memoria()
+                limpar_banco = True
+            revogado = jti in self._jtis and (
+                self._jtis[jti] is None or self._jtis[jti] > datetime.utcnow()
+            )
+            if revogado:
+                self.revogados += 1
+
+        if limpar_banco:
+            threading.Thread(
+                target=_limpar_em_segundo_plano, args=(current_app._get_current_object(),),
+                name='limpeza-tokens', daemon=True
+            ).start()
+        return revogado
+
+    def adicionar(self, jti, expira_em=None):
+        """Revogação feita neste processo (depois do commit em token_blacklist)"""
+        with self._lock:
+            self._jtis[jti] = expira_em
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                'jtis': len(self._jtis),
+                'ultimo_id': self._ultimo_id,
+                'intervalo': self.intervalo,
+                'intervalo_limpeza': self.intervalo_limpeza,
+                'atualizacoes': self.atualizacoes,
+                'verificacoes': self.verificacoes,
+                'revogados': self.revogados,
+                'limpezas': self.limpezas,
+            }
+
+
+def cache_revogacao():
+    """Instância da aplicação corrente (app.extensions), criada no primeiro uso"""
+    return instancia_da_aplicacao('revogacao_tokens', lambda: CacheRevogacao(
+        current_app.config.get('JWT_REVOGACAO_INTERVALO', 5.0),
+        current_app.config.get('JWT_REVOGACAO_LIMPEZA', 3600.0),
+        current_app.config.get('JWT_ACCESS_TOKEN_EXPIRES')
+    ))
+
+
+def token_revogado(jti):
+    return cache_revogacao().revogado(jti)
+
+
+def limpar_tokens_expirados(tamanho_lote=TAMANHO_LOTE_LIMPEZA):
+    """Remove de token_blacklist, em lotes, as entradas já expiradas; retorna quantas.
+
+    Entradas sem expira_em (anteriores à coluna) expiram JWT_ACCESS_TOKEN_EXPIRES depois de
+    criado_em. A de maior id sempre fica: com a tabela vazia o banco pode reaproveitar ids
+    abaixo da marca d'água dos caches.
+    """
+    agora = datetime.utcnow()
+    expirada = TokenBlacklist.expira_em < agora
+    validade = current_app.config.get('JWT_ACCESS_TOKEN_EXPIRES')
+    if isinstance(validade, timedelta):
+        expirada = or_(expirada, and_(
+            TokenBlacklist.expira_em.is_(None), TokenBlacklist.criado_em < agora - validade
+        ))
+
+    ultimo = db.session.query(func.max(TokenBlacklist.id)).scalar() or 0
+    removidas = 0
+    while True:
+        ids = [id_token for (id_token,) in db.session.query(TokenBlacklist.id)
+               .filter(expirada, TokenBlacklist.id < ultimo)
+               .order_by(TokenBlacklist.id).limit(tamanho_lote)]
+        if not ids:
+            break
+        removidas += db.session.query(TokenBlacklist).filter(TokenBlacklist.id.in_(ids))\
+            .delete(synchronize_session=False)
+        db.session.commit()
+    return removidas
+
+
+def _limpar_em_segundo_plano(app):
+    with app.app_context():
+        try:
+            removidas = limpar_tokens_expirados()
+            if removidas:
+                app.logger.info(f"Limpeza de tokens revogados: {removidas} entradas expiradas removidas")
+        except Exception as e:
+            db.session.rollback()
+            app.logger.warning(f"Limpeza de tokens revogados falhou: {e}")
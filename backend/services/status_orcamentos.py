@@ -0,0 +1,78 @@
+"""
+Histograma de status dos orçamentos
+- Uma única varredura: COUNT(*) e um SUM(CASE WHEN status = ...) por status, opcionalmente
+  agrupados por ano, uf e/ou master
+- Sem filtro/agrupamento por uf ou master não há JOIN com categorias e a varredura fica no
+  índice idx_orcamento_ano_status (ano, status, id_categoria), que cobre a consulta
+- Usado pelos KPIs do dashboard, pelos contadores do menu lateral e pela caixa de entrada
+  do gestor, que antes faziam um COUNT por status
+"""
+from sqlalchemy import func, case
+
+from models import db, Orcamento, Categoria
+
+STATUS = tuple(Orcamento.__table__.c.status.type.enums)
+
+DIMENSOES = {
+    'ano': Orcamento.ano,
+    'uf': Categoria.uf,
+    'master': Categoria.master,
+}
+
+
+class AgrupamentoInvalido(ValueError):
+    """Dimensão de agrupamento fora de DIMENSOES"""
+
+
+def _contagens(valores):
+    total, *por_status = valores
+    return {
+        'total': total,
+        'por_status': {status: int(n or 0) for status, n in zip(STATUS, por_status)},
+    }
+
+
+def histograma_status(ano=None, mes=None, uf=None, master=None, por=()):
+    """Contagem de orçamentos por status.
+
+    Sem `por`: {'total', 'por_status': {status: n}} (todos os status, mesmo os zerados).
+    Com `por` (ex.: ('ano',)): lista de {<dimensões>, 'total', 'por_status'}, um item por grupo.
+    """
+    por = tuple(por)
+    invalidas = [d for d in por if d not in DIMENSOES]
+    if invalidas:
+        raise AgrupamentoInvalido(
+            f"Agrupamento inválido: {', '.join(invalidas)} (use {', '.join(DIMENSOES)})"
+        )
+
+    colunas = [DIMENSOES[d].label(d) for d in por]
+    query = db.session.query(
+        *colunas,
+        func.count(),
+        *[func.sum(case((Orcamento.status == status, 1), else_=0)) for status in STATUS]
+    ).select_from(Orcamento)
+
+    if uf or master or any(d in ('uf', 'master') for d in por):
+        query = query.join(Categoria, Categoria.id_categoria == Orcamento.id_categoria)
+    if ano:
+        query = query.filter(Orcamento.ano == ano)
+    if mes:
+        query = query.filter(Orcamento.mes == mes)
+    if uf:
+        query = query.filter(Categoria.uf == uf)
+    if master:
+        query = query.filter(Categoria.master == master)
+
+    if not por:
+        return _contagens(query.one())
+
+    rows = query.group_by(*[DIMENSOES[d] for d in por]).order_by(*[DIMENSOES[d] for d in por]).all()
+    return [
+        {**dict(zip(por, row[:len(por)])), **_contagens(row[len(por):])}
+        for row in rows
+    ]
+
+
+def pendentes(ano=None, mes=None, uf=None, master=None):
+    """Orçamentos aguardando aprovação (contador do gestor)"""
+    return histograma_status(ano=ano, mes=mes, uf=uf, master=master)['por_status']['aguardando_aprovacao']
@@ -0,0 +1,144 @@
+"""
+Sugestão de categorias para combinações ausentes na importação
+O índice de trigramas reduz cada busca a uma lista curta de candidatas, que recebe a mesma
+pontuação usada pela busca linear original; é uma aproximação dela (ver IndiceSugestoes).
+"""
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+import numpy as np
+
+LIMIAR_SUGESTAO = 0.45
+
+
+def compute_similarity(a, b):
+    return SequenceMatcher(None, (a or '').lower(), (b or '').lower()).ratio()
+
+
+def _formatar_sugestao(categoria, score):
+    return {
+        'id_categoria': categoria.id_categoria,
+        'categoria': categoria.categoria,
+        'master': categoria.master,
+        'grupo': categoria.grupo,
+        'uf': categoria.uf,
+        'score': round(score, 3)
+    }
+
+
+def find_best_category_suggestion(master, grupo, uf, categorias):
+    """Busca linear de referência: compara a combinação com todas as categorias"""
+    if not categorias:
+        return None
+
+    best = None
+    best_score = 0.0
+    base_master = (master or '').strip()
+    base_grupo = (grupo or '').strip()
+    base_uf = (uf or '').strip().lower()
+
+    for categoria in categorias:
+        master_score = compute_similarity(base_master, categoria.master)
+        grupo_score = compute_similarity(base_grupo, categoria.grupo)
+        uf_score = 1.0 if categoria.uf and categoria.uf.strip().lower() == base_uf and base_uf else 0.0
+        total_score = (master_score + grupo_score + uf_score) / 3.0
+        if total_score > best_score:
+            best_score = total_score
+            best = categoria
+
+    if best and best_score >= LIMIAR_SUGESTAO:
+        return _formatar_sugestao(best, best_score)
+
+    return None
+
+
+def _trigramas(texto):
+    padded = f'  {texto} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _CampoIndexado:
+    """Vocabulário de valores distintos de um campo (master ou grupo) com postings de trigramas"""
+
+    def __init__(self, valores):
+        self.vocabulario = []
+        posicao = {}
+        codigos = []
+        for valor in valores:
+            normalizado = (valor or '').lower()
+            if normalizado not in posicao:
+                posicao[normalizado] = len(self.vocabulario)
+                self.vocabulario.append(normalizado)
+            codigos.append(posicao[normalizado])
+        self.codigos = np.array(codigos, dtype=np.int64)
+
+        postings = defaultdict(list)
+        tamanhos = []
+        for codigo, valor in enumerate(self.vocabulario):
+            trigramas = _trigramas(valor)
+            tamanhos.append(len(trigramas))
+            for trigrama in trigramas:
+                postings[trigrama].append(codigo)
+        self.tamanhos = np.array(tamanhos, dtype=float)
+        self.postings = {t: np.array(c, dtype=np.int64) for t, c in postings.items()}
+
+    def dice(self, consulta):
+        """Coeficiente de Dice entre os trigramas da consulta e cada valor do vocabulário"""
+        trigramas = _trigramas(consulta)
+        listas = [self.postings[t] for t in trigramas if t in self.postings]
+        if not listas:
+            return np.zeros(len(self.vocabulario))
+        comuns = np.bincount(np.concatenate(listas), minlength=len(self.vocabulario))
+        return 2.0 * comuns / (len(trigramas) + self.tamanhos)
+
+    def similaridades(self, consulta, codigos):
+        """SequenceMatcher exato da consulta com cada valor distinto entre `codigos`"""
+        distintos = {
+            codigo: SequenceMatcher(None, consulta, self.vocabulario[codigo]).ratio()
+            for codigo in set(codigos.tolist())
+        }
+        return np.array([distintos[codigo] for codigo in codigos.tolist()])
+
+
+class IndiceSugestoes:
+    """Aproximação de `find_best_category_suggestion` montada uma vez por importação.
+
+    Uma estimativa vetorizada (trigramas em comum por campo + UF exata) escolhe as
+    `limite_candidatos` melhores; só elas recebem a pontuação completa com SequenceMatcher,
+    com a fórmula, o desempate (primeira categoria com maior pontuação) e o limiar da busca
+    linear. Com até `limite_candidatos` categorias o resultado é o da busca linear; acima
+    disso, a melhor pelo SequenceMatcher pode ficar fora das candidatas e a sugestão ser
+    outra (ou nenhuma). testes/bench_sugestoes_categorias.py mede a concordância.
+    """
+
+    def __init__(self, categorias, limite_candidatos=50):
+        self.categorias = list(categorias)
+        self.limite_candidatos = limite_candidatos
+        self._master = _CampoIndexado(c.master for c in self.categorias)
+        self._grupo = _CampoIndexado(c.grupo for c in self.categorias)
+        self._ufs = np.array([(c.uf or '').strip().lower() for c in self.categorias], dtype=object)
+
+    def sugerir(self, master, grupo, uf):
+        if not self.categorias:
+            return None
+
+        base_master = (master or '').strip().lower()
+        base_grupo = (grupo or '').strip().lower()
+        base_uf = (uf or '').strip().lower()
+        uf_scores = (self._ufs == base_uf).astype(float) if base_uf else np.zeros(len(self.categorias))
+
+        estimativa = (self._master.dice(base_master)[self._master.codigos]
+                      + self._grupo.dice(base_grupo)[self._grupo.codigos]
+                      + uf_scores)
+        limite = min(self.limite_candidatos, len(self.categorias))
+        posicoes = np.sort(np.argpartition(-estimativa, limite - 1)[:limite])
+
+        totais = (self._master.similaridades(base_master, self._master.codigos[posicoes])
+                  + self._grupo.similaridades(base_grupo, self._grupo.codigos[posicoes])
+                  + uf_scores[posicoes]) / 3.0
+        melhor = int(np.argmax(totais))  # primeira ocorrência do máximo, como na busca linear
+        best_score = float(totais[melhor])
+        if best_score > 0.0 and best_score >= LIMIAR_SUGESTAO:
+            return _formatar_sugestao(self.categorias[posicoes[melhor]], best_score)
+
+        return None
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""Benchmark das visões do dashboard: agregação SQL (Orcamento JOIN Categoria) x cubo em memória
+
+Uso (a partir da pasta backend):
+    python testes/bench_cubo_analytics.py                 # 2.000 categorias, SQLite em memória
+    python testes/bench_cubo_analytics.py --categorias 5000
+"""
+import os
+import sys
+import time
+import random
+
+os.environ.setdefault('SECRET_KEY', 'bench-secret-key')
+os.environ.setdefault('JWT_SECRET_KEY', 'bench-jwt-secret-key')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, insert
+
+from app import create_app
+from models import db, Categoria, Orcamento
+from services.cubo import CuboOrcamentos, MESES
+from services.resumo import reconstruir_resumo
+
+ANOS = [2023, 2024, 2025]
+UFS = ['BA', 'SP', 'RJ', 'PE', 'MG']
+REPETICOES = 20
+
+DIMENSOES_SQL = {
+    'ano': Orcamento.ano, 'mes': Orcamento.mes, 'uf': Categoria.uf,
+    'master': Categoria.master, 'grupo': Categoria.grupo, 'categoria': Categoria.categoria
+}
+
+# (descrição, filtros, agrupar, ordenar, limite): os recortes usados por dashboard.py
+CONSULTAS = [
+    ('totais do ano', {'ano': [2024]}, [], None, None),
+    ('série mensal', {'ano': [2024]}, ['mes'], None, None),
+    ('série mensal por UF', {'ano': [2024], 'uf': ['SP']}, ['mes'], None, None),
+    ('top 5 centros de custo', {'ano': [2024]}, ['master'], 'dif', 5),
+    ('por categoria', {'ano': [2024], 'master': ['00 Centro']}, ['categoria'], None, None),
+    ('distribuição por grupo', {'ano': [2025]}, ['grupo'], None, None),
+    ('comparativo anual', {}, ['ano'], None, None),
+]
+
+
+def popular(n_categorias, rnd):
+    masters = [f'{i:02d} Centro' for i in range(60)]
+    grupos = [f'Grupo {i}' for i in range(200)]
+    db.session.execute(insert(Categoria), [
+        {'categoria': f'Categoria {i}', 'master': rnd.choice(masters), 'grupo': rnd.choice(grupos),
+         'uf': rnd.choice(UFS), 'cod_class': str(i)}
+        for i in range(n_categorias)
+    ])
+    linhas = []
+    for id_categoria in range(1, n_categorias + 1):
+        for ano in ANOS:
+            for mes in MESES:
+                orcado = round(rnd.uniform(0, 10_000), 2)
+                realizado = round(rnd.uniform(0, 10_000), 2)
+                linhas.append({'id_categoria': id_categoria, 'ano': ano, 'mes': mes,
+                               'orcado': orcado, 'realizado': realizado,
+                               'dif': round(orcado - realizado, 2), 'status': 'aprovado'})
+    db.session.execute(insert(Orcamento), linhas)
+    reconstruir_resumo()
+    return len(linhas)
+
+
+def consulta_sql(filtros, agrupar, ordenar, limite):
+    colunas = [DIMENSOES_SQL[d] for d in agrupar]
+    query = db.session.query(
+        *colunas,
+        func.sum(Orcamento.orcado), func.sum(Orcamento.realizado), func.sum(Orcamento.dif), func.count()
+    ).join(Categoria, Categoria.id_categoria == Orcamento.id_categoria)\
+     .filter(Orcamento.status == 'aprovado')
+    for dim, valores in filtros.items():
+        query = query.filter(DIMENSOES_SQL[dim].in_(valores))
+    if colunas:
+        query = query.group_by(*colunas)
+    resultado = {
+        tuple(row[:len(agrupar)]): tuple(float(v or 0) for v in row[len(agrupar):-1])
+        for row in query.all() if row[-1]
+    }
+    if ordenar:
+        indice = ('orcado', 'realizado', 'dif').index(ordenar)
+        ordenados = sorted(resultado.items(), key=lambda item: abs(item[1][indice]), reverse=True)
+        resultado = dict(ordenados[:limite])
+    return resultado
+
+
+def consulta_cubo(cubo, filtros, agrupar, ordenar, limite):
+    linhas = cubo.consultar(filtros, agrupar, ordenar=ordenar, valor_absoluto=bool(ordenar), limite=limite)
+    return {
+        tuple(linha[d] for d in agrupar): (linha['orcado'], linha['realizado'], linha['dif'])
+        for linha in linhas
+    }
+
+
+def cronometrar(func, *args):
+    inicio = time.perf_counter()
+    for _ in range(REPETICOES):
+        resultado = func(*args)
+    return resultado, (time.perf_counter() - inicio) / REPETICOES
+
+
+if __name__ == '__main__':
+    n_categorias = 2_000
+    if '--categorias' in sys.argv:
+        n_categorias = int(sys.argv[sys.argv.index('--categorias') + 1])
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        n_linhas = popular(n_categorias, random.Random(11))
+
+        cubo = CuboOrcamentos()
+        inicio = time.perf_counter()
+        cubo.atualizar()
+        t_carga = time.perf_counter() - inicio
+
+        print(f"{n_categorias} categorias, {n_linhas} orçamentos aprovados; carga do cubo: {t_carga:.3f}s\n")
+        print(f"{'consulta':<26} | {'SQL (ms)':>9} | {'cubo (ms)':>9} | {'ganho':>7}")
+        for descricao, filtros, agrupar, ordenar, limite in CONSULTAS:
+            esperado, t_sql = cronometrar(consulta_sql, filtros, agrupar, ordenar, limite)
+            obtido, t_cubo = cronometrar(consulta_cubo, cubo, filtros, agrupar, ordenar, limite)
+            assert obtido == esperado, descricao
+            print(f"{descricao:<26} | {t_sql * 1000:>9.2f} | {t_cubo * 1000:>9.3f} | {t_sql / t_cubo:>6.0f}x")
+
+        # Atualização incremental: aprova novos lançamentos e mede a sincronização do cubo
+        novos = [Orcamento(id_categoria=i, ano=2026, mes='Janeiro', orcado=100, realizado=40, status='aprovado')
+                 for i in range(1, 101)]
+        db.session.add_all(novos)
+        from services.cache_respostas import marcar_dados_alterados
+        marcar_dados_alterados()
+        db.session.commit()
+        inicio = time.perf_counter()
+        cubo.atualizar()
+        t_incremental = time.perf_counter() - inicio
+        assert consulta_cubo(cubo, {'ano': [2026]}, [], None, None) == {(): (10000.0, 4000.0, 6000.0)}
+        print(f"\nAtualização incremental (100 chaves): {t_incremental * 1000:.1f}ms "
+              f"(recargas completas: {cubo.recargas})")
+    print("\n✓ Resultados do cubo idênticos aos do SQL")
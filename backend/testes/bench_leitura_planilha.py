@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""Pico de memória da leitura da planilha de orçamentos: pd.read_excel x LeitorPlanilha
+
+Uso (a partir da pasta backend):
+    python testes/bench_leitura_planilha.py [linhas]
+"""
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from openpyxl import Workbook
+from werkzeug.datastructures import FileStorage
+
+from services.planilhas import LeitorPlanilha
+from services.importacao import parse_planilha_orcamentos
+
+COLUNAS = {
+    'master': 'Centro de Custo', 'grupo': 'Grupo', 'uf': 'UF',
+    'ano': 'Ano', 'mes': 'Mes(es)', 'valor': 'Valor'
+}
+
+
+def gerar_xlsx(n):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(list(COLUNAS.values()))
+    for i in range(n):
+        sheet.append([f'{i % 40:02d} Centro', f'Grupo {i % 300}', 'BA', 2025, 'jan, fev, mar', i * 1.5])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def medir(func, conteudo):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    linhas = func(FileStorage(io.BytesIO(conteudo), filename='orcamentos.xlsx'))
+    duracao = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return linhas, duracao, pico / 1024 / 1024
+
+
+def com_read_excel(file):
+    linhas, _ = parse_planilha_orcamentos(pd.read_excel(file), COLUNAS)
+    return len(linhas)
+
+
+def com_leitor(file):
+    return sum(len(parse_planilha_orcamentos(bloco, COLUNAS)[0])
+               for bloco in LeitorPlanilha(file).blocos())
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    conteudo = gerar_xlsx(n)
+    print(f"{n} linhas ({len(conteudo) / 1024 / 1024:.1f} MB .xlsx)")
+    for nome, func in [('pd.read_excel', com_read_excel), ('LeitorPlanilha', com_leitor)]:
+        linhas, duracao, pico = medir(func, conteudo)
+        assert linhas == n
+        print(f"  {nome:<15} {duracao:>7.2f}s  pico {pico:>8.1f} MB")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""Benchmark do custo de autenticação por requisição: consulta a token_blacklist x set em memória
+
+Uso (a partir da pasta backend):
+    python testes/bench_revogacao_jwt.py                  # 20.000 tokens revogados, SQLite em memória
+    python testes/bench_revogacao_jwt.py --revogados 100000
+"""
+import os
+import sys
+import time
+import uuid
+
+os.environ.setdefault('SECRET_KEY', 'bench-secret-key')
+os.environ.setdefault('JWT_SECRET_KEY', 'bench-jwt-secret-key')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token, decode_token
+from sqlalchemy import event, insert
+
+from app import create_app
+from models import db, Usuario, TokenBlacklist
+from services.revogacao_tokens import cache_revogacao, token_revogado
+from services.autorizacao import claims_usuario, token_desatualizado
+
+REQUISICOES = 2_000
+
+
+def verificacao_antiga(_, payload):
+    """token_in_blocklist_loader anterior: uma consulta por requisição"""
+    token = TokenBlacklist.query.filter_by(jti=payload['jti']).first()
+    return token is not None
+
+
+def verificacao_nova(_, payload):
+    return token_revogado(payload['jti']) or token_desatualizado(payload)
+
+
+def medir(app, cliente, cabecalho, verificacao):
+    """(ms por requisição, consultas por requisição) em GET /api/me"""
+    app.extensions['flask-jwt-extended'].token_in_blocklist_loader(verificacao)
+    cliente.get('/api/me', headers=cabecalho)  # aquecimento (carga inicial do set)
+
+    consultas = [0]
+
+    def contar(*_):
+        consultas[0] += 1
+
+    event.listen(db.engine, 'before_cursor_execute', contar)
+    inicio = time.perf_counter()
+    for _ in range(REQUISICOES):
+        assert cliente.get('/api/me', headers=cabecalho).status_code == 200
+    tempo = (time.perf_counter() - inicio) / REQUISICOES
+    event.remove(db.engine, 'before_cursor_execute', contar)
+    return tempo * 1000, consultas[0] / REQUISICOES
+
+
+if __name__ == '__main__':
+    n_revogados = 20_000
+    if '--revogados' in sys.argv:
+        n_revogados = int(sys.argv[sys.argv.index('--revogados') + 1])
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        usuario = Usuario(nome='Bench', email='bench@empresa.com', papel='admin')
+        usuario.set_password('bench')
+        db.session.add(usuario)
+        db.session.execute(insert(TokenBlacklist), [{'jti': str(uuid.uuid4())} for _ in range(n_revogados)])
+        db.session.commit()
+
+        claims = claims_usuario(usuario)
+        token = create_access_token(identity=str(usuario.id_usuario), additional_claims=claims)
+        revogado = create_access_token(identity=str(usuario.id_usuario), additional_claims=claims)
+        cabecalho = {'Authorization': f'Bearer {token}'}
+
+    cliente = app.test_client()
+    with app.app_context():
+        t_antes, q_antes = medir(app, cliente, cabecalho, verificacao_antiga)
+        t_depois, q_depois = medir(app, cliente, cabecalho, verificacao_nova)
+
+        print(f"{n_revogados} tokens revogados, {REQUISICOES} requisições GET /api/me\n")
+        print(f"{'verificação':<22} | {'ms/req':>7} | {'consultas/req':>13}")
+        print(f"{'consulta por jti':<22} | {t_antes:>7.3f} | {q_antes:>13.2f}")
+        print(f"{'set em memória':<22} | {t_depois:>7.3f} | {q_depois:>13.2f}")
+        print(f"\nGanho: {t_antes - t_depois:.3f} ms e {q_antes - q_depois:.2f} consulta por requisição")
+
+        # Revogação pelo logout: o próprio processo recusa o token na hora
+        assert cliente.post('/api/logout', headers={'Authorization': f'Bearer {revogado}'}).status_code == 200
+        assert cliente.get('/api/me', headers={'Authorization': f'Bearer {revogado}'}).status_code == 401
+        # Revogação gravada por outro processo: vale na próxima atualização incremental
+        outro = create_access_token(identity=str(usuario.id_usuario), additional_claims=claims)
+        db.session.add(TokenBlacklist(jti=decode_token(outro)['jti']))
+        db.session.commit()
+        cache_revogacao().intervalo = 0
+        assert cliente.get('/api/me', headers={'Authorization': f'Bearer {outro}'}).status_code == 401
+        print(f"\n✓ Revogações respeitadas: {cache_revogacao().estatisticas()}")
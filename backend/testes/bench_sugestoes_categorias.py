@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""Benchmark das sugestões de categoria: busca linear x índice de trigramas
+
+Uso (a partir da pasta backend):
+    python testes/bench_sugestoes_categorias.py            # linear em amostra de 20 ausentes
+    python testes/bench_sugestoes_categorias.py --completo # linear nas 1.000 ausentes (lento)
+"""
+import os
+import sys
+import time
+import random
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.sugestoes import IndiceSugestoes, find_best_category_suggestion
+
+N_CATEGORIAS = 10_000
+N_AUSENTES = 1_000
+
+PALAVRAS = ['Aluguel', 'Manutenção', 'Combustível', 'Pedágio', 'Frete', 'Seguro', 'Energia',
+            'Telefonia', 'Software', 'Salários', 'Encargos', 'Benefícios', 'Viagens', 'Material',
+            'Escritório', 'Limpeza', 'Segurança', 'Marketing', 'Consultoria', 'Impostos']
+UFS = ['BA', 'SP', 'RJ', 'PE', 'MG', 'CE', 'S Filho', 'Matriz']
+
+
+def gerar_categorias(rnd):
+    masters = [f'{i:02d} {rnd.choice(PALAVRAS)} {rnd.choice(PALAVRAS)}' for i in range(80)]
+    categorias = []
+    for i in range(N_CATEGORIAS):
+        grupo = f'{rnd.choice(PALAVRAS)} {rnd.choice(PALAVRAS)} {i % 2500}'
+        categorias.append(SimpleNamespace(
+            id_categoria=i + 1, categoria=grupo, master=rnd.choice(masters),
+            grupo=grupo, uf=rnd.choice(UFS)
+        ))
+    return categorias
+
+
+def com_erro_de_digitacao(rnd, texto):
+    if len(texto) < 3:
+        return texto
+    pos = rnd.randrange(len(texto))
+    return texto[:pos] + rnd.choice('aeiouxyz') + texto[pos + 1:]
+
+
+def gerar_ausentes(rnd, categorias):
+    ausentes = []
+    for _ in range(N_AUSENTES):
+        base = rnd.choice(categorias)
+        if rnd.random() < 0.8:
+            ausentes.append((com_erro_de_digitacao(rnd, base.master),
+                             com_erro_de_digitacao(rnd, base.grupo), base.uf))
+        else:
+            ausentes.append((f'{rnd.randrange(99)} {rnd.choice(PALAVRAS)}',
+                             f'{rnd.choice(PALAVRAS)} Novo', rnd.choice(UFS)))
+    return ausentes
+
+
+if __name__ == '__main__':
+    rnd = random.Random(7)
+    categorias = gerar_categorias(rnd)
+    ausentes = gerar_ausentes(rnd, categorias)
+    amostra = ausentes if '--completo' in sys.argv else ausentes[:20]
+
+    inicio = time.perf_counter()
+    indice = IndiceSugestoes(categorias)
+    t_montagem = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    resultados_indice = [indice.sugerir(*a) for a in ausentes]
+    t_indice = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    resultados_linear = [find_best_category_suggestion(*a, categorias) for a in amostra]
+    t_linear = (time.perf_counter() - inicio) * len(ausentes) / len(amostra)
+
+    iguais = sum(1 for a, b in zip(resultados_linear, resultados_indice) if a == b)
+
+    print(f"{N_CATEGORIAS} categorias x {N_AUSENTES} combinações ausentes")
+    print(f"  Montagem do índice: {t_montagem:.3f}s")
+    print(f"  Índice de trigramas: {t_indice:.3f}s")
+    estimado = '' if len(amostra) == len(ausentes) else f' (estimado a partir de {len(amostra)} buscas)'
+    print(f"  Busca linear:        {t_linear:.3f}s{estimado}")
+    print(f"  Ganho: {t_linear / (t_montagem + t_indice):.1f}x")
+    print(f"  Mesma sugestão que a busca linear: {iguais}/{len(amostra)}")
@@ -0,0 +1,47 @@
+"""
+Fixtures compartilhadas pelos testes do backend
+- app: aplicação de teste com banco SQLite em memória e um usuário por papel de `papeis`
+- papeis: papéis semeados; um módulo sobrescreve a fixture para mudar a lista
+- _cabecalho: cabeçalho Authorization com o token de um usuário do papel pedido
+Dados específicos de cada módulo entram sobrescrevendo `app` (a fixture recebe a daqui e semeia o resto)
+"""
+import os
+import sys
+
+os.environ.setdefault('SECRET_KEY', 'test-secret-key')
+os.environ.setdefault('JWT_SECRET_KEY', 'test-jwt-secret-key')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from models import db, Usuario
+from services.autorizacao import claims_usuario
+
+
+@pytest.fixture
+def papeis():
+    return ('admin', 'gestor')
+
+
+@pytest.fixture
+def app(papeis, tmp_path):
+    app = create_app('testing')
+    app.config['UPLOAD_FOLDER'] = str(tmp_path)
+    with app.app_context():
+        db.create_all()
+        for papel in papeis:
+            usuario = Usuario(nome=papel.title(), email=f'{papel}@teste.com', papel=papel)
+            usuario.set_password('teste')
+            db.session.add(usuario)
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _cabecalho(papel='admin'):
+    usuario = Usuario.query.filter_by(papel=papel).first()
+    token = create_access_token(identity=str(usuario.id_usuario), additional_claims=claims_usuario(usuario))
+    return {'Authorization': f'Bearer {token}'}
@@ -0,0 +1,155 @@
+"""
+Garante que o cubo analítico, o pivot e a tendência do dashboard batem com o SUM do banco,
+inclusive depois de alterações nos orçamentos e nas categorias
+Uso: cd backend && python -m pytest testes/test_analiticos.py
+"""
+import pytest
+from sqlalchemy import func
+
+from conftest import _cabecalho
+from models import db, Categoria, Orcamento
+from services.cache_respostas import marcar_dados_alterados
+from services.cubo import cubo_orcamentos
+from services.pivot import pivot_orcamentos
+
+DIMENSOES_SQL = {
+    'ano': Orcamento.ano,
+    'mes': Orcamento.mes,
+    'uf': Categoria.uf,
+    'master': Categoria.master,
+    'grupo': Categoria.grupo,
+    'categoria': Categoria.categoria,
+}
+
+
+@pytest.fixture
+def app(app):
+    categorias = [
+        Categoria(categoria=f'Cat{i}', master=f'M{i % 2}', grupo=f'G{i % 3}', uf=('BA', 'SP')[i % 2])
+        for i in range(6)
+    ]
+    db.session.add_all(categorias)
+    db.session.flush()
+    status = ('aprovado', 'aprovado', 'rascunho')
+    db.session.add_all([
+        Orcamento(id_categoria=categoria.id_categoria, mes=mes, ano=ano,
+                  orcado=10 * c + m + 0.25, realizado=(c + m) % 4 or None, status=status[(c + m + ano) % 3])
+        for c, categoria in enumerate(categorias)
+        for m, mes in enumerate(('Janeiro', 'Fevereiro', 'Dezembro'))
+        for ano in (2023, 2024)
+    ])
+    marcar_dados_alterados()
+    db.session.commit()
+    return app
+
+
+def _somas_sql(agrupar, **filtros):
+    colunas = [DIMENSOES_SQL[d] for d in agrupar]
+    query = db.session.query(
+        *colunas, func.sum(Orcamento.orcado), func.sum(Orcamento.realizado), func.count()
+    ).join(Categoria).filter(Orcamento.status == 'aprovado')
+    for dim, valor in filtros.items():
+        query = query.filter(DIMENSOES_SQL[dim] == valor)
+    if colunas:
+        query = query.group_by(*colunas)
+    return {
+        tuple(row[:len(agrupar)]): (round(float(row[-3]), 2), round(float(row[-2] or 0), 2), row[-1])
+        for row in query if row[-1]
+    }
+
+
+def _somas_cubo(agrupar, **filtros):
+    return {
+        tuple(item[d] for d in agrupar): (item['orcado'], item['realizado'], item['linhas'])
+        for item in cubo_orcamentos().consultar(filtros=filtros, agrupar=agrupar)
+    }
+
+
+CONSULTAS = [
+    ([], {}),
+    (['master'], {}),
+    (['ano', 'mes'], {}),
+    (['uf', 'grupo', 'categoria'], {'ano': 2024}),
+    (['mes'], {'master': 'M1'}),
+]
+
+
+def test_cubo_igual_ao_sql(app):
+    for agrupar, filtros in CONSULTAS:
+        assert _somas_cubo(agrupar, **filtros) == _somas_sql(agrupar, **filtros), (agrupar, filtros)
+
+
+def test_cubo_acompanha_alteracoes(app):
+    cubo_orcamentos()
+
+    rascunho = Orcamento.query.filter_by(status='rascunho').first()
+    rascunho.status = 'aprovado'
+    aprovado = Orcamento.query.filter_by(status='aprovado').order_by(Orcamento.id_orcamento.desc()).first()
+    db.session.delete(aprovado)
+    # Mudança só na categoria: o cubo precisa reclassificar as linhas dela
+    db.session.get(Categoria, 1).master = 'M9'
+    marcar_dados_alterados()
+    db.session.commit()
+
+    for agrupar, filtros in CONSULTAS:
+        assert _somas_cubo(agrupar, **filtros) == _somas_sql(agrupar, **filtros), (agrupar, filtros)
+
+    resposta = app.test_client().get('/api/analytics/query?agrupar=master&ordenar=orcado&limite=1',
+                                     headers=_cabecalho())
+    maior = max(_somas_sql(['master']).items(), key=lambda item: item[1][0])
+    assert [(r['master'], r['orcado']) for r in resposta.get_json()['resultado']] == [(maior[0][0], maior[1][0])]
+
+
+def _conferir_subtotais(no):
+    filhos = no.get('filhos')
+    if not filhos:
+        return
+    for medida in ('orcado', 'realizado', 'dif'):
+        assert no[medida] == pytest.approx(sum(f[medida] for f in filhos)), (no['caminho'], medida)
+    for filho in filhos:
+        _conferir_subtotais(filho)
+
+
+def test_pivot_subtotais(app):
+    pivot = pivot_orcamentos(profundidade=4, ano=2024)
+    raiz = {'caminho': {}, 'filhos': pivot['filhos'], **pivot['total']}
+    _conferir_subtotais(raiz)
+    assert pivot['total']['orcado'] == pytest.approx(_somas_sql([], ano=2024)[()][0])
+
+    # Expandir um nó traz só os filhos dele, com os mesmos valores da árvore completa
+    master = pivot['filhos'][0]
+    expandido = pivot_orcamentos([('master', master['nome'])], profundidade=1, ano=2024)
+    assert [(f['nome'], f['orcado']) for f in expandido['filhos']] == \
+        [(f['nome'], f['orcado']) for f in master['filhos']]
+
+
+def test_tendencia_yoy_e_cagr(app):
+    Orcamento.query.delete()
+    db.session.add_all([
+        Orcamento(id_categoria=1, mes='Janeiro', ano=2021, orcado=50, realizado=0, status='aprovado'),
+        Orcamento(id_categoria=1, mes='Janeiro', ano=2022, orcado=100, realizado=0, status='aprovado'),
+        Orcamento(id_categoria=1, mes='Janeiro', ano=2023, orcado=150, realizado=0, status='aprovado'),
+        Orcamento(id_categoria=1, mes='Março', ano=2023, orcado=50, realizado=0, status='aprovado'),
+        Orcamento(id_categoria=1, mes='Janeiro', ano=2024, orcado=400, realizado=0, status='aprovado'),
+        Orcamento(id_categoria=2, mes='Janeiro', ano=2024, orcado=999, realizado=0, status='rascunho'),
+    ])
+    marcar_dados_alterados()
+    db.session.commit()
+
+    resposta = app.test_client().get('/api/dashboard/tendencia?ano_inicio=2022&ano_fim=2024', headers=_cabecalho())
+    assert resposta.status_code == 200, resposta.get_json()
+    tendencia = resposta.get_json()
+    anos = {a['ano']: a for a in tendencia['anos']}
+
+    assert [a['ano'] for a in tendencia['anos']] == [2022, 2023, 2024]
+    assert {ano: a['orcado'] for ano, a in anos.items()} == {2022: 100, 2023: 200, 2024: 400}
+    # O ano anterior ao intervalo (2021) só entra como base do YoY
+    assert [anos[ano]['yoy_pct']['orcado'] for ano in (2022, 2023, 2024)] == [100.0, 100.0, 100.0]
+    meses_2024 = {m['mes']: m for m in anos[2024]['meses']}
+    assert meses_2024['Janeiro']['yoy_pct']['orcado'] == pytest.approx(166.6667, rel=1e-4)
+    # Mês que zerou cai 100%; mês sem valor nos dois anos fica em 0
+    assert meses_2024['Março']['yoy_pct']['orcado'] == -100.0
+    assert meses_2024['Abril']['yoy_pct']['orcado'] == 0.0
+
+    assert tendencia['cagr_pct']['orcado'] == pytest.approx(100.0)
+    assert tendencia['cagr_pct']['realizado'] is None
@@ -0,0 +1,62 @@
+"""
+Garante que papel e nome vêm das claims do token, que alterá-los invalida os tokens emitidos
+e que require_role nega (403) os papéis não autorizados
+Uso: cd backend && python -m pytest testes/test_autorizacao.py
+"""
+import pytest
+
+from conftest import _cabecalho
+from models import Usuario
+
+
+@pytest.fixture
+def papeis():
+    return ('admin', 'gestor', 'visualizador')
+
+
+@pytest.mark.parametrize('alteracao', [{'nome': 'Gestora'}, {'papel': 'visualizador'}])
+def test_alterar_claims_invalida_tokens(app, alteracao):
+    client = app.test_client()
+    gestor = Usuario.query.filter_by(papel='gestor').first()
+    antigo = _cabecalho('gestor')
+    assert client.get('/api/me', headers=antigo).status_code == 200
+
+    resposta = client.put(f'/api/usuarios/{gestor.id_usuario}', headers=_cabecalho('admin'), json=alteracao)
+    assert resposta.status_code == 200, resposta.get_json()
+
+    assert client.get('/api/me', headers=antigo).status_code == 401
+    login = client.post('/api/login', json={'email': 'gestor@teste.com', 'senha': 'teste'}).get_json()
+    novo = {'Authorization': f"Bearer {login['access_token']}"}
+    assert client.get('/api/me', headers=novo).get_json()['nome'] == alteracao.get('nome', 'Gestor')
+
+
+def test_alterar_senha_mantem_tokens(app):
+    client = app.test_client()
+    gestor = Usuario.query.filter_by(papel='gestor').first()
+    antigo = _cabecalho('gestor')
+
+    resposta = client.put(f'/api/usuarios/{gestor.id_usuario}', headers=_cabecalho('admin'),
+                          json={'senha': 'nova', 'papel': 'gestor'})
+    assert resposta.status_code == 200, resposta.get_json()
+    assert client.get('/api/me', headers=antigo).status_code == 200
+
+
+@pytest.mark.parametrize('papel, metodo, rota', [
+    ('visualizador', 'get', '/api/dashboard/cache'),
+    ('gestor', 'get', '/api/analytics/status'),
+    ('gestor', 'post', '/api/orcamentos/import'),
+    ('admin', 'post', '/api/orcamentos/batch_approve'),
+    ('visualizador', 'post', '/api/orcamentos/batch_reprove'),
+])
+def test_require_role_nega_acesso(app, papel, metodo, rota):
+    resposta = getattr(app.test_client(), metodo)(rota, headers=_cabecalho(papel), json={'ids': [1]})
+    assert resposta.status_code == 403
+    assert resposta.get_json() == {'error': 'Acesso negado'}
+
+
+@pytest.mark.parametrize('papel, rota', [
+    ('admin', '/api/dashboard/cache'),
+    ('admin', '/api/analytics/status'),
+])
+def test_require_role_permite_papel(app, papel, rota):
+    assert app.test_client().get(rota, headers=_cabecalho(papel)).status_code == 200
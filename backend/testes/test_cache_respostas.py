@@ -0,0 +1,90 @@
+"""
+Garante que os GETs do dashboard respondem 304 enquanto a versão dos dados não muda e voltam
+a 200 com ETag nova depois de marcar_dados_alterados; a chave usa os filtros como as views os
+leem e cada aplicação tem o seu cache
+Uso: cd backend && python -m pytest testes/test_cache_respostas.py
+"""
+import pytest
+
+from app import create_app
+from conftest import _cabecalho
+from models import db, Categoria, Orcamento
+from services.cache_respostas import cache_respostas, marcar_dados_alterados
+
+
+@pytest.fixture
+def app(app):
+    db.session.add(Categoria(categoria='Frete', master='LOG', grupo='G', uf='BA'))
+    db.session.flush()
+    db.session.add_all([
+        Orcamento(id_categoria=1, mes='Janeiro', ano=2024, orcado=10, realizado=0, status='aprovado'),
+        Orcamento(id_categoria=1, mes='Fevereiro', ano=2024, orcado=5, realizado=0, status='aguardando_aprovacao'),
+    ])
+    db.session.commit()
+    return app
+
+
+def _total_orcado(resposta):
+    return resposta.get_json()['totais']['total_orcado']
+
+
+def test_304_ate_os_dados_mudarem(app):
+    client = app.test_client()
+    cabecalho = _cabecalho()
+
+    resposta = client.get('/api/dashboard?ano=2024', headers=cabecalho)
+    assert resposta.status_code == 200
+    assert resposta.headers['Cache-Control'] == 'private, no-cache'
+    etag = resposta.headers['ETag']
+    antes = _total_orcado(resposta)
+
+    revalidacao = client.get('/api/dashboard?ano=2024', headers={**cabecalho, 'If-None-Match': etag})
+    assert revalidacao.status_code == 304
+    assert revalidacao.headers['ETag'] == etag
+    assert revalidacao.get_data() == b''
+
+    # Outros filtros são outra entrada, com outra ETag
+    assert client.get('/api/dashboard?ano=2023', headers=cabecalho).headers['ETag'] != etag
+
+    orcamento = Orcamento.query.filter_by(mes='Janeiro').first()
+    orcamento.orcado = 30
+    marcar_dados_alterados()
+    db.session.commit()
+
+    resposta = client.get('/api/dashboard?ano=2024', headers={**cabecalho, 'If-None-Match': etag})
+    assert resposta.status_code == 200
+    assert resposta.headers['ETag'] != etag
+    assert _total_orcado(resposta) == antes + 20
+
+
+def test_escrita_pela_api_invalida_etag(app):
+    client = app.test_client()
+    cabecalho = _cabecalho()
+    etag = client.get('/api/dashboard?ano=2024', headers=cabecalho).headers['ETag']
+
+    pendente = Orcamento.query.filter_by(status='aguardando_aprovacao').first()
+    resposta = client.post('/api/orcamentos/batch_approve', headers=_cabecalho('gestor'),
+                           json={'ids': [pendente.id_orcamento]})
+    assert resposta.status_code == 200, resposta.get_json()
+
+    resposta = client.get('/api/dashboard?ano=2024', headers={**cabecalho, 'If-None-Match': etag})
+    assert resposta.status_code == 200
+    assert _total_orcado(resposta) == 15
+
+
+def test_chave_usa_os_filtros_como_a_view_le(app):
+    client = app.test_client()
+    cabecalho = _cabecalho()
+    assert _total_orcado(client.get('/api/dashboard?ano=2024&uf=BA', headers=cabecalho)) == 10
+
+    # A view filtra por ' BA' literalmente: não pode reaproveitar a resposta de 'BA'
+    resposta = client.get('/api/dashboard?ano=2024&uf=%20BA', headers=cabecalho)
+    assert _total_orcado(resposta) == 0
+
+
+def test_cache_por_aplicacao(app):
+    outra = create_app('testing')
+    with outra.app_context():
+        cache_outra = cache_respostas()
+    assert cache_respostas() is cache_respostas()
+    assert cache_respostas() is not cache_outra
@@ -0,0 +1,53 @@
+"""
+Garante que o catálogo de dimensões devolve cada lista na ordem do ORDER BY do banco (a
+collation das colunas, não o sorted do Python), sem nulos, vazios ou repetidos
+Uso: cd backend && python -m pytest testes/test_catalogo.py
+"""
+import re
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.schema import CreateTable
+
+from conftest import _cabecalho
+from models import db, Categoria
+from services.catalogo import catalogo
+
+COLUNAS = {
+    'ufs': Categoria.uf,
+    'masters': Categoria.master,
+    'grupos': Categoria.grupo,
+    'categorias': Categoria.categoria,
+}
+
+
+@pytest.fixture
+def app(app):
+    # Textos com collation sem distinção de maiúsculas, como as _ci do MySQL: a ordem do banco
+    # deixa de ser a do sorted() e o teste distingue as duas
+    ddl = str(CreateTable(Categoria.__table__).compile(db.engine))
+    db.session.execute(text('DROP TABLE categorias'))
+    db.session.execute(text(re.sub(r'(VARCHAR\(\d+\))', r'\1 COLLATE NOCASE', ddl)))
+    db.session.add_all([
+        Categoria(categoria=categoria, master=master, grupo=grupo, uf=uf)
+        for categoria, master, grupo, uf in [
+            ('beta', 'Água', 'Frete', 'SP'),
+            ('Alfa', 'agua', 'Frete', 'BA'),
+            ('gama', 'Zeta', '', None),
+            ('beta', 'Ônibus', 'aluguel', 'SP'),
+        ]
+    ])
+    db.session.commit()
+    return app
+
+
+def test_ordem_do_banco(app):
+    dados = catalogo().obter()
+    assert dados['masters'][:2] == ['agua', 'Zeta']
+    for dimensao, coluna in COLUNAS.items():
+        esperado = [valor for (valor,) in db.session.query(coluna).distinct()
+                    .filter(coluna.isnot(None), coluna != '').order_by(coluna)]
+        assert dados[dimensao] == esperado, dimensao
+
+    resposta = app.test_client().get('/api/categorias/filtros', headers=_cabecalho())
+    assert resposta.status_code == 200, resposta.get_json()
@@ -0,0 +1,122 @@
+"""
+Garante que as operações em lote sobre orçamentos fazem um número constante de consultas
+Uso: cd backend && python -m pytest testes/test_consultas_lote.py
+"""
+import pytest
+from sqlalchemy import event
+
+from conftest import _cabecalho
+from models import db, Categoria, Orcamento, Log
+
+
+def _criar_orcamentos(quantidade, status):
+    categorias = [Categoria(categoria=f'Cat{i}', master='M', grupo=f'G{i}', uf='BA') for i in range(10)]
+    db.session.add_all(categorias)
+    db.session.flush()
+    orcamentos = [
+        Orcamento(id_categoria=categorias[i % 10].id_categoria, mes='Janeiro', ano=2000 + i,
+                  orcado=10, realizado=4, status=status)
+        for i in range(quantidade)
+    ]
+    db.session.add_all(orcamentos)
+    db.session.commit()
+    return [o.id_orcamento for o in orcamentos]
+
+
+def _contar_consultas(app, client, rota, papel, ids):
+    cabecalho = _cabecalho(papel)
+    consultas = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        consultas.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', contar)
+    try:
+        resposta = client.post(rota, headers=cabecalho, json={'ids': ids})
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', contar)
+    assert resposta.status_code == 200, resposta.get_json()
+    return len(consultas), resposta.get_json()
+
+
+@pytest.mark.parametrize('rota, papel, status_inicial, chave_log', [
+    ('/api/orcamentos/batch_submit', 'admin', 'rascunho', 'orcamentos_submetidos'),
+    ('/api/orcamentos/batch_reprove', 'gestor', 'aguardando_aprovacao', 'orcamentos_reprovados'),
+])
+def test_lote_com_consultas_constantes(app, rota, papel, status_inicial, chave_log):
+    client = app.test_client()
+    ids = _criar_orcamentos(205, status_inicial)
+
+    # A primeira chamada cria o contador de versão dos dados; fica fora da comparação
+    _contar_consultas(app, client, rota, papel, ids[:5])
+    poucas, _ = _contar_consultas(app, client, rota, papel, ids[5:10])
+    muitas, resposta = _contar_consultas(app, client, rota, papel, ids[10:] + [999999])
+
+    assert muitas == poucas
+    assert resposta['errors'] == ['Orçamento com ID 999999 não encontrado.']
+
+    log = Log.query.order_by(Log.id_log.desc()).first()
+    snapshot = log.detalhes[chave_log]
+    assert len(snapshot) == 195
+    assert snapshot[0]['categoria_nome'].startswith('Cat')
+    assert snapshot[0]['ano'] == 2010
+
+
+def test_grade_com_consultas_constantes(app):
+    client = app.test_client()
+    _criar_orcamentos(0, 'rascunho')
+    cabecalho = _cabecalho('admin')
+
+    def salvar(anos):
+        itens = [{'id_categoria': 1 + i % 10, 'mes': mes, 'ano': ano, 'orcado': 10, 'realizado': 4}
+                 for i, ano in enumerate(anos) for mes in range(1, 13)]
+        consultas = []
+
+        def contar(conn, cursor, statement, parameters, context, executemany):
+            consultas.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', contar)
+        try:
+            resposta = client.post('/api/orcamentos/batch', headers=cabecalho, json={'orcamentos': itens})
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', contar)
+        assert resposta.status_code == 200, resposta.get_json()
+        return len(consultas), resposta.get_json()
+
+    salvar([1990])
+    poucas, _ = salvar([2000, 2001])
+    muitas, resposta = salvar(range(2002, 2030))
+
+    assert muitas == poucas
+    assert resposta['created'] == 28 * 12
+    assert len(resposta['orcamentos']) == 28 * 12
+
+    # Regravar as mesmas chaves vira atualização, também com consultas constantes
+    poucas, _ = salvar([2000, 2001])
+    muitas, resposta = salvar(range(2002, 2030))
+    assert muitas == poucas
+    assert (resposta['created'], resposta['updated']) == (0, 28 * 12)
+
+
+def test_aprovacao_em_lote(app):
+    client = app.test_client()
+    nulo, aprovado, pendente = _criar_orcamentos(3, 'aguardando_aprovacao')
+    db.session.query(Orcamento).filter_by(id_orcamento=nulo).update({'status': None})
+    db.session.query(Orcamento).filter_by(id_orcamento=aprovado).update({'status': 'aprovado'})
+    db.session.commit()
+
+    resposta = client.post('/api/orcamentos/batch_approve', headers=_cabecalho('gestor'),
+                           json={'ids': [nulo, aprovado, pendente, 999999]})
+    assert resposta.status_code == 200, resposta.get_json()
+    assert resposta.get_json()['errors'] == [
+        f'Orçamento com ID {aprovado} já está aprovado.',
+        'Orçamento com ID 999999 não encontrado.',
+    ]
+
+    # Status nulo conta como não aprovado, como no fluxo linha a linha
+    assert {o.id_orcamento: o.status for o in Orcamento.query} == {
+        nulo: 'aprovado', aprovado: 'aprovado', pendente: 'aprovado'
+    }
+    log = Log.query.order_by(Log.id_log.desc()).first()
+    assert log.detalhes['aprovados'] == [nulo, pendente]
+    assert log.detalhes['atualizados'] == 2
@@ -0,0 +1,112 @@
+"""
+Garante que a caixa de entrada do gestor limita a submissão virtual, reaproveita as facetas
+enquanto a versão dos dados não muda e que o backfill-fluxo migra os logs antigos uma vez só
+Uso: cd backend && python -m pytest testes/test_fluxo_aprovacao.py
+"""
+import pytest
+from sqlalchemy import event
+
+from conftest import _cabecalho
+from models import db, Usuario, Categoria, Orcamento, Log, Submissao, Reprovacao
+from services import fluxo_aprovacao
+
+
+@pytest.fixture
+def app(app):
+    categorias = [Categoria(categoria=f'Cat{i}', master=f'M{i}', grupo='G', uf='BA') for i in range(5)]
+    db.session.add_all(categorias)
+    db.session.flush()
+    db.session.add_all([
+        Orcamento(id_categoria=categorias[i].id_categoria, mes='Janeiro', ano=2024,
+                  orcado=10, realizado=0, status='aguardando_aprovacao')
+        for i in range(5)
+    ])
+    db.session.commit()
+    return app
+
+
+def test_submissao_virtual_limitada(app, monkeypatch):
+    monkeypatch.setattr(fluxo_aprovacao, 'LIMITE_SUBMISSAO_VIRTUAL', 3)
+
+    virtual = fluxo_aprovacao.submissao_virtual()
+    assert virtual['total_submetidos'] == 5
+    assert virtual['truncado'] is True
+    assert len(virtual['orcamentos']) == 3
+    # As facetas cobrem todos os orçamentos soltos, não só os devolvidos
+    assert sorted(virtual['masters']) == ['M0', 'M1', 'M2', 'M3', 'M4']
+
+    virtual = fluxo_aprovacao.submissao_virtual({'master': 'M4'})
+    assert (virtual['total_submetidos'], virtual['truncado']) == (1, False)
+    assert fluxo_aprovacao.submissao_virtual({'ano': 1999}) is None
+
+
+def test_filtros_por_versao_dos_dados(app):
+    client = app.test_client()
+    cabecalho = _cabecalho('gestor')
+    client.get('/api/orcamentos/submissions', headers=cabecalho)
+
+    consultas = []
+
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        consultas.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', contar)
+    try:
+        fluxo_aprovacao.filtros_submissoes()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', contar)
+    assert len(consultas) == 1  # só a leitura da versão
+
+    # Uma submissão nova muda a versão e entra nos filtros
+    ids = [o.id_orcamento for o in Orcamento.query.limit(2)]
+    db.session.query(Orcamento).filter(Orcamento.id_orcamento.in_(ids)).update({'status': 'rascunho'})
+    db.session.commit()
+    resposta = client.post('/api/orcamentos/batch_submit', headers=_cabecalho('admin'), json={'ids': ids})
+    assert resposta.status_code == 200, resposta.get_json()
+
+    filtros = client.get('/api/orcamentos/submissions', headers=cabecalho).get_json()['filtros']
+    assert filtros['anos'] == [2024]
+    assert filtros['masters'] == ['M0', 'M1']
+
+
+def test_migrar_historico_logs(app):
+    gestor = Usuario.query.filter_by(papel='gestor').first()
+    orcamentos = Orcamento.query.order_by(Orcamento.id_orcamento).all()
+    db.session.add_all([
+        # Log antigo só com ids: categoria e valores vêm do orçamento atual
+        Log(id_usuario=1, acao='Submissão em lote', tabela_afetada='orcamentos', detalhes={
+            'orcamentos_submetidos': [{'id_orcamento': o.id_orcamento} for o in orcamentos[:2]],
+            'total_submetidos': 2,
+        }),
+        Log(id_usuario=gestor.id_usuario, acao='Reprovação em lote', tabela_afetada='orcamentos', detalhes={
+            'orcamentos_reprovados': [{'id_orcamento': orcamentos[2].id_orcamento, 'master': 'M2'}],
+            'motivo': 'Acima do teto',
+            'total_reprovados': 1,
+        }),
+        Log(id_usuario=gestor.id_usuario, acao='Reprovou orçamento', tabela_afetada='orcamentos', detalhes={
+            'orcamento': {'id_orcamento': orcamentos[3].id_orcamento, 'id_categoria': orcamentos[3].id_categoria,
+                          'mes': 'Janeiro', 'ano': 2024},
+            'motivo': 'Duplicado',
+        }),
+        Log(id_usuario=1, acao='Submissão em lote', tabela_afetada='categorias', detalhes={}),
+    ])
+    db.session.commit()
+
+    assert fluxo_aprovacao.migrar_historico_logs() == {
+        'submissoes': 1, 'reprovacoes_lote': 1, 'reprovacoes_individuais': 1
+    }
+    submissao = Submissao.query.one()
+    assert submissao.total == 2
+    assert [(i.master, float(i.orcado), i.mes) for i in submissao.itens] == [('M0', 10.0, 'Janeiro'),
+                                                                          ('M1', 10.0, 'Janeiro')]
+    reprovacoes = {r.tipo: r for r in Reprovacao.query}
+    assert (reprovacoes['lote'].motivo, reprovacoes['lote'].gestor_usuario) == ('Acima do teto', 'Gestor')
+    individual = reprovacoes['individual']
+    assert (individual.motivo, individual.total) == ('Duplicado', 1)
+    assert [(i.categoria_nome, i.master) for i in individual.itens] == [('Cat3', 'M3')]
+
+    # Rodar de novo não duplica nada
+    assert fluxo_aprovacao.migrar_historico_logs() == {
+        'submissoes': 0, 'reprovacoes_lote': 0, 'reprovacoes_individuais': 0
+    }
+    assert (Submissao.query.count(), Reprovacao.query.count()) == (1, 2)
@@ -0,0 +1,164 @@
+"""
+Garante que o job de importação grava tudo ou nada, publica a versão dos dados uma vez só,
+publica o progresso sem passar pela sessão da importação e só gera prévia em disco quando
+faltam categorias
+Uso: cd backend && python -m pytest testes/test_importacao_jobs.py
+"""
+import io
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from openpyxl import Workbook
+
+from conftest import _cabecalho
+from models import db, Categoria, Orcamento, Log, ImportacaoJob
+from services.cache_respostas import versao_dados
+from services.importacao import ImportacaoOrcamentos
+from services import jobs_importacao
+from services.jobs_importacao import executar_job, encerrar_jobs_interrompidos
+
+
+@pytest.fixture
+def app(app):
+    db.session.add(Categoria(categoria='Frete', master='LOG', grupo='Frete', uf='BA'))
+    db.session.commit()
+    return app
+
+
+def _planilha(linhas):
+    workbook = Workbook()
+    planilha = workbook.active
+    planilha.append(['Centro de Custo', 'Grupo', 'UF', 'Ano', 'Mes(es)', 'Valor'])
+    for linha in linhas:
+        planilha.append(linha)
+    conteudo = io.BytesIO()
+    workbook.save(conteudo)
+    return conteudo.getvalue()
+
+
+def _executar(app, linhas=None, opcoes=None, preview_token=None):
+    id_job = str(uuid.uuid4())
+    caminho = None
+    if linhas is not None:
+        caminho = os.path.join(app.config['UPLOAD_FOLDER'], f'{id_job}.xlsx')
+        with open(caminho, 'wb') as f:
+            f.write(_planilha(linhas))
+    opcoes = dict(opcoes or {})
+    if preview_token:
+        opcoes['preview_token'] = preview_token
+    db.session.add(ImportacaoJob(id_job=id_job, id_usuario=1, arquivo='orcamentos.xlsx',
+                                 caminho=caminho, opcoes=opcoes, status='pendente'))
+    db.session.commit()
+    executar_job(app, id_job)
+    db.session.expire_all()
+    return db.session.get(ImportacaoJob, id_job)
+
+
+def _previas(app):
+    pasta = os.path.join(app.config['UPLOAD_FOLDER'], 'previas')
+    return os.listdir(pasta) if os.path.isdir(pasta) else []
+
+
+def test_importacao_sem_categorias_ausentes(app):
+    versao = versao_dados()
+    job = _executar(app, [['LOG', 'Frete', 'BA', 2024, 'jan, fev', 100]])
+
+    assert job.status == 'concluido', job.erro
+    assert job.resultado['created'] == 2
+    assert (job.linhas_lidas, job.lancamentos_gravados) == (1, 2)
+    assert versao_dados() == versao + 1
+    assert Log.query.count() == 1
+    assert _previas(app) == []
+
+
+def test_progresso_nao_passa_pela_sessao(app, monkeypatch):
+    publicar = jobs_importacao._publicar_progresso
+    pendencias = []
+
+    def observar(id_job):
+        progresso = publicar(id_job)
+
+        def observado(importacao):
+            progresso(importacao)
+            # No MySQL um UPDATE do job pela sessão travaria a linha que a conexão do progresso atualiza
+            pendencias.append([j for j in db.session.dirty if isinstance(j, ImportacaoJob)])
+        return observado
+
+    monkeypatch.setattr(jobs_importacao, '_publicar_progresso', observar)
+    job = _executar(app, [['LOG', 'Frete', 'BA', 2024, 'jan, fev, mar', 10]])
+
+    assert job.status == 'concluido', job.erro
+    assert pendencias and not any(pendencias)
+    # Os contadores finais vão para o job no commit da importação
+    assert (job.linhas_lidas, job.linhas_processadas, job.lancamentos_gravados) == (1, 1, 3)
+
+
+def test_previa_so_com_categorias_ausentes(app):
+    linhas = [['LOG', 'Frete', 'BA', 2024, 'jan', 100], ['ADM', 'Aluguel', 'SP', 2024, 'mar', 50]]
+    job = _executar(app, linhas)
+
+    assert job.resultado['status'] == 'missing_categories'
+    assert [m['key'] for m in job.resultado['missing']] == ['ADM|Aluguel|SP']
+    assert Orcamento.query.count() == 0
+    token = job.resultado['preview_token']
+    assert _previas(app) == [token]
+
+    # A confirmação lê a prévia (sem arquivo) e a descarta depois de gravar
+    job = _executar(app, opcoes={'create_missing': True}, preview_token=token)
+    assert job.status == 'concluido', job.erro
+    assert job.resultado['categories_created'] == 1
+    assert Orcamento.query.count() == 2
+    assert _previas(app) == []
+
+
+def test_rota_sincrona_so_guarda_previa_com_categorias_ausentes(app):
+    cabecalho = _cabecalho('admin')
+    client = app.test_client()
+
+    def enviar(linhas):
+        arquivo = (io.BytesIO(_planilha(linhas)), 'orcamentos.xlsx')
+        resposta = client.post('/api/orcamentos/import', headers=cabecalho, data={'file': arquivo},
+                               content_type='multipart/form-data')
+        assert resposta.status_code == 200, resposta.get_json()
+        return resposta.get_json()
+
+    assert enviar([['LOG', 'Frete', 'BA', 2024, 'jan', 100]])['created'] == 1
+    assert _previas(app) == []
+    resposta = enviar([['ADM', 'Aluguel', 'SP', 2024, 'jan', 100]])
+    assert _previas(app) == [resposta['preview_token']]
+
+
+def test_falha_nao_deixa_importacao_pela_metade(app, monkeypatch):
+    versao = versao_dados()
+
+    # Falha depois de todos os lançamentos terem sido gravados na transação
+    def falhar(self, id_usuario, arquivo):
+        raise RuntimeError('falha simulada')
+
+    monkeypatch.setattr(ImportacaoOrcamentos, 'registrar_log', falhar)
+    job = _executar(app, [['LOG', 'Frete', 'BA', 2024, 'jan', 100], ['NOVO', 'Aluguel', 'SP', 2025, 'jan', 100]],
+                    opcoes={'create_missing': True})
+
+    assert job.status == 'erro'
+    assert 'nenhum lançamento foi gravado' in job.erro
+    assert job.lancamentos_gravados == 0
+    assert Orcamento.query.count() == 0
+    assert Log.query.count() == 0
+    assert Categoria.query.count() == 1
+    assert versao_dados() == versao
+
+
+def test_jobs_interrompidos(app):
+    antigo = datetime.utcnow() - timedelta(hours=2)
+    db.session.add_all([
+        ImportacaoJob(id_job='parado', id_usuario=1, status='processando', criado_em=antigo, iniciado_em=antigo),
+        ImportacaoJob(id_job='na-fila', id_usuario=1, status='pendente', criado_em=antigo),
+        ImportacaoJob(id_job='rodando', id_usuario=1, status='processando', iniciado_em=datetime.utcnow()),
+    ])
+    db.session.commit()
+
+    assert encerrar_jobs_interrompidos(3600) == 2
+    status = {j.id_job: j.status for j in ImportacaoJob.query}
+    assert status == {'parado': 'erro', 'na-fila': 'erro', 'rodando': 'processando'}
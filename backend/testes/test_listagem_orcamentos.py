@@ -0,0 +1,66 @@
+"""
+Garante que a paginação por cursor de GET /orcamentos percorre tudo na ordem (ano desc, mês, id)
+sem repetir nem pular linhas, inclusive nas bordas de página
+Uso: cd backend && python -m pytest testes/test_listagem_orcamentos.py
+"""
+import pytest
+
+from conftest import _cabecalho
+from models import db, Categoria, Orcamento
+from services.comum import MESES
+
+
+@pytest.fixture
+def app(app):
+    categorias = [Categoria(categoria=f'Cat{i}', master='M', grupo='G', uf='BA') for i in range(3)]
+    db.session.add_all(categorias)
+    db.session.flush()
+    # Meses fora de ordem e várias linhas por (ano, mês) para exercitar o desempate por id
+    db.session.add_all([
+        Orcamento(id_categoria=categoria.id_categoria, mes=mes, ano=ano, orcado=1, realizado=0, status='rascunho')
+        for ano in (2023, 2024)
+        for mes in ('Dezembro', 'Janeiro', 'Março')
+        for categoria in categorias
+    ])
+    db.session.commit()
+    return app
+
+
+def _paginas(client, limite, **filtros):
+    paginas = []
+    params = {'limit': limite, **filtros}
+    while True:
+        resposta = client.get('/api/orcamentos', headers=_cabecalho(), query_string=params)
+        assert resposta.status_code == 200, resposta.get_json()
+        paginas.append([o['id_orcamento'] for o in resposta.get_json()])
+        cursor = resposta.headers.get('X-Next-Cursor')
+        if not cursor:
+            return paginas
+        params['cursor'] = cursor
+
+
+@pytest.mark.parametrize('limite', [1, 4, 6, 18, 50])
+def test_cursor_percorre_tudo_na_ordem(app, limite):
+    esperado = [o.id_orcamento for o in sorted(
+        Orcamento.query, key=lambda o: (-o.ano, MESES.index(o.mes), o.id_orcamento)
+    )]
+    paginas = _paginas(app.test_client(), limite)
+
+    assert [i for pagina in paginas for i in pagina] == esperado
+    assert all(len(pagina) == limite for pagina in paginas[:-1])
+    # Total múltiplo do limite: a última página vem cheia e sem cursor (nunca uma página vazia)
+    assert paginas[-1]
+    assert len(paginas) == -(-len(esperado) // limite)
+
+
+def test_cursor_com_filtros(app):
+    paginas = _paginas(app.test_client(), 2, ano=2024, mes=3)
+    ids = [i for pagina in paginas for i in pagina]
+    assert len(ids) == 3
+    assert {(o.ano, o.mes) for o in Orcamento.query.filter(Orcamento.id_orcamento.in_(ids))} == {(2024, 'Março')}
+
+
+@pytest.mark.parametrize('params', [{'cursor': 'nao-e-cursor'}, {'limit': 0}])
+def test_parametros_invalidos(app, params):
+    resposta = app.test_client().get('/api/orcamentos', headers=_cabecalho(), query_string=params)
+    assert resposta.status_code == 400
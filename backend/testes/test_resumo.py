@@ -0,0 +1,201 @@
+"""
+Garante que o resumo materializado é carregado quando está vazio, acompanha as alterações de
+orçamentos aprovados (e bate com a view resumo_orcamento, como no verify-resumo) e que a limpeza
+do feed resumo_alteracoes é disparada pelas escritas no intervalo configurado; a exportação
+em Excel sai na ordem (ano desc, mês, categoria)
+Uso: cd backend && python -m pytest testes/test_resumo.py
+"""
+import io
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+from sqlalchemy import func, text
+
+from models import (
+    db, Categoria, Orcamento, AlteracaoResumo, ResumoOrcamento, ResumoOrcamentoMaterializado as Resumo
+)
+from conftest import _cabecalho
+from services import resumo
+from services.cache_respostas import marcar_dados_alterados
+
+
+@pytest.fixture
+def app(app):
+    db.session.add_all([Categoria(categoria=f'Cat{i}', master='M', grupo='G', uf='BA') for i in range(2)])
+    db.session.commit()
+    return app
+
+
+# Mesma definição de acoesBD/create_resumo_view.py (sem o ORDER BY)
+VIEW_RESUMO = """
+CREATE VIEW resumo_orcamento AS
+SELECT c.categoria, c.uf, c.master, c.grupo, c.cod_class, c.classe_custo, o.ano, o.mes,
+       SUM(CAST(o.orcado AS DECIMAL(15, 2))) AS total_orcado,
+       SUM(CAST(o.realizado AS DECIMAL(15, 2))) AS total_realizado,
+       SUM(CAST(o.dif AS DECIMAL(15, 2))) AS total_dif
+FROM orcamentos o
+INNER JOIN categorias c ON o.id_categoria = c.id_categoria
+WHERE o.status = 'aprovado'
+GROUP BY c.id_categoria, c.categoria, c.uf, c.master, c.grupo, c.cod_class, c.classe_custo, o.ano, o.mes
+"""
+
+
+@pytest.fixture
+def view_resumo(app):
+    """Troca a tabela criada pelo create_all pela view real (e desfaz para o drop_all)"""
+    ResumoOrcamento.__table__.drop(db.engine)
+    with db.engine.begin() as conn:
+        conn.execute(text(VIEW_RESUMO))
+    yield
+    db.session.remove()
+    with db.engine.begin() as conn:
+        conn.execute(text('DROP VIEW resumo_orcamento'))
+    ResumoOrcamento.__table__.create(db.engine)
+
+
+def _esperado():
+    """Totais dos aprovados por (id_categoria, ano, mes), como a view calcula"""
+    return {
+        (r.id_categoria, r.ano, r.mes): float(r.orcado)
+        for r in db.session.query(
+            Orcamento.id_categoria, Orcamento.ano, Orcamento.mes, func.sum(Orcamento.orcado).label('orcado')
+        ).filter(Orcamento.status == 'aprovado').group_by(Orcamento.id_categoria, Orcamento.ano, Orcamento.mes)
+    }
+
+
+def _materializado():
+    return {(r.id_categoria, r.ano, r.mes): float(r.total_orcado) for r in Resumo.query if r.total_orcado}
+
+
+def test_resumo_acompanha_alteracoes(app):
+    orcamentos = [
+        Orcamento(id_categoria=1, mes='Janeiro', ano=2024, orcado=10, realizado=0, status='aprovado'),
+        Orcamento(id_categoria=1, mes='Fevereiro', ano=2024, orcado=20, realizado=0, status='aprovado'),
+        Orcamento(id_categoria=2, mes='Janeiro', ano=2024, orcado=30, realizado=0, status='rascunho'),
+    ]
+    db.session.add_all(orcamentos)
+    db.session.commit()
+    assert _materializado() == _esperado() == {(1, 2024, 'Janeiro'): 10.0, (1, 2024, 'Fevereiro'): 20.0}
+
+    # Troca de chave num objeto expirado: a chave antiga sai do resumo
+    db.session.expire(orcamentos[0])
+    orcamentos[0].ano = 2025
+    orcamentos[0].id_categoria = 2
+    db.session.commit()
+    assert _materializado() == _esperado()
+
+    orcamentos[2].status = 'aprovado'
+    orcamentos[1].orcado = 5
+    db.session.commit()
+    assert _materializado() == _esperado()
+
+    db.session.delete(orcamentos[1])
+    db.session.commit()
+    assert _materializado() == _esperado() == {(2, 2025, 'Janeiro'): 10.0, (2, 2024, 'Janeiro'): 30.0}
+
+
+def test_limpeza_do_feed(app, monkeypatch):
+    db.session.add(Orcamento(id_categoria=1, mes='Janeiro', ano=2024, orcado=10, realizado=0, status='aprovado'))
+    db.session.add(Orcamento(id_categoria=2, mes='Janeiro', ano=2024, orcado=10, realizado=0, status='aprovado'))
+    db.session.commit()
+    db.session.query(AlteracaoResumo).update({'criado_em': datetime.utcnow() - timedelta(days=30)})
+    db.session.commit()
+    assert AlteracaoResumo.query.count() == 2
+
+    disparos = []
+
+    class ThreadSincrona:
+        def __init__(self, target, args, **_):
+            self.target, self.args = target, args
+
+        def start(self):
+            disparos.append(1)
+            self.target(*self.args)
+
+    monkeypatch.setattr(resumo.threading, 'Thread', ThreadSincrona)
+    app.config['RESUMO_ALTERACOES_LIMPEZA'] = 3600
+    # Só a versão dos dados, sem escrita no feed: nada a limpar
+    marcar_dados_alterados()
+    db.session.commit()
+    assert disparos == []
+
+    for valor in (20, 30):
+        Orcamento.query.filter_by(id_categoria=1).one().orcado = valor
+        marcar_dados_alterados()
+        db.session.commit()
+
+    # Uma limpeza por intervalo: saem as entradas antigas, ficam as das duas escritas
+    assert len(disparos) == 1
+    assert AlteracaoResumo.query.count() == 2
+
+
+def test_verificar_resumo_apos_alteracoes(app, view_resumo):
+    orcamentos = [
+        Orcamento(id_categoria=1, mes='Janeiro', ano=2024, orcado=10, realizado=3, status='aprovado'),
+        Orcamento(id_categoria=1, mes='Fevereiro', ano=2024, orcado=7, realizado=1, status='aprovado'),
+        Orcamento(id_categoria=2, mes='Março', ano=2024, orcado=30, realizado=0, status='aguardando_aprovacao'),
+    ]
+    db.session.add_all(orcamentos)
+    db.session.commit()
+    assert resumo.verificar_resumo() == []
+
+    orcamentos[0].realizado = 9
+    orcamentos[1].mes = 'Março'
+    orcamentos[2].status = 'aprovado'
+    db.session.commit()
+    assert resumo.verificar_resumo() == []
+
+    db.session.delete(orcamentos[0])
+    orcamentos[2].status = 'reprovado'
+    db.session.commit()
+    assert resumo.verificar_resumo() == []
+
+    # Escrita por fora do ORM: a divergência aparece e o rebuild-resumo corrige
+    db.session.execute(text("UPDATE orcamentos SET orcado = 99 WHERE status = 'aprovado'"))
+    db.session.commit()
+    divergencias = resumo.verificar_resumo()
+    assert [d['chave'][-2:] for d in divergencias] == [(2024, 'Março')]
+    resumo.reconstruir_resumo()
+    assert resumo.verificar_resumo() == []
+
+
+def test_carga_inicial_com_tabela_vazia(app):
+    db.session.add_all([
+        Orcamento(id_categoria=1, mes='Janeiro', ano=2024, orcado=10, realizado=3, status='aprovado'),
+        Orcamento(id_categoria=2, mes='Março', ano=2024, orcado=30, realizado=0, status='aprovado'),
+    ])
+    db.session.commit()
+    esperado = _esperado()
+    # Banco migrado: aprovados já existiam antes da tabela materializada
+    db.session.query(Resumo).delete()
+    db.session.commit()
+
+    assert {(r.categoria, r.mes) for r in resumo.consulta_resumo()} == {('Cat0', 'Janeiro'), ('Cat1', 'Março')}
+    assert _materializado() == esperado
+
+    # Uma vez por processo: esvaziar de novo não dispara outra carga
+    db.session.query(Resumo).delete()
+    db.session.commit()
+    assert resumo.consulta_resumo().all() == []
+
+
+def test_exportacao_excel_em_ordem(app):
+    db.session.add_all([
+        Orcamento(id_categoria=categoria, mes=mes, ano=ano, orcado=1, realizado=0, status='aprovado')
+        for ano in (2023, 2024)
+        for mes in ('Dezembro', 'Fevereiro', 'Janeiro')
+        for categoria in (2, 1)
+    ])
+    db.session.commit()
+
+    resposta = app.test_client().get('/api/relatorios/excel', headers=_cabecalho())
+    assert resposta.status_code == 200
+    planilha = pd.read_excel(io.BytesIO(resposta.get_data()), sheet_name='Relatório')
+    # Ano mais recente primeiro, meses na ordem do calendário, categorias em ordem alfabética
+    assert list(zip(planilha['Ano'], planilha['Mês'], planilha['Categoria'])) == [
+        (ano, mes, categoria)
+        for ano in (2024, 2023)
+        for mes in ('Janeiro', 'Fevereiro', 'Dezembro')
+        for categoria in ('Cat0', 'Cat1')
+    ]
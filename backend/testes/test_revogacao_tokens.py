@@ -0,0 +1,47 @@
+"""
+Garante que o cache de tokens revogados enxerga logouts confirmados fora da ordem dos ids
+Uso: cd backend && python -m pytest testes/test_revogacao_tokens.py
+"""
+from datetime import datetime, timedelta
+
+from models import db, TokenBlacklist
+from services.revogacao_tokens import cache_revogacao, limpar_tokens_expirados
+
+
+def _revogar(id_token, jti, expira_em=None):
+    db.session.add(TokenBlacklist(id=id_token, jti=jti, expira_em=expira_em))
+    db.session.commit()
+
+
+def test_revogacao_confirmada_fora_de_ordem(app):
+    cache = cache_revogacao()
+    cache.intervalo = 0
+
+    # O id 2 foi reservado por um logout que ainda não confirmou quando o 3 já está visível
+    _revogar(1, 'jti-1')
+    _revogar(3, 'jti-3')
+    assert cache.revogado('jti-3')
+    assert cache.estatisticas()['ultimo_id'] == 3
+
+    _revogar(2, 'jti-2')
+    assert cache.revogado('jti-2')
+    assert cache.revogado('jti-1')
+    assert not cache.revogado('jti-4')
+    assert cache.estatisticas()['ultimo_id'] == 3
+
+
+def test_revogacao_expirada_e_ignorada(app):
+    cache = cache_revogacao()
+    cache.intervalo = 0
+    passado = datetime.utcnow() - timedelta(minutes=1)
+    futuro = datetime.utcnow() + timedelta(hours=1)
+
+    _revogar(1, 'expirado', passado)
+    _revogar(2, 'valido', futuro)
+    _revogar(3, 'ultimo', passado)
+    assert not cache.revogado('expirado')
+    assert cache.revogado('valido')
+
+    # A limpeza mantém a entrada de maior id mesmo expirada (marca d'água dos caches)
+    assert limpar_tokens_expirados(tamanho_lote=1) == 1
+    assert {t.jti for t in TokenBlacklist.query} == {'valido', 'ultimo'}
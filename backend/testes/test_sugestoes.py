@@ -0,0 +1,38 @@
+"""
+Garante que o índice de sugestões concorda com a busca linear quando todas as categorias
+cabem na lista de candidatas (pontuação, desempate e limiar iguais)
+Uso: cd backend && python -m pytest testes/test_sugestoes.py
+"""
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from services.sugestoes import IndiceSugestoes, find_best_category_suggestion
+
+PALAVRAS = ['Aluguel', 'Manutenção', 'Frete', 'Seguro', 'Energia', 'Software', 'Viagens', 'Limpeza']
+UFS = ['BA', 'SP', 'S Filho', None]
+
+
+def _categorias(rnd, quantidade):
+    return [
+        SimpleNamespace(id_categoria=i + 1, categoria=f'Cat{i}',
+                        master=f'{i % 7:02d} {rnd.choice(PALAVRAS)}',
+                        grupo=f'{rnd.choice(PALAVRAS)} {rnd.choice(PALAVRAS)}', uf=rnd.choice(UFS))
+        for i in range(quantidade)
+    ]
+
+
+@pytest.mark.parametrize('quantidade', [1, 30, 50])
+def test_igual_a_busca_linear_dentro_do_limite(quantidade):
+    rnd = random.Random(quantidade)
+    categorias = _categorias(rnd, quantidade)
+    indice = IndiceSugestoes(categorias, limite_candidatos=50)
+
+    consultas = [(c.master, c.grupo, c.uf) for c in categorias[:10]]
+    # Com erro de digitação, só UF, nada parecido e campos vazios
+    consultas += [(c.master[:-1] + 'x', c.grupo.upper(), c.uf) for c in categorias[:10]]
+    consultas += [('', '', 'BA'), ('99 Impostos', 'Marketing Novo', 'RJ'), (None, None, None)]
+    for master, grupo, uf in consultas:
+        assert indice.sugerir(master, grupo, uf) == \
+            find_best_category_suggestion(master, grupo, uf, categorias), (master, grupo, uf)
@@ -0,0 +1,125 @@
+"""
+Garante que o upsert em lote da importação produz o mesmo resultado do fluxo linha a linha
+e que a confirmação por preview_token só vale para o dono da prévia, uma vez
+Uso: cd backend && python -m pytest testes/test_upsert_orcamentos.py
+"""
+import io
+from decimal import Decimal
+
+import pytest
+from flask_jwt_extended import create_access_token
+from openpyxl import Workbook
+
+from conftest import _cabecalho
+from models import db, Usuario, Categoria, Orcamento
+from services.autorizacao import claims_usuario
+from services.importacao import UpsertOrcamentos
+
+
+@pytest.fixture
+def app(app):
+    db.session.add_all([Categoria(categoria=f'Cat{i}', master=f'M{i}', grupo='G', uf='BA') for i in range(3)])
+    db.session.flush()
+    db.session.add_all([
+        Orcamento(id_categoria=1, mes='Janeiro', ano=2024, orcado=1, realizado=4, status='aprovado'),
+        Orcamento(id_categoria=1, mes='Fevereiro', ano=2024, orcado=1, realizado=4, status='rascunho'),
+        Orcamento(id_categoria=2, mes='Janeiro', ano=2024, orcado=1, realizado=None, status=None),
+        Orcamento(id_categoria=2, mes='Março', ano=2025, orcado=1, realizado=2, status='reprovado'),
+    ])
+    db.session.commit()
+    return app
+
+
+def _estado():
+    return sorted(
+        (o.id_categoria, o.mes, o.ano, o.orcado, o.dif, o.status)
+        for o in Orcamento.query
+    )
+
+
+def _linha_a_linha(itens):
+    """Fluxo antigo: uma consulta por (categoria, mês, ano), aprovados nunca são sobrescritos"""
+    created = updated = 0
+    for cat_id, mes, ano, valor in itens:
+        existente = Orcamento.query.filter_by(id_categoria=cat_id, mes=mes, ano=ano).first()
+        if existente:
+            if existente.status != 'aprovado':
+                existente.orcado = valor
+                updated += 1
+        else:
+            db.session.add(Orcamento(id_categoria=cat_id, mes=mes, ano=ano, orcado=valor,
+                                     realizado=Decimal('0'), status='aguardando_aprovacao', criado_por=1))
+            created += 1
+    db.session.flush()
+    return created, updated
+
+
+def test_upsert_igual_ao_fluxo_linha_a_linha(app):
+    itens = [
+        (1, 'Janeiro', 2024, Decimal('10')),    # aprovado: intocado
+        (1, 'Fevereiro', 2024, Decimal('20')),  # rascunho: atualizado
+        (2, 'Janeiro', 2024, Decimal('30')),    # status nulo: editável
+        (3, 'Abril', 2024, Decimal('40')),      # novo
+        (3, 'Abril', 2024, Decimal('41')),      # repetido: a última ocorrência prevalece
+        (1, 'Fevereiro', 2024, Decimal('21')),
+        (2, 'Março', 2025, Decimal('50')),
+        (3, 'Maio', 2025, Decimal('60')),
+    ]
+    contagens_antigas = _linha_a_linha(itens)
+    esperado = _estado()
+    db.session.rollback()
+
+    # Lotes pequenos e chamadas separadas, como a importação faz bloco a bloco
+    upsert = UpsertOrcamentos(db.session, 1, tamanho_lote=2)
+    upsert.processar(itens[:5])
+    upsert.processar(itens[5:])
+    db.session.flush()
+    db.session.expire_all()
+
+    assert (upsert.created, upsert.updated) == contagens_antigas == (2, 5)
+    assert _estado() == esperado
+
+
+def _planilha(linhas):
+    workbook = Workbook()
+    planilha = workbook.active
+    planilha.append(['Centro de Custo', 'Grupo', 'UF', 'Ano', 'Mes(es)', 'Valor'])
+    for linha in linhas:
+        planilha.append(linha)
+    conteudo = io.BytesIO()
+    workbook.save(conteudo)
+    conteudo.seek(0)
+    return conteudo
+
+
+def test_confirmacao_por_preview_token(app):
+    # Outro admin: pode importar, mas não confirmar a prévia de quem enviou
+    outro = Usuario(nome='Outro', email='outro@teste.com', papel='admin')
+    outro.set_password('teste')
+    db.session.add(outro)
+    db.session.commit()
+    token_outro = create_access_token(identity=str(outro.id_usuario), additional_claims=claims_usuario(outro))
+
+    client = app.test_client()
+    admin = _cabecalho('admin')
+    arquivo = _planilha([['M0', 'G', 'BA', 2026, 'jan', 10], ['NOVO', 'G', 'SP', 2026, 'jan, fev', 5]])
+    resposta = client.post('/api/orcamentos/import', headers=admin, data={'file': (arquivo, 'orcamentos.xlsx')},
+                           content_type='multipart/form-data').get_json()
+    assert resposta['status'] == 'missing_categories'
+    token = resposta['preview_token']
+    assert Orcamento.query.filter_by(ano=2026).count() == 0
+
+    def confirmar(cabecalho):
+        return client.post('/api/orcamentos/import', headers=cabecalho,
+                           data={'preview_token': token, 'create_missing': 'true'})
+
+    # A prévia é do usuário que enviou o arquivo
+    assert confirmar({'Authorization': f'Bearer {token_outro}'}).status_code == 410
+
+    resposta = confirmar(admin)
+    assert resposta.status_code == 200, resposta.get_json()
+    assert (resposta.get_json()['created'], resposta.get_json()['categories_created']) == (3, 1)
+    assert Orcamento.query.filter_by(ano=2026).count() == 3
+
+    # Depois de gravada, a prévia é descartada
+    assert confirmar(admin).status_code == 410
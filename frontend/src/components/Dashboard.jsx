@@ -79,18 +79,13 @@ export default function Dashboard() {
   const loadDashboard = useCallback(async () => {
     try {
       setLoading(true);
-      const [dashData, kpisData, comparativoData, distCatData, distCentroCustoData] = await Promise.all([
-        dashboardAPI.getData(filtros),
-        dashboardAPI.getKPIs(filtros.ano),
-        dashboardAPI.getComparativo(filtros.ano),
-        dashboardAPI.getDistribuicao({ ...filtros, tipo: 'categoria' }),
-        dashboardAPI.getDistribuicao({ ...filtros, tipo: 'centro_custo' })
-      ]);
-      setDashboardData(dashData);
-      setKpis(kpisData);
-      setComparativo(comparativoData);
-      setDistribuicaoCategoria(distCatData);
-      setDistribuicaoCentroDeCusto(distCentroCustoData);
+      // Uma requisição traz todas as visões da tela
+      const bundle = await dashboardAPI.getBundle(filtros);
+      setDashboardData(bundle.dashboard);
+      setKpis(bundle.kpis);
+      setComparativo(bundle.comparativo);
+      setDistribuicaoCategoria(bundle.distribuicao.categoria);
+      setDistribuicaoCentroDeCusto(bundle.distribuicao.centro_custo);
     } catch (error) {
       console.error('Erro ao carregar dashboard:', error);
     } finally {
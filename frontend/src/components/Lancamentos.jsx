@@ -39,6 +39,8 @@ export default function Lancamentos() {
   const [orcamentos, setOrcamentos] = useState([]);
   // const [originalOrcamentos, setOriginalOrcamentos] = useState([]); // Removed unused state
   const [loading, setLoading] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null); // próxima página da listagem por status
+  const [loadingMore, setLoadingMore] = useState(false);
   const [saving, setSaving] = useState(false);
   const [modifiedIds, setModifiedIds] = useState(new Set());
   const [selectedIds, setSelectedIds] = useState(new Set());
@@ -76,6 +78,7 @@ export default function Lancamentos() {
   const [pendingImportFile, setPendingImportFile] = useState(null);
   const [missingImportCombos, setMissingImportCombos] = useState([]);
   const [missingImportActions, setMissingImportActions] = useState({});
+  const [importPreviewToken, setImportPreviewToken] = useState(null);
   const [isMissingCategoriesModalOpen, setIsMissingCategoriesModalOpen] = useState(false);
 
   const loadRequestIdRef = useRef(0);
@@ -87,9 +90,14 @@ export default function Lancamentos() {
     setLoading(true);
     try {
       let orcamentosCompletos = [];
+      let cursor = null;
       if (usedFiltros.status) {
-        orcamentosCompletos = await orcamentosAPI.list(usedFiltros);
+        // Listagem por status: só a primeira página; as demais vêm em "Carregar mais"
+        const pagina = await orcamentosAPI.listPage(usedFiltros);
+        orcamentosCompletos = pagina.orcamentos;
+        cursor = pagina.nextCursor;
       } else {
+        // Grade por categoria: precisa do mês inteiro (no máximo um lançamento por categoria)
         const categoriasResponse = await categoriasAPI.list({
           master: usedFiltros.master,
           uf: usedFiltros.uf,
@@ -130,6 +138,7 @@ export default function Lancamentos() {
       }
 
       setOrcamentos(orcamentosCompletos);
+      setNextCursor(cursor);
       console.log(`Lancamentos[req:${reqId}]: orçamentos carregados — total:`, orcamentosCompletos.length, 'filtros usados:', usedFiltros);
       // setOriginalOrcamentos(JSON.parse(JSON.stringify(orcamentosCompletos))); // Removed unused state
       setModifiedIds(new Set());
@@ -149,6 +158,24 @@ export default function Lancamentos() {
     // opcoesFiltro.meses // Removed unnecessary dependency
   ]);
 
+  const loadMoreOrcamentos = async () => {
+    if (!nextCursor || loadingMore) return;
+    const reqId = loadRequestIdRef.current;
+    setLoadingMore(true);
+    try {
+      const pagina = await orcamentosAPI.listPage(filtros, nextCursor);
+      // Filtros mudaram enquanto a página carregava: a grade já é outra
+      if (reqId !== loadRequestIdRef.current) return;
+      setOrcamentos(prev => [...prev, ...pagina.orcamentos]);
+      setNextCursor(pagina.nextCursor);
+    } catch (error) {
+      console.error('Erro ao carregar mais orçamentos:', error);
+      showNotification('error', 'Erro ao carregar mais lançamentos.');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const loadInitialData = useCallback(async () => {
     const stateFilters = location?.state;
     if (stateFilters && !navAppliedRef.current) {
@@ -611,6 +638,7 @@ export default function Lancamentos() {
 
   const clearImportState = () => {
     setPendingImportFile(null);
+    setImportPreviewToken(null);
     setMissingImportCombos([]);
     setMissingImportActions({});
     setIsMissingCategoriesModalOpen(false);
@@ -619,11 +647,23 @@ export default function Lancamentos() {
     }
   };
 
-  const submitImportFile = async (file, actions = null) => {
-    if (!file) return;
+  const submitImportFile = async (file, actions = null, previewToken = null) => {
+    if (!file && !previewToken) return;
     setSaving(true);
     try {
-      const response = await orcamentosAPI.import(file, false, false, actions);
+      let response;
+      try {
+        response = previewToken
+          ? await orcamentosAPI.confirmImport(previewToken, actions)
+          : await orcamentosAPI.import(file, false, false, actions);
+      } catch (error) {
+        // Prévia expirada: reenvia o arquivo com as mesmas decisões
+        if (previewToken && file && error.response?.status === 410) {
+          response = await orcamentosAPI.import(file, false, false, actions);
+        } else {
+          throw error;
+        }
+      }
       if (response.status === 'missing_categories' && Array.isArray(response.missing)) {
         const combos = response.missing.map(item => ({
           ...item,
@@ -634,6 +674,7 @@ export default function Lancamentos() {
           defaultActions[combo.key] = 'skip';
         });
         setPendingImportFile(file);
+        setImportPreviewToken(response.preview_token || null);
         setMissingImportCombos(combos);
         setMissingImportActions(defaultActions);
         setIsMissingCategoriesModalOpen(true);
@@ -677,11 +718,11 @@ export default function Lancamentos() {
 
   const handleMissingConfirm = async () => {
     setIsMissingCategoriesModalOpen(false);
-    if (!pendingImportFile) {
+    if (!pendingImportFile && !importPreviewToken) {
       showNotification('error', 'Arquivo não disponível para reenvio.');
       return;
     }
-    await submitImportFile(pendingImportFile, missingImportActions);
+    await submitImportFile(pendingImportFile, missingImportActions, importPreviewToken);
   };
 
   const handleMissingCancel = () => {
@@ -1032,9 +1073,24 @@ export default function Lancamentos() {
           </tbody>
         </table>
 
+        {nextCursor && (
+          <div className="flex justify-center px-6 py-4 border-t">
+            <button
+              onClick={loadMoreOrcamentos}
+              disabled={loadingMore}
+              className="inline-flex items-center gap-2 px-4 py-2 text-sm font-medium text-indigo-700 bg-indigo-50 hover:bg-indigo-100 rounded-lg transition disabled:opacity-50"
+            >
+              {loadingMore && <Loader2 size={16} className="animate-spin" />}
+              Carregar mais ({orcamentos.length} carregados)
+            </button>
+          </div>
+        )}
+
         {/* Resumo */}
         <div className="bg-gray-50 px-6 py-4 border-t">
-          <h3 className="text-lg font-semibold mb-2">Resumo dos Lançamentos Filtrados</h3>
+          <h3 className="text-lg font-semibold mb-2">
+            {nextCursor ? 'Resumo dos Lançamentos Carregados' : 'Resumo dos Lançamentos Filtrados'}
+          </h3>
           <div className="grid grid-cols-1 md:grid-cols-3 gap-4 text-center">
             <div className="bg-blue-50 p-4 rounded-lg">
               <p className="text-sm text-blue-800 font-medium">Total Orçado</p>
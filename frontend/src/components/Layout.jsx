@@ -14,7 +14,8 @@ import {
   ChevronsLeft,
   ChevronsRight
 } from 'lucide-react';
-import { useState } from 'react';
+import { useState, useEffect } from 'react';
+import { orcamentosAPI } from '../services/api';
 
 export default function Layout() {
   const location = useLocation();
@@ -23,6 +24,15 @@ export default function Layout() {
   const { user, logout, isAdmin, canEdit } = useAuth();
   const [sidebarOpen, setSidebarOpen] = useState(false);
   const [isCollapsed, setIsCollapsed] = useState(false);
+  const [contagens, setContagens] = useState({});
+
+  // Contadores do menu: uma única consulta agrupada por status no backend (com cache)
+  useEffect(() => {
+    if (!['admin', 'gestor'].includes(user?.papel)) return;
+    orcamentosAPI.getStatus()
+      .then(data => setContagens(data?.por_status || {}))
+      .catch(error => console.error('Erro ao carregar contadores:', error));
+  }, [user?.papel, location.pathname]);
 
   const navigation = [
     { 
@@ -47,13 +57,15 @@ export default function Layout() {
       name: 'Submissões', 
       path: '/submissoes', 
       icon: FileText, 
-      roles: ['gestor'] 
+      roles: ['gestor'],
+      badge: 'aguardando_aprovacao'
     },
     { 
       name: 'Reprovações', 
       path: '/rejeicoes', 
       icon: FileText, 
-      roles: ['admin'] 
+      roles: ['admin'],
+      badge: 'reprovado'
     },
     { 
       name: 'Relatórios', 
@@ -190,6 +202,13 @@ export default function Layout() {
                   >
                     <Icon size={20} className={isActive ? 'text-indigo-600' : 'text-gray-500'} />
                     <span className={`ml-3 transition-all duration-200 whitespace-nowrap ${isCollapsed ? 'opacity-0 w-0 ml-0' : 'opacity-100'}`}>{item.name}</span>
+                    {item.badge && contagens[item.badge] > 0 && (
+                      <span className={`px-2 text-xs font-semibold rounded-full bg-indigo-600 text-white ${
+                        isCollapsed ? 'absolute top-0 right-0' : 'ml-auto'
+                      }`}>
+                        {contagens[item.badge]}
+                      </span>
+                    )}
                     {isCollapsed && (
                       <span className="absolute left-full ml-2 w-max px-2 py-1 text-sm text-white bg-gray-800 rounded-md shadow-lg opacity-0 group-hover:opacity-100 transition-opacity duration-300 pointer-events-none">
                         {item.name}
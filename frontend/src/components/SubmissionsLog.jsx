@@ -1,25 +1,45 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useCallback } from 'react';
 import { orcamentosAPI } from '../services/api';
+import { MESES } from '../utils/meses';
 import { ArrowRight, Calendar } from 'lucide-react';
 
+const FILTROS_VAZIOS = { ano: '', mes: '', master: '', uf: '' };
+
 export default function SubmissionsLog({ onNavigateToLancamentos }) {
   const [submissions, setSubmissions] = useState([]);
   const [loading, setLoading] = useState(false);
+  const [pagination, setPagination] = useState({});
+  const [page, setPage] = useState(1);
+  const [filtros, setFiltros] = useState(FILTROS_VAZIOS);
+  const [opcoes, setOpcoes] = useState({ anos: [], masters: [], ufs: [] });
+  const [pendentes, setPendentes] = useState(0);
 
-  useEffect(() => {
-    loadSubmissions();
-  }, []);
-
-  const loadSubmissions = async () => {
+  const loadSubmissions = useCallback(async () => {
     setLoading(true);
     try {
-      const data = await orcamentosAPI.getSubmissions();
-      setSubmissions(Array.isArray(data) ? data : []);
+      const params = { page, per_page: 20 };
+      Object.entries(filtros).forEach(([nome, valor]) => {
+        if (valor) params[nome] = valor;
+      });
+      const data = await orcamentosAPI.getSubmissions(params);
+      setSubmissions(Array.isArray(data?.submissoes) ? data.submissoes : []);
+      setPagination(data?.pagination || {});
+      if (data?.filtros) setOpcoes(data.filtros);
+      setPendentes(data?.pendentes || 0);
     } catch (error) {
       console.error('Erro ao carregar submissões:', error);
     } finally {
       setLoading(false);
     }
+  }, [page, filtros]);
+
+  useEffect(() => {
+    loadSubmissions();
+  }, [loadSubmissions]);
+
+  const handleFiltro = (nome, valor) => {
+    setFiltros(atual => ({ ...atual, [nome]: valor }));
+    setPage(1);
   };
 
   const handleNavigate = (submission) => {
@@ -47,12 +67,54 @@ export default function SubmissionsLog({ onNavigateToLancamentos }) {
   return (
     <div className="bg-white rounded-lg shadow overflow-hidden">
       <div className="px-6 py-4 border-b">
-        <h2 className="text-lg font-semibold text-gray-900">Log de Submissões para Aprovação</h2>
+        <div className="flex items-center justify-between">
+          <h2 className="text-lg font-semibold text-gray-900">Log de Submissões para Aprovação</h2>
+          {pendentes > 0 && (
+            <span className="px-2 py-1 text-xs font-semibold rounded-full bg-yellow-100 text-yellow-800">
+              {pendentes} aguardando aprovação
+            </span>
+          )}
+        </div>
         <p className="text-sm text-gray-600 mt-1">
           Histórico de orçamentos enviados pelo administrador para sua aprovação
         </p>
       </div>
 
+      <div className="px-6 py-3 border-b bg-gray-50 flex flex-wrap gap-3">
+        <select
+          value={filtros.ano}
+          onChange={(e) => handleFiltro('ano', e.target.value)}
+          className="px-3 py-1 border rounded-md text-sm"
+        >
+          <option value="">Todos os anos</option>
+          {opcoes.anos.map(ano => <option key={ano} value={ano}>{ano}</option>)}
+        </select>
+        <select
+          value={filtros.mes}
+          onChange={(e) => handleFiltro('mes', e.target.value)}
+          className="px-3 py-1 border rounded-md text-sm"
+        >
+          <option value="">Todos os meses</option>
+          {MESES.map(mes => <option key={mes} value={mes}>{mes}</option>)}
+        </select>
+        <select
+          value={filtros.master}
+          onChange={(e) => handleFiltro('master', e.target.value)}
+          className="px-3 py-1 border rounded-md text-sm"
+        >
+          <option value="">Todos os centros de custo</option>
+          {opcoes.masters.map(master => <option key={master} value={master}>{master}</option>)}
+        </select>
+        <select
+          value={filtros.uf}
+          onChange={(e) => handleFiltro('uf', e.target.value)}
+          className="px-3 py-1 border rounded-md text-sm"
+        >
+          <option value="">Todas as UFs</option>
+          {opcoes.ufs.map(uf => <option key={uf} value={uf}>{uf}</option>)}
+        </select>
+      </div>
+
       {submissions.length === 0 ? (
         <div className="text-center py-12">
           <Calendar className="mx-auto h-12 w-12 text-gray-400" />
@@ -154,6 +216,28 @@ export default function SubmissionsLog({ onNavigateToLancamentos }) {
           </table>
         </div>
       )}
+
+      {pagination.pages > 1 && (
+        <div className="px-6 py-4 border-t flex justify-between items-center">
+          <button
+            onClick={() => setPage(p => Math.max(1, p - 1))}
+            disabled={!pagination.has_prev}
+            className="px-4 py-2 border rounded-lg disabled:opacity-50"
+          >
+            Anterior
+          </button>
+          <span className="text-sm text-gray-600">
+            Página {pagination.page} de {pagination.pages}
+          </span>
+          <button
+            onClick={() => setPage(p => p + 1)}
+            disabled={!pagination.has_next}
+            className="px-4 py-2 border rounded-lg disabled:opacity-50"
+          >
+            Próxima
+          </button>
+        </div>
+      )}
     </div>
   );
 }
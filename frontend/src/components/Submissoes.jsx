@@ -74,7 +74,9 @@ export default function Submissoes() {
     setConfirmModal({
       isOpen: true,
       title: 'Aprovar Submissão',
-      message: `Deseja aprovar todos os ${ids.length} orçamentos desta submissão?`,
+      message: selectedSubmission.truncado
+        ? `Deseja aprovar os ${ids.length} primeiros dos ${selectedSubmission.total_submetidos} orçamentos importados? Os demais aparecem em seguida.`
+        : `Deseja aprovar todos os ${ids.length} orçamentos desta submissão?`,
       onConfirm: async () => {
         try {
           await orcamentosAPI.batchApprove(ids);
@@ -95,7 +97,9 @@ export default function Submissoes() {
     setPromptModal({
       isOpen: true,
       title: 'Reprovar Submissão',
-      message: 'Informe o motivo da reprovação para todos os itens:',
+      message: selectedSubmission.truncado
+        ? `Informe o motivo da reprovação dos ${ids.length} primeiros dos ${selectedSubmission.total_submetidos} orçamentos importados:`
+        : 'Informe o motivo da reprovação para todos os itens:',
       onConfirm: async (motivo) => {
         if (!motivo) return alert('Motivo é obrigatório');
         try {
@@ -153,6 +157,12 @@ export default function Submissoes() {
               </button>
             </div>
 
+            {selectedSubmission.truncado && (
+              <p className="mb-4 text-sm text-amber-700 bg-amber-50 border border-amber-200 rounded-lg px-3 py-2">
+                Exibindo os {selectedSubmission.orcamentos.length} primeiros de {selectedSubmission.total_submetidos} orçamentos importados.
+              </p>
+            )}
+
             <div className="max-h-[60vh] overflow-y-auto space-y-4 mb-6">
               {groupOrcamentos(selectedSubmission.orcamentos).map((grupo, idx) => (
                 <div key={idx} className="bg-gray-50 rounded-lg p-4 border border-gray-200">
@@ -118,21 +118,46 @@ export const categoriasAPI = {
 
 // ============= ORÇAMENTOS =============
 
+// Linhas por página da grade de Lançamentos (o backend aceita até MAX_ITEMS_PER_PAGE)
+const ORCAMENTOS_PAGE_SIZE = 500;
+// Colunas que a grade exibe: ?fields= deixa o resto fora da consulta e do JSON
+const ORCAMENTOS_GRID_FIELDS = 'id_orcamento,id_categoria,mes,ano,orcado,realizado,dif,status,categoria';
+
+const orcamentosParams = (filtros) => {
+  // O backend armazena o mês como nome (e.g., 'Janeiro').
+  // Se o frontend passar um número, converte para o nome antes de chamar o endpoint.
+  const MESES = ['Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho',
+    'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro'];
+
+  const params = { ...filtros };
+  if (params.mes && typeof params.mes === 'number') {
+    const m = params.mes;
+    if (m >= 1 && m <= 12) params.mes = MESES[m - 1];
+  }
+  params.limit = params.limit || ORCAMENTOS_PAGE_SIZE;
+  params.fields = params.fields || ORCAMENTOS_GRID_FIELDS;
+  return params;
+};
+
 export const orcamentosAPI = {
   getFiltros: async () => (await api.get('/orcamentos/filtros')).data,
+  // Uma página da listagem (cursor do X-Next-Cursor da anterior); nextCursor é null na última
+  listPage: async (filtros = {}, cursor = null) => {
+    const params = orcamentosParams(filtros);
+    if (cursor) params.cursor = cursor;
+    const response = await api.get('/orcamentos', { params });
+    return { orcamentos: response.data, nextCursor: response.headers['x-next-cursor'] || null };
+  },
+  // Todas as páginas: só para conjuntos limitados (ex.: um mês, no máximo uma linha por categoria)
   list: async (filtros = {}) => {
-    // O backend armazena o mês como nome (e.g., 'Janeiro').
-    // Se o frontend passar um número, converte para o nome antes de chamar o endpoint.
-    const MESES = ['Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho',
-      'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro'];
-
-    const params = { ...filtros };
-    if (params.mes && typeof params.mes === 'number') {
-      const m = params.mes;
-      if (m >= 1 && m <= 12) params.mes = MESES[m - 1];
-    }
-
-    return (await api.get('/orcamentos', { params })).data;
+    const orcamentos = [];
+    let cursor = null;
+    do {
+      const pagina = await orcamentosAPI.listPage(filtros, cursor);
+      orcamentos.push(...pagina.orcamentos);
+      cursor = pagina.nextCursor;
+    } while (cursor);
+    return orcamentos;
   },
   getCategoriaAno: async (idCategoria, ano) =>
     (await api.get(`/orcamentos/categoria/${idCategoria}/ano/${ano}`)).data,
@@ -152,7 +177,8 @@ export const orcamentosAPI = {
     if (motivo) payload.motivo = motivo;
     return (await api.post('/orcamentos/batch_reprove', payload)).data;
   },
-  getSubmissions: async () => (await api.get('/orcamentos/submissions')).data,
+  getSubmissions: async (filtros = {}) => (await api.get('/orcamentos/submissions', { params: filtros })).data,
+  getStatus: async (filtros = {}) => (await api.get('/orcamentos/status', { params: filtros })).data,
   getRejections: async () => (await api.get('/orcamentos/rejections')).data,
   aprovar: async (id) => (await api.post(`/orcamentos/${id}/aprovar`)).data,
   reprovar: async (id, motivo) => (await api.post(`/orcamentos/${id}/reprovar`, { motivo })).data,
@@ -170,6 +196,34 @@ export const orcamentosAPI = {
     });
     return response.data;
   },
+  // Confirma uma importação pendente pela prévia guardada no servidor (sem reenviar o arquivo)
+  confirmImport: async (previewToken, missingActions = null) => {
+    const formData = new FormData();
+    formData.append('preview_token', previewToken);
+    if (missingActions && typeof missingActions === 'object') {
+      formData.append('missing_actions', JSON.stringify(missingActions));
+    }
+    const response = await api.post('/orcamentos/import', formData, {
+      headers: { 'Content-Type': 'multipart/form-data' },
+    });
+    return response.data;
+  },
+  // Importação em segundo plano: cria o job e consulta o andamento por polling
+  importJob: async (file, createMissing = false, skipMissing = false, missingActions = null) => {
+    const formData = new FormData();
+    formData.append('file', file);
+    formData.append('create_missing', createMissing ? 'true' : 'false');
+    formData.append('skip_missing', skipMissing ? 'true' : 'false');
+    if (missingActions && typeof missingActions === 'object') {
+      formData.append('missing_actions', JSON.stringify(missingActions));
+    }
+    const response = await api.post('/orcamentos/import/jobs', formData, {
+      headers: { 'Content-Type': 'multipart/form-data' },
+    });
+    return response.data;
+  },
+  getImportJob: async (idJob) => (await api.get(`/orcamentos/import/jobs/${idJob}`)).data,
+  listImportJobs: async () => (await api.get('/orcamentos/import/jobs')).data,
 };
 
 // ============= DASHBOARD =============
@@ -180,6 +234,9 @@ export const dashboardAPI = {
   getFiltros: async () => (await api.get('/dashboard/filtros')).data,
   getComparativo: async (ano) => (await api.get('/dashboard/comparativo', { params: { ano } })).data,
   getDistribuicao: async (filtros = {}) => (await api.get('/dashboard/distribuicao', { params: filtros })).data,
+  getBundle: async (filtros = {}) => (await api.get('/dashboard/bundle', { params: filtros })).data,
+  getPivot: async (filtros = {}) => (await api.get('/dashboard/pivot', { params: filtros })).data,
+  getTendencia: async (filtros = {}) => (await api.get('/dashboard/tendencia', { params: filtros })).data,
 };
 
 // ============= RELATÓRIOS =============
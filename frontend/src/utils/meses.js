@@ -0,0 +1,3 @@
+// Nomes dos meses como o backend armazena (Orcamento.mes), na ordem do calendário
+export const MESES = ['Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho',
+  'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro'];